@@ -0,0 +1,52 @@
+# areas/cache.py
+"""
+Caché de áreas a nivel de proceso.
+
+El cálculo del OEE necesita el tipo y la capacidad teórica del área en cada
+guardado; en lugar de consultar la tabla de áreas cada vez se leen de este
+caché, que se invalida con las señales de guardado/borrado de Area. La
+expiración (AREA_CACHE_TTL) acota el tiempo que otros procesos pueden ver
+datos viejos, ya que las señales solo llegan al proceso que hizo el cambio.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+_areas = {}
+_cargado_en = 0.0
+_lock = threading.Lock()
+
+
+def _vigente():
+    ttl = getattr(settings, 'AREA_CACHE_TTL', 300)
+    return _areas and time.monotonic() - _cargado_en < ttl
+
+
+def _cargar():
+    global _areas, _cargado_en
+    from .models import Area
+    with _lock:
+        _areas = {area.pk: area for area in Area.objects.all()}
+        _cargado_en = time.monotonic()
+
+
+def obtener_area(area_id):
+    """Retorna el Area con ese id (o None si no existe)"""
+    if not _vigente() or area_id not in _areas:
+        _cargar()
+    return _areas.get(area_id)
+
+
+def ids():
+    """Ids de todas las áreas"""
+    if not _vigente():
+        _cargar()
+    return list(_areas)
+
+
+def invalidar():
+    """Descarta el caché; la próxima lectura recarga todas las áreas"""
+    global _areas
+    with _lock:
+        _areas = {}
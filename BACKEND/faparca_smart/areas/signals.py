@@ -0,0 +1,23 @@
+# areas/signals.py
+"""
+Señales de la app areas
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import versionado
+from . import cache
+from .models import Area
+
+
+@receiver([post_save, post_delete], sender=Area)
+def invalidar_cache_areas(sender, using=None, **kwargs):
+    """
+    Cualquier cambio en un área invalida el caché de áreas. Se invalida de
+    nuevo al confirmar la transacción por si otra lectura lo recargó con
+    datos aún no confirmados.
+    """
+    cache.invalidar()
+    transaction.on_commit(cache.invalidar, using=using)
+    versionado.marcar_cambio(using=using)
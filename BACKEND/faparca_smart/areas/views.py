@@ -2,6 +2,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from usuarios import alcance
 from .models import Area
 from .serializers import AreaSerializer, AreaListSerializer
 
@@ -10,6 +11,10 @@ class AreaViewSet(viewsets.ModelViewSet):
     serializer_class = AreaSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        """Solo las áreas visibles para el usuario"""
+        return alcance.filtrar(super().get_queryset(), self.request.user, campo='pk')
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return AreaListSerializer
@@ -18,8 +23,9 @@ class AreaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def por_tipo(self, request):
         """Obtener áreas agrupadas por tipo"""
-        empaque = Area.objects.filter(tipo='empaque', activa=True)
-        prensa = Area.objects.filter(tipo='prensa', activa=True)
+        areas = self.get_queryset()
+        empaque = areas.filter(tipo='empaque')
+        prensa = areas.filter(tipo='prensa')
         
         return Response({
             'empaque': AreaListSerializer(empaque, many=True).data,
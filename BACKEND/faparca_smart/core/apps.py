@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import metricas
+        # Cuenta las consultas de cada petición (ver core/metricas.py)
+        connection_created.connect(metricas.instalar, dispatch_uid='metricas_consultas')
@@ -0,0 +1,135 @@
+# core/broker.py
+"""
+Broker de eventos para el canal en vivo (/api/eventos/).
+
+Los productores publican desde cualquier hilo (vistas síncronas, hilos de
+recálculo) con publicar(); los suscriptores son corrutinas del servidor
+ASGI que consumen con suscribir(). El mensaje llega ya serializado, así el
+costo de armarlo se paga una sola vez sin importar cuántos clientes haya.
+
+BrokerLocal reparte los eventos dentro del proceso y alcanza para un
+despliegue de un solo nodo/worker. Para varios workers se puede apuntar
+OEE_BROKER a otra clase con la misma interfaz (por ejemplo sobre Redis
+pub/sub).
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+CANAL_DASHBOARD = 'dashboard'
+
+
+def canal_area(area_id):
+    """Canal con los cambios de una sola área (usuarios con alcance restringido)"""
+    return f'{CANAL_DASHBOARD}:area:{area_id}'
+
+
+class BrokerLocal:
+    """
+    Broker en memoria. Cada suscriptor tiene una cola acotada: si un
+    cliente lento se atrasa más de max_pendientes mensajes se descartan
+    los más viejos en lugar de acumular memoria.
+    """
+
+    def __init__(self, max_pendientes=100):
+        self.max_pendientes = max_pendientes
+        # canal -> loop -> colas de los suscriptores de ese loop
+        self._suscriptores = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+
+    def publicar(self, canal, mensaje):
+        """Envía el mensaje a todos los suscriptores del canal (thread-safe)"""
+        with self._lock:
+            por_loop = [(loop, list(colas)) for loop, colas in self._suscriptores[canal].items()]
+        for loop, colas in por_loop:
+            try:
+                # Un solo salto de hilo por loop, no uno por suscriptor
+                loop.call_soon_threadsafe(self._entregar, colas, mensaje)
+            except RuntimeError:
+                # Loop cerrado: sus suscriptores ya no existen
+                with self._lock:
+                    self._suscriptores[canal].pop(loop, None)
+
+    @staticmethod
+    def _entregar(colas, mensaje):
+        for cola in colas:
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait(mensaje)
+
+    def suscriptores(self, canal):
+        """Cantidad de suscriptores del canal (None si el broker no lo sabe)"""
+        with self._lock:
+            return sum(len(colas) for colas in self._suscriptores[canal].values())
+
+    def suscribir(self, canal, espera=None):
+        """
+        Registra un suscriptor en el canal (o en varios, con una lista de
+        canales) y retorna un iterador asíncrono con sus mensajes. Si pasan `espera` segundos sin mensajes produce
+        None (útil para enviar keep-alive). Debe llamarse dentro del loop
+        que lo va a consumir y cerrarse con cerrar().
+        """
+        return Suscripcion(self, canal, espera)
+
+    def _agregar(self, canal, loop, cola):
+        with self._lock:
+            self._suscriptores[canal][loop].add(cola)
+
+    def _quitar(self, canal, loop, cola):
+        with self._lock:
+            colas = self._suscriptores[canal].get(loop)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[canal][loop]
+
+
+class Suscripcion:
+    """Suscripción de BrokerLocal; queda registrada desde que se crea"""
+
+    def __init__(self, broker, canal, espera=None):
+        self.broker = broker
+        self.canales = [canal] if isinstance(canal, str) else list(canal)
+        self.espera = espera
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=broker.max_pendientes)
+        for canal in self.canales:
+            broker._agregar(canal, self.loop, self.cola)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await asyncio.wait_for(self.cola.get(), self.espera)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        for canal in self.canales:
+            self.broker._quitar(canal, self.loop, self.cola)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def obtener_broker():
+    """Retorna la instancia del broker configurado en OEE_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                clase = import_string(getattr(settings, 'OEE_BROKER', 'core.broker.BrokerLocal'))
+                _broker = clase()
+    return _broker
+
+
+def evento_sse(evento, datos):
+    """Arma un mensaje Server-Sent Events listo para enviar"""
+    return f'event: {evento}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder, separators=(",", ":"))}\n\n'
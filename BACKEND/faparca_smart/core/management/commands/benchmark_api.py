@@ -0,0 +1,400 @@
+# core/management/commands/benchmark_api.py
+"""
+Benchmark reproducible de los endpoints principales de la API: lista de
+registros, dashboard, alta de registros y login.
+
+Crea una base de prueba aparte (no toca la real), la llena con
+generar_datos_prueba (semilla y fecha fijas) y mide cada endpoint con N
+clientes concurrentes en tres modos:
+- cliente: Client de Django en hilos (handler WSGI, sin red)
+- asgi: AsyncClient con corrutinas (handler ASGI, como oee_system.asgi)
+- servidor: HTTP real contra un servidor WSGI con hilos en 127.0.0.1
+
+Registra p50/p95/p99, peticiones por segundo, errores y consultas SQL por
+petición en un JSON. Con --baseline compara contra una corrida guardada y
+falla si alguna métrica empeora más que --umbral (las consultas SQL y los
+errores no admiten tolerancia).
+Uso: python manage.py benchmark_api [--concurrencia 4] [--peticiones 200] [--guardar base.json] [--baseline base.json]
+"""
+import asyncio
+import http.client
+import json
+import platform
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from itertools import count
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from areas.models import Area
+from usuarios.models import Usuario
+
+# Fecha fija: el mismo dataset en cualquier día en que se corra
+HASTA = date(2025, 12, 31)
+PASSWORD = 'Benchmark.2024'
+MODOS = ['cliente', 'asgi', 'servidor']
+ENDPOINTS = ['lista', 'dashboard', 'crear', 'login']
+PERCENTILES = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+MARGEN_MS = 0.5  # Tolerancia absoluta: en latencias de 1-2 ms el ruido supera el umbral relativo
+
+
+def percentil(ordenadas, fraccion):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * fraccion))]
+
+
+def resumir(latencias, errores, segundos):
+    """Métricas de una corrida a partir de las latencias (s) de las peticiones exitosas"""
+    ordenadas = sorted(latencias)
+    metricas = {
+        nombre: round(percentil(ordenadas, fraccion) * 1000, 2) if ordenadas else None
+        for nombre, fraccion in PERCENTILES.items()
+    }
+    metricas.update(
+        peticiones=len(latencias) + errores,
+        errores=errores,
+        rps=round(len(latencias) / segundos, 1) if segundos else 0,
+    )
+    return metricas
+
+
+def comparar(actual, base, umbral):
+    """
+    Lista de (endpoint, modo, métrica, base, actual) que empeoraron:
+    p95 más de `umbral` (proporción) por encima, rps más de `umbral` por
+    debajo, y cualquier consulta SQL o error de más.
+    """
+    regresiones = []
+    for endpoint, medido in actual['endpoints'].items():
+        anterior = base['endpoints'].get(endpoint)
+        if anterior is None:
+            continue
+        if anterior.get('consultas') is not None and (medido.get('consultas') or 0) > anterior['consultas']:
+            regresiones.append((endpoint, '-', 'consultas', anterior['consultas'], medido['consultas']))
+        for modo in MODOS:
+            if modo not in medido or modo not in anterior:
+                continue
+            ahora, antes = medido[modo], anterior[modo]
+            if ahora['errores'] > antes['errores']:
+                regresiones.append((endpoint, modo, 'errores', antes['errores'], ahora['errores']))
+            if antes['p95'] is not None and ahora['p95'] is not None \
+                    and ahora['p95'] > antes['p95'] * (1 + umbral) + MARGEN_MS:
+                regresiones.append((endpoint, modo, 'p95', antes['p95'], ahora['p95']))
+            if ahora['rps'] < antes['rps'] / (1 + umbral):
+                regresiones.append((endpoint, modo, 'rps', antes['rps'], ahora['rps']))
+    return regresiones
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Peticiones:
+    """Peticiones de cada endpoint como (método, ruta, cuerpo JSON, autenticada)"""
+
+    def __init__(self, areas, desde):
+        self.areas = areas
+        self.desde = desde
+        self._altas = count()
+        self._candado = threading.Lock()
+
+    def __call__(self, endpoint):
+        if endpoint == 'lista':
+            return 'GET', '/api/registros/', None, True
+        if endpoint == 'dashboard':
+            return 'GET', '/api/registros/dashboard/', None, True
+        if endpoint == 'login':
+            return 'POST', '/api/auth/login/', {'username': 'bench_login', 'password': PASSWORD}, False
+        # Alta: (área, fecha, turno) nuevos hacia atrás desde el inicio del historial
+        with self._candado:
+            numero = next(self._altas)
+        dia, resto = divmod(numero, len(self.areas) * 3)
+        indice, turno = divmod(resto, 3)
+        return 'POST', '/api/registros/', {
+            'area': self.areas[indice],
+            'fecha': (self.desde - timedelta(days=dia + 1)).isoformat(),
+            'turno': 'ABC'[turno],
+            'plan_produccion': 1000,
+            'produccion_real': 850,
+            'hora_inicio': '06:00',
+            'hora_fin': '14:00',
+            'paradas': 15,
+            'motivo_parada': 'Cambio de formato',
+        }, True
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, throughput y consultas SQL de los endpoints principales y compara con una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--areas', type=int, default=8, help='Áreas del dataset sintético (default: 8)')
+        parser.add_argument('--anios', type=float, default=1, help='Años de historia del dataset (default: 1)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del dataset (default: 42)')
+        parser.add_argument(
+            '--peticiones', type=int, default=200,
+            help='Peticiones por endpoint y modo (default: 200)'
+        )
+        parser.add_argument(
+            '--peticiones-login', type=int, default=20,
+            help='Peticiones de login por modo; cada una calcula un hash (default: 20)'
+        )
+        parser.add_argument('--concurrencia', type=int, default=4, help='Clientes simultáneos (default: 4)')
+        parser.add_argument(
+            '--modos', default=','.join(MODOS),
+            help=f'Modos a medir separados por coma (default: {",".join(MODOS)})'
+        )
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help=f'Endpoints a medir separados por coma (default: {",".join(ENDPOINTS)})'
+        )
+        parser.add_argument('--guardar', help='Escribe los resultados en este JSON')
+        parser.add_argument('--baseline', help='JSON de una corrida anterior contra el cual comparar')
+        parser.add_argument(
+            '--umbral', type=float, default=0.25,
+            help='Empeoramiento tolerado en p95 y rps, como proporción (default: 0.25)'
+        )
+
+    def handle(self, *args, **options):
+        modos = self._lista(options['modos'], MODOS, '--modos')
+        endpoints = self._lista(options['endpoints'], ENDPOINTS, '--endpoints')
+        if options['concurrencia'] < 1 or options['peticiones'] < 1 or options['peticiones_login'] < 1:
+            raise CommandError('--concurrencia y --peticiones deben ser mayores que cero')
+        base = None
+        if options['baseline']:
+            try:
+                base = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer la línea base: {e}')
+
+        parametros = {
+            campo: options[campo]
+            for campo in ('areas', 'anios', 'semilla', 'peticiones', 'peticiones_login', 'concurrencia')
+        }
+        if base is not None and base.get('parametros') != parametros:
+            raise CommandError(
+                f"La línea base se midió con otros parámetros ({base.get('parametros')}); "
+                'repita con los mismos o guarde una nueva'
+            )
+
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(THROTTLE_ACTIVO=False, TAREAS_HILOS=0, TAREAS_DIR=directorio):
+            nombre_original = connection.settings_dict['NAME']
+            if connection.vendor == 'sqlite':
+                # En archivo (no en memoria) para que lo vean los hilos del servidor
+                connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'benchmark_api.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                resultados = self._medir(options, modos, endpoints)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        resultados['parametros'] = parametros
+        self._reportar(resultados, modos)
+        if options['guardar']:
+            Path(options['guardar']).write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(f"Resultados guardados en {options['guardar']}")
+
+        if base is not None:
+            regresiones = comparar(resultados, base, options['umbral'])
+            for endpoint, modo, metrica, antes, ahora in regresiones:
+                self.stdout.write(self.style.ERROR(
+                    f'  ✗ {endpoint} [{modo}] {metrica}: {antes} → {ahora}'
+                ))
+            if regresiones:
+                raise CommandError(f'Regresión de rendimiento en {len(regresiones)} métrica(s)')
+            self.stdout.write(f"Sin regresiones respecto de {options['baseline']} (umbral {options['umbral']:.0%})")
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark de la API finalizado'))
+
+    def _lista(self, valor, validos, opcion):
+        elegidos = [parte.strip() for parte in valor.split(',') if parte.strip()]
+        invalidos = [parte for parte in elegidos if parte not in validos]
+        if invalidos or not elegidos:
+            raise CommandError(f'{opcion}: valores válidos {", ".join(validos)}')
+        return elegidos
+
+    def _preparar(self, options):
+        """Dataset sintético, un administrador con token y un usuario para los logins"""
+        salida = StringIO()
+        call_command(
+            'generar_datos_prueba', '--areas', str(options['areas']), '--anios', str(options['anios']),
+            '--semilla', str(options['semilla']), '--hasta', HASTA.isoformat(), stdout=salida,
+        )
+        self.stdout.write(salida.getvalue().strip().splitlines()[0])
+        Usuario.objects.create_user('bench_api', password=PASSWORD, rol='administrador')
+        Usuario.objects.create_user('bench_login', password=PASSWORD, rol='operador')
+        respuesta = Client().post(
+            '/api/auth/login/', {'username': 'bench_api', 'password': PASSWORD}, content_type='application/json'
+        )
+        if respuesta.status_code != 200:
+            raise CommandError(f'No se pudo iniciar sesión ({respuesta.status_code}): {respuesta.content[:200]}')
+        areas = list(Area.objects.filter(codigo__startswith='GEN-').order_by('codigo').values_list('pk', flat=True))
+        desde = HASTA - timedelta(days=round(options['anios'] * 365) - 1)
+        return respuesta.json()['token'], Peticiones(areas, desde)
+
+    def _medir(self, options, modos, endpoints):
+        token, peticiones = self._preparar(options)
+        resultados = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base_de_datos': connection.vendor,
+            },
+            'endpoints': {},
+        }
+        servidor = None
+        if 'servidor' in modos:
+            servidor = ThreadedWSGIServer(('127.0.0.1', 0), _Silencioso, allow_reuse_address=False)
+            servidor.set_app(get_wsgi_application())
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        try:
+            for endpoint in endpoints:
+                medido = resultados['endpoints'][endpoint] = {
+                    'consultas': self._consultas(peticiones(endpoint), token),
+                }
+                cantidad = options['peticiones_login'] if endpoint == 'login' else options['peticiones']
+                for modo in modos:
+                    if modo == 'asgi':
+                        latencias, errores, segundos = asyncio.run(
+                            self._correr_asgi(peticiones, endpoint, token, cantidad, options['concurrencia'])
+                        )
+                    else:
+                        enviar = self._enviar_http(servidor) if modo == 'servidor' else self._enviar_cliente
+                        latencias, errores, segundos = self._correr_hilos(
+                            enviar, peticiones, endpoint, token, cantidad, options['concurrencia']
+                        )
+                    medido[modo] = resumir(latencias, errores, segundos)
+        finally:
+            if servidor is not None:
+                servidor.shutdown()
+                servidor.server_close()
+        return resultados
+
+    def _consultas(self, peticion, token):
+        """Consultas SQL de una petición (después de una de calentamiento)"""
+        metodo, ruta, cuerpo, autenticada = peticion
+        cliente = Client(HTTP_AUTHORIZATION=f'Token {token}' if autenticada else '')
+        if metodo == 'GET':
+            cliente.get(ruta)
+            with CaptureQueriesContext(connection) as consultas:
+                cliente.get(ruta)
+            return len(consultas)
+        # Las escrituras no se repiten igual: se mide la única petición
+        with CaptureQueriesContext(connection) as consultas:
+            cliente.post(ruta, cuerpo, content_type='application/json')
+        return len(consultas)
+
+    def _enviar_cliente(self, peticion, token):
+        metodo, ruta, cuerpo, autenticada = peticion
+        cliente = Client(HTTP_AUTHORIZATION=f'Token {token}' if autenticada else '')
+        if metodo == 'GET':
+            return cliente.get(ruta).status_code
+        return cliente.post(ruta, cuerpo, content_type='application/json').status_code
+
+    def _enviar_http(self, servidor):
+        host, puerto = servidor.server_address[:2]
+
+        def enviar(peticion, token):
+            metodo, ruta, cuerpo, autenticada = peticion
+            encabezados = {'Content-Type': 'application/json'}
+            if autenticada:
+                encabezados['Authorization'] = f'Token {token}'
+            conexion = http.client.HTTPConnection(host, puerto, timeout=60)
+            try:
+                conexion.request(metodo, ruta, json.dumps(cuerpo) if cuerpo is not None else None, encabezados)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                return respuesta.status
+            finally:
+                conexion.close()
+        return enviar
+
+    def _correr_hilos(self, enviar, peticiones, endpoint, token, cantidad, concurrencia):
+        """`cantidad` peticiones repartidas entre `concurrencia` hilos"""
+        latencias, errores = [], [0]
+        pendientes = count()
+        candado = threading.Lock()
+
+        def trabajador():
+            try:
+                while next(pendientes) < cantidad:
+                    peticion = peticiones(endpoint)
+                    inicio = time.perf_counter()
+                    try:
+                        estado = enviar(peticion, token)
+                    except Exception:
+                        estado = None
+                    duracion = time.perf_counter() - inicio
+                    with candado:
+                        if estado is not None and estado < 400:
+                            latencias.append(duracion)
+                        else:
+                            errores[0] += 1
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador) for _ in range(concurrencia)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return latencias, errores[0], time.perf_counter() - inicio
+
+    async def _correr_asgi(self, peticiones, endpoint, token, cantidad, concurrencia):
+        latencias, errores = [], 0
+        pendientes = count()
+
+        async def trabajador():
+            nonlocal errores
+            cliente = AsyncClient()
+            while next(pendientes) < cantidad:
+                metodo, ruta, cuerpo, autenticada = peticiones(endpoint)
+                encabezados = {'Authorization': f'Token {token}'} if autenticada else {}
+                inicio = time.perf_counter()
+                try:
+                    if metodo == 'GET':
+                        respuesta = await cliente.get(ruta, headers=encabezados)
+                    else:
+                        respuesta = await cliente.post(
+                            ruta, cuerpo, content_type='application/json', headers=encabezados
+                        )
+                    estado = respuesta.status_code
+                except Exception:
+                    estado = None
+                if estado is not None and estado < 400:
+                    latencias.append(time.perf_counter() - inicio)
+                else:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        return latencias, errores, time.perf_counter() - inicio
+
+    def _reportar(self, resultados, modos):
+        self.stdout.write(
+            f'{"Endpoint":<10} {"Modo":<9} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>8} {"Errores":>8} {"SQL":>5}'
+        )
+        for endpoint, medido in resultados['endpoints'].items():
+            for modo in modos:
+                metricas = medido[modo]
+                latencias = ' '.join(
+                    f'{metricas[nombre]:>6.1f}ms' if metricas[nombre] is not None else f'{"-":>8}'
+                    for nombre in PERCENTILES
+                )
+                self.stdout.write(
+                    f'{endpoint:<10} {modo:<9} {latencias} {metricas["rps"]:>8.1f} '
+                    f'{metricas["errores"]:>8} {medido["consultas"]:>5}'
+                )
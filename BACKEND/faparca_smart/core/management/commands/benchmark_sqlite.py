@@ -0,0 +1,150 @@
+# core/management/commands/benchmark_sqlite.py
+"""
+Mide el throughput de lecturas y escrituras concurrentes en SQLite con las
+opciones por defecto y con el perfil de producción (SQLITE_OPCIONES_PRODUCCION).
+
+Cada escritor repite la escritura de un operador (lee el resumen del área,
+inserta el registro y actualiza el resumen en una transacción); cada lector
+repite la consulta agregada del dashboard. Corre sobre archivos temporales:
+no toca la base de datos real.
+Uso: python manage.py benchmark_sqlite [--escritores 4] [--lectores 8] [--segundos 5]
+"""
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+AREAS = 8
+FILAS_INICIALES = 20000
+
+ESQUEMA = [
+    'CREATE TABLE registros (id INTEGER PRIMARY KEY, area_id INTEGER NOT NULL, turno TEXT NOT NULL, oee REAL NOT NULL)',
+    'CREATE INDEX registros_area ON registros (area_id)',
+    'CREATE TABLE resumenes (area_id INTEGER PRIMARY KEY, total INTEGER NOT NULL, suma_oee REAL NOT NULL)',
+]
+
+
+def _conexion(ruta, opciones):
+    """Conexión de Django (mismo backend, init_command y transaction_mode que el servidor)"""
+    # Un alias por proceso y archivo: cada corrida usa un archivo temporal nuevo
+    alias = f'benchmark_{os.getpid()}_{os.path.basename(os.path.dirname(ruta))}'
+    # configure_settings completa las claves por defecto (exige el alias 'default')
+    connections.settings[alias] = connections.configure_settings(
+        {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ruta, 'OPTIONS': opciones}}
+    )['default']
+    return alias
+
+
+def _preparar(ruta, opciones):
+    alias = _conexion(ruta, opciones)
+    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+        for sql in ESQUEMA:
+            cursor.execute(sql)
+        cursor.executemany(
+            'INSERT INTO registros (area_id, turno, oee) VALUES (%s, %s, %s)',
+            [(i % AREAS, 'ABC'[i % 3], (i * 7) % 100) for i in range(FILAS_INICIALES)],
+        )
+        cursor.execute(
+            'INSERT INTO resumenes SELECT area_id, COUNT(*), SUM(oee) FROM registros GROUP BY area_id'
+        )
+    connections[alias].close()
+
+
+def _escribir(cursor, i):
+    area_id = i % AREAS
+    cursor.execute('SELECT total FROM resumenes WHERE area_id = %s', [area_id])
+    cursor.fetchone()
+    cursor.execute('INSERT INTO registros (area_id, turno, oee) VALUES (%s, %s, %s)', [area_id, 'A', 80.0])
+    cursor.execute(
+        'UPDATE resumenes SET total = total + 1, suma_oee = suma_oee + %s WHERE area_id = %s', [80.0, area_id]
+    )
+
+
+def _leer(cursor, i):
+    cursor.execute('SELECT area_id, COUNT(*), AVG(oee) FROM registros WHERE area_id = %s GROUP BY turno', [i % AREAS])
+    cursor.fetchall()
+    cursor.execute('SELECT SUM(total), SUM(suma_oee) FROM resumenes')
+    cursor.fetchone()
+
+
+def _trabajador(ruta, opciones, rol, segundos, resultados):
+    alias = _conexion(ruta, opciones)
+    hechas, errores, latencias = 0, 0, []
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        inicio = time.perf_counter()
+        try:
+            if rol == 'escritor':
+                with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                    _escribir(cursor, hechas)
+            else:
+                # Como las vistas del dashboard: lecturas en autocommit, sin transacción
+                with connections[alias].cursor() as cursor:
+                    _leer(cursor, hechas)
+            hechas += 1
+            latencias.append(time.perf_counter() - inicio)
+        except OperationalError:
+            # "database is locked"
+            errores += 1
+    connections[alias].close()
+    resultados.put((rol, hechas, errores, latencias))
+
+
+class Command(BaseCommand):
+    help = 'Compara lecturas/escrituras concurrentes en SQLite sin y con el perfil de producción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=4, help='Procesos escritores (por defecto 4)')
+        parser.add_argument('--lectores', type=int, default=8, help='Procesos lectores (por defecto 8)')
+        parser.add_argument('--segundos', type=float, default=5, help='Duración de cada corrida (por defecto 5)')
+
+    def _correr(self, opciones, options):
+        contexto = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'benchmark.sqlite3')
+            _preparar(ruta, opciones)
+            resultados = contexto.Queue()
+            roles = ['escritor'] * options['escritores'] + ['lector'] * options['lectores']
+            procesos = [
+                contexto.Process(target=_trabajador, args=(ruta, opciones, rol, options['segundos'], resultados))
+                for rol in roles
+            ]
+            for proceso in procesos:
+                proceso.start()
+            por_rol = {'escritor': [0, 0, []], 'lector': [0, 0, []]}
+            for _ in procesos:
+                rol, hechas, errores, latencias = resultados.get()
+                por_rol[rol][0] += hechas
+                por_rol[rol][1] += errores
+                por_rol[rol][2].extend(latencias)
+            for proceso in procesos:
+                proceso.join()
+        return por_rol
+
+    def _reportar(self, titulo, por_rol, segundos):
+        self.stdout.write(titulo)
+        for rol, (hechas, errores, latencias) in por_rol.items():
+            latencias.sort()
+            p99 = latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0
+            p50 = statistics.median(latencias) * 1000 if latencias else 0
+            self.stdout.write(
+                f'  {rol + "es":<11} {hechas / segundos:>8,.0f} op/s | '
+                f'p50 {p50:.1f}ms | p99 {p99:.1f}ms | "database is locked": {errores}'
+            )
+
+    def handle(self, *args, **options):
+        # Los reintentos por lock cuentan como error: se acota la espera para ambos perfiles
+        timeout = settings.SQLITE_OPCIONES_PRODUCCION['timeout']
+        antes = self._correr({'timeout': timeout}, options)
+        despues = self._correr(settings.SQLITE_OPCIONES_PRODUCCION, options)
+        self.stdout.write(
+            f"{options['escritores']} escritores, {options['lectores']} lectores, {options['segundos']:g}s por corrida"
+        )
+        self._reportar('Opciones por defecto (journal DELETE, transacciones DEFERRED):', antes, options['segundos'])
+        self._reportar('Perfil de producción (WAL, IMMEDIATE, mmap, cache):', despues, options['segundos'])
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finalizado'))
@@ -0,0 +1,98 @@
+# core/management/commands/benchmark_throttle.py
+"""
+Mide el costo por petición de los throttles y cuántas peticiones dejan pasar
+con varios procesos: los de DRF (historial en el caché local de cada
+proceso) contra los contadores compartidos de core/throttling.py.
+Usa un archivo de contadores temporal: no toca los límites reales.
+Uso: python manage.py benchmark_throttle [--peticiones 5000] [--procesos 4]
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework import throttling as drf_throttling
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import throttling
+
+LIMITE_PROCESOS = 100
+
+
+def _peticion(user_id):
+    request = Request(APIRequestFactory().get('/api/registros/'))
+    request.user = SimpleNamespace(is_authenticated=True, pk=user_id)
+    return request
+
+
+def _throttle(clase, rate):
+    return type(clase.__name__, (clase,), {'rate': rate})()
+
+
+def _permitidas(clase, ruta, peticiones):
+    """Peticiones permitidas en un proceso para un mismo usuario con límite LIMITE_PROCESOS"""
+    with override_settings(THROTTLE_DB=ruta):
+        request = _peticion(1)
+        return sum(
+            _throttle(clase, f'{LIMITE_PROCESOS}/hour').allow_request(request, None)
+            for _ in range(peticiones)
+        )
+
+
+class Command(BaseCommand):
+    help = 'Compara los throttles de DRF con los contadores compartidos de ventana deslizante'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--peticiones',
+            type=int,
+            default=5000,
+            help='Peticiones del mismo usuario a medir (por defecto 5000)'
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=4,
+            help='Procesos simultáneos para la prueba de límite compartido (por defecto 4)'
+        )
+
+    def _medir(self, clase, peticiones):
+        """Microsegundos por chequeo; el límite es alto para que todas pasen"""
+        request = _peticion(999999)
+        inicio = time.perf_counter()
+        for _ in range(peticiones):
+            _throttle(clase, f'{peticiones * 10}/hour').allow_request(request, None)
+        return (time.perf_counter() - inicio) / peticiones * 1e6
+
+    def handle(self, *args, **options):
+        peticiones, procesos = options['peticiones'], options['procesos']
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'throttle.sqlite3')
+            with override_settings(THROTTLE_DB=ruta):
+                cache.delete('throttle_user_999999')
+                drf = self._medir(drf_throttling.UserRateThrottle, peticiones)
+                cache.delete('throttle_user_999999')
+                compartido = self._medir(throttling.UserRateThrottle, peticiones)
+
+            self.stdout.write(f'Costo por petición ({peticiones} peticiones del mismo usuario):')
+            self.stdout.write(f'  DRF (historial en caché):  {drf:,.1f} µs')
+            self.stdout.write(f'  Ventana deslizante SQLite: {compartido:,.1f} µs')
+
+            self.stdout.write(f'Límite {LIMITE_PROCESOS}/hora con {procesos} procesos:')
+            contexto = multiprocessing.get_context('fork')
+            for titulo, clase in (
+                ('DRF (caché por proceso)', drf_throttling.UserRateThrottle),
+                ('Contadores compartidos', throttling.UserRateThrottle),
+            ):
+                cache.delete('throttle_user_1')
+                with contexto.Pool(procesos) as pool:
+                    permitidas = sum(pool.starmap(
+                        _permitidas, [(clase, ruta, LIMITE_PROCESOS)] * procesos
+                    ))
+                self.stdout.write(f'  {titulo:<25} {permitidas} peticiones permitidas')
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finalizado'))
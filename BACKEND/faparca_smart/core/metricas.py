@@ -0,0 +1,297 @@
+# core/metricas.py
+"""
+Métricas de rendimiento por endpoint, en memoria del proceso.
+
+core.middleware.MetricasMiddleware abre una Medicion por petición (en una
+ContextVar, que asgiref copia al hilo de las vistas síncronas bajo ASGI) y
+el execute-wrapper que se instala en cada conexión nueva a la base
+(señal connection_created) le suma cada consulta: cantidad, tiempo y
+plantilla SQL (el SQL con %s, sin parámetros). Fuera de una petición el
+wrapper solo consulta la ContextVar y sigue.
+
+Al terminar la petición se acumula por vista (nombre de la ruta + método):
+histogramas de tiempo total, consultas, tiempo SQL y tamaño de respuesta,
+errores 5xx y peticiones con consultas repetidas (misma plantilla más de
+una vez, típico N+1). Los histogramas tienen cubetas fijas, así que la
+memoria no crece con el tráfico; los percentiles se estiman por cubeta.
+
+Una fracción de las peticiones (METRICAS_MUESTREO) y todas las lentas
+(METRICAS_LENTA_MS) dejan un perfil: sus consultas principales y, si la
+muestra se decidió al empezar y la vista es síncrona, el resumen de
+cProfile. Se guardan los últimos METRICAS_PERFILES en un buffer circular
+que se lee en /api/status/perfiles/.
+
+Los datos son por proceso: con varios workers cada uno reporta lo suyo
+(el pid va en la respuesta).
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+
+# Límites superiores de las cubetas (la última es el desborde)
+CUBETAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+CUBETAS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+CUBETAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+MAX_PLANTILLAS = 500  # Plantillas SQL distintas que se siguen a nivel global
+MAX_TRAZA = 200       # Consultas guardadas en la traza de una petición muestreada
+LARGO_SQL = 500       # Caracteres del SQL en las respuestas
+
+_medicion = ContextVar('medicion', default=None)
+_lock = threading.Lock()
+_vistas = {}
+_plantillas = {}
+_perfiles = deque(maxlen=100)
+_inicio = time.monotonic()
+_activo_desde = timezone.now()
+
+
+class Histograma:
+    """Conteo por cubetas fijas más total, suma y máximo"""
+    __slots__ = ('limites', 'cubetas', 'total', 'suma', 'maximo')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.total = 0
+        self.suma = 0
+        self.maximo = 0
+
+    def agregar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.suma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, fraccion):
+        """Límite superior de la cubeta que contiene el percentil (acotado por el máximo visto)"""
+        if not self.total:
+            return None
+        objetivo = fraccion * self.total
+        acumulado = 0
+        for indice, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo and cantidad:
+                return min(self.limites[indice], self.maximo) if indice < len(self.limites) else self.maximo
+        return self.maximo
+
+    def resumen(self, decimales=1):
+        if not self.total:
+            return {'media': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+        return {
+            'media': round(self.suma / self.total, decimales),
+            'p50': self.percentil(0.50),
+            'p95': self.percentil(0.95),
+            'p99': self.percentil(0.99),
+            'max': round(self.maximo, decimales),
+        }
+
+
+class EstadisticasVista:
+    __slots__ = ('peticiones', 'errores', 'duplicadas', 'tiempo', 'consultas', 'tiempo_sql', 'tamano',
+                 'ultima_duplicada')
+
+    def __init__(self):
+        self.peticiones = 0
+        self.errores = 0
+        self.duplicadas = 0
+        self.tiempo = Histograma(CUBETAS_MS)
+        self.consultas = Histograma(CUBETAS_CONSULTAS)
+        self.tiempo_sql = Histograma(CUBETAS_MS)
+        self.tamano = Histograma(CUBETAS_BYTES)
+        self.ultima_duplicada = None
+
+
+class Medicion:
+    """Consultas de una petición en curso"""
+    __slots__ = ('inicio', 'consultas', 'tiempo_sql', 'plantillas', 'traza', 'muestreada')
+
+    def __init__(self, muestreada=False):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.plantillas = {}  # sql -> [veces, segundos, máximo]
+        self.traza = [] if muestreada else None
+        self.muestreada = muestreada
+
+    def consulta(self, sql, segundos, many):
+        self.consultas += 1
+        self.tiempo_sql += segundos
+        plantilla = self.plantillas.get(sql)
+        if plantilla is None:
+            self.plantillas[sql] = [1, segundos, segundos]
+        else:
+            plantilla[0] += 1
+            plantilla[1] += segundos
+            if segundos > plantilla[2]:
+                plantilla[2] = segundos
+        if self.traza is not None and len(self.traza) < MAX_TRAZA:
+            self.traza.append((sql, segundos, many))
+
+
+def activas():
+    return getattr(settings, 'METRICAS_ACTIVAS', True)
+
+
+def iniciar(muestreada=False):
+    """Abre la medición de la petición actual; retorna el token para terminar()"""
+    return _medicion.set(Medicion(muestreada))
+
+
+def actual():
+    return _medicion.get()
+
+
+def envolver_consulta(execute, sql, params, many, context):
+    """execute-wrapper de las conexiones (ver core.apps)"""
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consulta(sql, time.perf_counter() - inicio, many)
+
+
+def instalar(connection, **kwargs):
+    """Receptor de connection_created: una vez por objeto de conexión"""
+    if envolver_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(envolver_consulta)
+
+
+def terminar(token, vista, metodo, ruta, estado, tamano, perfil=None):
+    """Cierra la medición y la acumula en las estadísticas de la vista"""
+    medicion = _medicion.get()
+    _medicion.reset(token)
+    if medicion is None:
+        return
+    duracion_ms = (time.perf_counter() - medicion.inicio) * 1000
+    sql_ms = medicion.tiempo_sql * 1000
+    repetidas = [(veces, sql) for sql, (veces, _, _) in medicion.plantillas.items() if veces > 1]
+
+    clave = f'{metodo} {vista}'
+    with _lock:
+        estadisticas = _vistas.get(clave)
+        if estadisticas is None:
+            estadisticas = _vistas[clave] = EstadisticasVista()
+        estadisticas.peticiones += 1
+        if estado >= 500:
+            estadisticas.errores += 1
+        estadisticas.tiempo.agregar(duracion_ms)
+        estadisticas.consultas.agregar(medicion.consultas)
+        estadisticas.tiempo_sql.agregar(sql_ms)
+        if tamano is not None:
+            estadisticas.tamano.agregar(tamano)
+        if repetidas:
+            estadisticas.duplicadas += 1
+            veces, sql = max(repetidas)
+            estadisticas.ultima_duplicada = {'sql': sql[:LARGO_SQL], 'veces': veces, 'ruta': ruta}
+
+        for sql, (veces, segundos, maximo) in medicion.plantillas.items():
+            plantilla = _plantillas.get(sql)
+            if plantilla is None:
+                if len(_plantillas) >= MAX_PLANTILLAS:
+                    continue
+                plantilla = _plantillas[sql] = [0, 0.0, 0.0]
+            plantilla[0] += veces
+            plantilla[1] += segundos
+            if maximo > plantilla[2]:
+                plantilla[2] = maximo
+
+    if medicion.muestreada or duracion_ms >= getattr(settings, 'METRICAS_LENTA_MS', 1000):
+        _guardar_perfil(medicion, clave, ruta, estado, duracion_ms, sql_ms, repetidas, perfil)
+
+
+def _guardar_perfil(medicion, clave, ruta, estado, duracion_ms, sql_ms, repetidas, perfil):
+    principales = sorted(medicion.plantillas.items(), key=lambda item: item[1][1], reverse=True)[:10]
+    registro = {
+        'fecha': timezone.now().isoformat(),
+        'vista': clave,
+        'ruta': ruta,
+        'estado': estado,
+        'ms': round(duracion_ms, 2),
+        'consultas': medicion.consultas,
+        'sql_ms': round(sql_ms, 2),
+        'duplicadas': sum(veces - 1 for veces, _ in repetidas),
+        'muestreada': medicion.muestreada,
+        'consultas_principales': [
+            {'sql': sql[:LARGO_SQL], 'veces': veces, 'ms': round(segundos * 1000, 2)}
+            for sql, (veces, segundos, _) in principales
+        ],
+    }
+    if medicion.traza is not None:
+        registro['traza'] = [
+            {'sql': sql[:LARGO_SQL], 'ms': round(segundos * 1000, 3), 'many': many}
+            for sql, segundos, many in medicion.traza
+        ]
+    if perfil is not None:
+        registro['perfil'] = perfil
+    maximo = getattr(settings, 'METRICAS_PERFILES', 100)
+    with _lock:
+        global _perfiles
+        if _perfiles.maxlen != maximo:
+            _perfiles = deque(_perfiles, maxlen=maximo)
+        _perfiles.append(registro)
+
+
+def estado(limite_consultas=20):
+    """Resumen de las vistas y de las consultas más costosas del proceso"""
+    with _lock:
+        vistas = {
+            clave: {
+                'peticiones': datos.peticiones,
+                'errores': datos.errores,
+                'con_duplicadas': datos.duplicadas,
+                'ultima_duplicada': datos.ultima_duplicada,
+                'tiempo_ms': datos.tiempo.resumen(),
+                'consultas': datos.consultas.resumen(),
+                'sql_ms': datos.tiempo_sql.resumen(),
+                'bytes': datos.tamano.resumen(0),
+            }
+            for clave, datos in _vistas.items()
+        }
+        costosas = sorted(_plantillas.items(), key=lambda item: item[1][1], reverse=True)[:limite_consultas]
+        perfiles = len(_perfiles)
+    return {
+        'pid': os.getpid(),
+        'activo_desde': _activo_desde.isoformat(),
+        'segundos_activo': round(time.monotonic() - _inicio),
+        'peticiones': sum(datos['peticiones'] for datos in vistas.values()),
+        'vistas': dict(sorted(vistas.items(), key=lambda item: item[1]['peticiones'], reverse=True)),
+        'consultas_costosas': [
+            {
+                'sql': sql[:LARGO_SQL],
+                'veces': veces,
+                'total_ms': round(segundos * 1000, 1),
+                'medio_ms': round(segundos * 1000 / veces, 2),
+                'max_ms': round(maximo * 1000, 2),
+            }
+            for sql, (veces, segundos, maximo) in costosas
+        ],
+        'perfiles_guardados': perfiles,
+    }
+
+
+def perfiles(vista=None):
+    """Perfiles guardados, del más reciente al más antiguo"""
+    with _lock:
+        guardados = list(_perfiles)
+    guardados.reverse()
+    if vista:
+        guardados = [perfil for perfil in guardados if vista in perfil['vista']]
+    return guardados
+
+
+def reiniciar():
+    with _lock:
+        _vistas.clear()
+        _plantillas.clear()
+        _perfiles.clear()
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorThrottle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255)),
+                ('ventana', models.BigIntegerField()),
+                ('cuenta', models.IntegerField(default=0)),
+                ('expira', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Contador de throttling',
+                'verbose_name_plural': 'Contadores de throttling',
+                'indexes': [models.Index(fields=['expira'], name='contador_throttle_expira_idx')],
+                'constraints': [models.UniqueConstraint(fields=('clave', 'ventana'), name='contador_throttle_clave_ventana')],
+            },
+        ),
+    ]
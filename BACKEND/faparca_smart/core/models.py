@@ -1,3 +1,36 @@
+# core/models.py
 from django.db import models
 
-# Create your models here.
+
+class ContadorThrottle(models.Model):
+    """
+    Contador de peticiones por clave y ventana de tiempo. Solo se usa cuando
+    la base principal no es SQLite (ver core/throttling.py).
+    """
+    clave = models.CharField(max_length=255)
+    ventana = models.BigIntegerField()
+    cuenta = models.IntegerField(default=0)
+    expira = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['clave', 'ventana'], name='contador_throttle_clave_ventana'),
+        ]
+        indexes = [models.Index(fields=['expira'], name='contador_throttle_expira_idx')]
+        verbose_name = "Contador de throttling"
+        verbose_name_plural = "Contadores de throttling"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de cambios de los datos, persistido en la base (una sola fila).
+    Lo incrementa core.versionado.marcar_cambio() al confirmarse cada
+    transacción que cambia datos; es el mismo para todos los procesos y no
+    expira.
+    """
+    numero = models.BigIntegerField(default=0)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versión de datos"
+        verbose_name_plural = "Versión de datos"
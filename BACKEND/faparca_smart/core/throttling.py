@@ -0,0 +1,191 @@
+# core/throttling.py
+"""
+Throttles de DRF con contadores de ventana deslizante compartidos.
+
+Los throttles de DRF guardan por cliente la lista completa de timestamps en
+el caché de Django y la reescriben en cada petición. Con el LocMemCache por
+defecto cada worker tiene sus propios contadores (el límite real se
+multiplica por la cantidad de procesos) y se pierden al reiniciar.
+
+Aquí cada clave guarda un contador por ventana fija en un archivo SQLite
+aparte (WAL, autocommit), visible para todos los procesos del servidor.
+El conteo de la ventana deslizante se estima en O(1) con la ventana actual
+y la anterior ponderada por el tiempo que aún la solapa:
+
+    estimado = anterior * (1 - transcurrido / duracion) + actual
+
+El incremento es un solo UPSERT ... RETURNING, atómico entre procesos.
+
+Ubicación del archivo (THROTTLE_DB): por defecto "<base sqlite>-throttle"
+junto a la base principal; si la base principal es en memoria (tests), los
+contadores también. Con PostgreSQL (y sin THROTTLE_DB) los contadores van en
+la tabla ContadorThrottle de la base principal, que ya es compartida y
+soporta el mismo UPSERT sin el lock global de escritura de SQLite.
+
+THROTTLE_ACTIVO = False deja pasar todas las peticiones sin tocar los
+contadores (los tests que cuentan consultas lo usan para que el resultado
+no dependa de dónde están los contadores).
+
+El mismo almacén guarda marcas: contadores sin ventana ni vencimiento que
+otros módulos usan para avisar a los demás procesos que descarten lo que
+tengan en caché (ver usuarios/cache_tokens.py). No dependen de
+THROTTLE_ACTIVO.
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import throttling
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS {tabla} (
+    clave TEXT NOT NULL,
+    ventana INTEGER NOT NULL,
+    cuenta INTEGER NOT NULL,
+    expira REAL NOT NULL,
+    PRIMARY KEY (clave, ventana)
+) WITHOUT ROWID
+"""
+
+SQL_INCREMENTAR = (
+    'INSERT INTO {tabla} (clave, ventana, cuenta, expira) VALUES (%s, %s, 1, %s) '
+    'ON CONFLICT (clave, ventana) DO UPDATE SET cuenta = {tabla}.cuenta + 1 '
+    'RETURNING cuenta'
+)
+SQL_ANTERIOR = 'SELECT cuenta FROM {tabla} WHERE clave = %s AND ventana = %s'
+SQL_DESCONTAR = 'UPDATE {tabla} SET cuenta = cuenta - 1 WHERE clave = %s AND ventana = %s'
+SQL_PURGAR = 'DELETE FROM {tabla} WHERE expira < %s'
+SQL_LIMPIAR = 'DELETE FROM {tabla}'
+TABLA_ARCHIVO = 'contadores'
+VENTANA_MARCA = -1  # Las ventanas de los contadores nunca son negativas
+SIN_VENCIMIENTO = 1e18
+
+_local = threading.local()
+_memoria = {}  # ruta -> conexión que mantiene viva la base en memoria compartida
+_memoria_lock = threading.Lock()
+_escrituras = itertools.count(1)
+
+
+def _en_base_principal():
+    return not getattr(settings, 'THROTTLE_DB', None) and connections['default'].vendor != 'sqlite'
+
+
+def _ruta():
+    ruta = getattr(settings, 'THROTTLE_DB', None)
+    if ruta:
+        return str(ruta)
+    principal = connections['default']
+    if principal.is_in_memory_db():
+        return f'file:oee_throttle_{os.getpid()}?mode=memory&cache=shared'
+    return f"{principal.settings_dict['NAME']}-throttle"
+
+
+def _abrir(ruta):
+    en_memoria = ruta.startswith('file:')
+    conexion = sqlite3.connect(ruta, uri=en_memoria, isolation_level=None, timeout=5, check_same_thread=False)
+    if not en_memoria:
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+    conexion.execute(ESQUEMA.format(tabla=TABLA_ARCHIVO))
+    if en_memoria:
+        with _memoria_lock:
+            _memoria.setdefault(ruta, conexion)
+    return conexion
+
+
+def _conexion():
+    """Una conexión por hilo y proceso (las conexiones sqlite3 no sobreviven a un fork)"""
+    ruta = _ruta()
+    actual = getattr(_local, 'conexion', None)
+    if actual is None or _local.ruta != ruta or _local.pid != os.getpid():
+        _local.conexion, _local.ruta, _local.pid = _abrir(ruta), ruta, os.getpid()
+    return _local.conexion
+
+
+def _ejecutar(sql, parametros=(), resultado=False):
+    """Ejecuta en la tabla de la base principal o en el archivo SQLite de contadores"""
+    if _en_base_principal():
+        from .models import ContadorThrottle
+        with connections['default'].cursor() as cursor:
+            cursor.execute(sql.format(tabla=ContadorThrottle._meta.db_table), parametros)
+            return cursor.fetchone() if resultado else None
+    cursor = _conexion().execute(sql.format(tabla=TABLA_ARCHIVO).replace('%s', '?'), parametros)
+    return cursor.fetchone() if resultado else None
+
+
+def _espera(anterior, actual, limite, duracion, transcurrido):
+    """Segundos hasta que el estimado baje del límite"""
+    if actual >= limite:
+        # Hay que pasar a la ventana siguiente, donde la actual pasa a ser la anterior
+        return duracion - transcurrido + max(0.0, 1 - limite / actual) * duracion
+    if anterior:
+        return max(0.0, (1 - (limite - actual) / anterior) * duracion - transcurrido)
+    return 0.0
+
+
+def registrar(clave, limite, duracion, ahora=None):
+    """
+    Cuenta una petición para la clave. Retorna (permitida, espera): si se
+    rechaza, la petición no queda contada y espera es la cantidad de
+    segundos sugerida para reintentar.
+    """
+    ahora = time.time() if ahora is None else ahora
+    ventana = int(ahora // duracion)
+    transcurrido = ahora - ventana * duracion
+    actual = _ejecutar(SQL_INCREMENTAR, (clave, ventana, (ventana + 2) * duracion), resultado=True)[0]
+    fila = _ejecutar(SQL_ANTERIOR, (clave, ventana - 1), resultado=True)
+    anterior = fila[0] if fila else 0
+
+    if next(_escrituras) % getattr(settings, 'THROTTLE_LIMPIEZA_CADA', 1000) == 0:
+        _ejecutar(SQL_PURGAR, (ahora,))
+
+    previas = actual - 1
+    if anterior * (1 - transcurrido / duracion) + previas < limite:
+        return True, None
+    # Rechazada: se descuenta para que los reintentos no extiendan el bloqueo
+    _ejecutar(SQL_DESCONTAR, (clave, ventana))
+    return False, _espera(anterior, previas, limite, duracion, transcurrido)
+
+
+def limpiar():
+    """Borra todos los contadores y marcas"""
+    _ejecutar(SQL_LIMPIAR)
+
+
+def incrementar_marca(clave):
+    """Incrementa la marca compartida y retorna su nuevo valor"""
+    return _ejecutar(SQL_INCREMENTAR, (clave, VENTANA_MARCA, SIN_VENCIMIENTO), resultado=True)[0]
+
+
+def leer_marca(clave):
+    """Valor actual de la marca (0 si nunca se incrementó)"""
+    fila = _ejecutar(SQL_ANTERIOR, (clave, VENTANA_MARCA), resultado=True)
+    return fila[0] if fila else 0
+
+
+class VentanaDeslizanteMixin:
+    """Reemplaza el historial en caché de SimpleRateThrottle por los contadores compartidos"""
+
+    def allow_request(self, request, view):
+        if self.rate is None or not getattr(settings, 'THROTTLE_ACTIVO', True):
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        permitida, self.espera = registrar(self.key, self.num_requests, self.duration)
+        return permitida
+
+    def wait(self):
+        return getattr(self, 'espera', None)
+
+
+class AnonRateThrottle(VentanaDeslizanteMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(VentanaDeslizanteMixin, throttling.UserRateThrottle):
+    pass
@@ -0,0 +1,156 @@
+# core/versionado.py
+"""
+Versión de los datos y caché de respuestas con ETag.
+
+Cada escritura de RegistroOEE o Area (incluidas las rutas masivas) cambia
+la versión de los datos. Los endpoints del dashboard, consultados cada
+pocos segundos por las pantallas de planta, guardan su respuesta bajo esa
+versión y emiten un ETag fuerte derivado de ella: mientras no haya
+cambios, un If-None-Match se contesta con 304 leyendo solo la versión.
+
+La versión es un contador en la base (core.models.VersionDatos, una fila
+leída por clave primaria, que marcar_cambio() incrementa una vez por
+transacción al confirmarse), no una entrada del caché: con el LocMemCache
+por defecto cada proceso tiene su propio caché, y una versión guardada ahí
+no se enteraría de lo que escriben los otros workers o los comandos de
+gestión. El caché (CACHES) solo guarda respuestas bajo claves que incluyen
+la versión, así que puede ser local a cada proceso sin servir datos viejos.
+El mismo contador forma la clave de los archivos de tareas/cola.py.
+"""
+import hashlib
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+PREFIJO_RESPUESTA = 'oee:respuesta:'
+
+# Versión ya leída por cache_por_version, reutilizada durante la vista
+_version_peticion = ContextVar('version_peticion', default=None)
+
+
+def _ttl_respuesta():
+    return getattr(settings, 'RESPUESTA_CACHE_TTL', 300)
+
+
+def version_persistente(using=None):
+    """Contador de cambios guardado en la base (0 si todavía no hubo cambios)"""
+    from .models import VersionDatos
+    return VersionDatos.objects.using(using).filter(pk=1).values_list('numero', flat=True).first() or 0
+
+
+def version_actual(using=None):
+    """Versión vigente de los datos, como texto para claves y ETags"""
+    version = _version_peticion.get()
+    if version is None or using is not None:
+        version = str(version_persistente(using))
+    return version
+
+
+def _incrementar_version_persistente(using=None):
+    from .models import VersionDatos
+    versiones = VersionDatos.objects.using(using)
+    if not versiones.filter(pk=1).update(numero=F('numero') + 1, actualizada=timezone.now()):
+        versiones.bulk_create([VersionDatos(pk=1)], ignore_conflicts=True)
+        versiones.filter(pk=1).update(numero=F('numero') + 1, actualizada=timezone.now())
+
+
+def nueva_version(using=None):
+    """Cambia la versión de los datos de inmediato"""
+    _incrementar_version_persistente(using)
+
+
+def marcar_cambio(using=None):
+    """
+    Cambia la versión de los datos al confirmarse la transacción actual,
+    una sola vez aunque la transacción escriba muchas filas. El UPDATE del
+    contador va fuera de la transacción del cambio: dentro, en PostgreSQL,
+    la fila del contador quedaría bloqueada hasta el COMMIT y todas las
+    escrituras concurrentes harían cola detrás. Hasta confirmar, otras
+    conexiones ven los datos viejos y la versión vieja sigue siendo
+    correcta; si el proceso cae entre el COMMIT y el incremento, la
+    versión cambia con la próxima escritura.
+    """
+    alias = using or DEFAULT_DB_ALIAS
+    conexion = connections[alias]
+    bloque = _bloque_exterior(conexion)
+    registrado = getattr(bloque, '_incremento_version', None)
+    # Ya registrado en esta transacción y todavía en su cola (un rollback lo descarta)
+    if registrado is not None and any(funcion is registrado for _, funcion, _ in conexion.run_on_commit):
+        return
+    incrementar = partial(_incrementar_version_persistente, alias)
+    if bloque is not None:
+        bloque._incremento_version = incrementar
+    transaction.on_commit(incrementar, using=alias)
+
+
+def _bloque_exterior(conexion):
+    """
+    Bloque atomic() que abrió la transacción en curso (None en autocommit).
+    Se saltean los que abre el TestCase de Django, que nunca confirman.
+    """
+    for bloque in conexion.atomic_blocks:
+        if not getattr(bloque, '_from_testcase', False):
+            return bloque
+    return None
+
+
+def _etag(nombre, request, version, alcance):
+    partes = [nombre, version, request.get_full_path(), str(alcance), timezone.localdate().isoformat()]
+    return '"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+def _coincide(request, etag):
+    encabezado = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [valor.strip() for valor in encabezado.split(',')]
+
+
+def _con_etag(response, etag):
+    response['ETag'] = etag
+    # El navegador guarda la respuesta pero revalida siempre con If-None-Match
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cache_por_version(alcance=None):
+    """
+    Decorador para acciones de solo lectura de un ViewSet. La respuesta se
+    cachea por versión de datos, ruta completa (incluye el query string),
+    día local y alcance (función opcional request -> valor hashable que
+    distingue lo que puede ver cada usuario). Las respuestas con
+    Cache-Control: no-store no se cachean ni llevan ETag.
+    """
+    def decorador(vista):
+        nombre = f'{vista.__module__}.{vista.__qualname__}'
+
+        @wraps(vista)
+        def envoltura(self, request, *args, **kwargs):
+            version = version_actual()
+            etag = _etag(nombre, request, version, alcance(request) if alcance else None)
+            if _coincide(request, etag):
+                return _con_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+            clave = PREFIJO_RESPUESTA + etag.strip('"')
+            datos = cache.get(clave)
+            if datos is not None:
+                return _con_etag(Response(datos), etag)
+
+            token = _version_peticion.set(version)
+            try:
+                response = vista(self, request, *args, **kwargs)
+            finally:
+                _version_peticion.reset(token)
+            # no-store: la vista indica que la respuesta no debe reutilizarse
+            if response.status_code == status.HTTP_200_OK and 'no-store' not in response.get('Cache-Control', ''):
+                cache.set(clave, response.data, _ttl_respuesta())
+                _con_etag(response, etag)
+            return response
+
+        return envoltura
+    return decorador
@@ -1,3 +1,282 @@
-from django.shortcuts import render
+# core/views.py
+"""
+Canal en vivo del dashboard (Server-Sent Events) y endpoints de estado del
+servidor (/api/health/ y /api/status/, ver core/metricas.py).
 
-# Create your views here.
+Es una vista asíncrona: bajo el servidor ASGI cada cliente conectado es
+una corrutina esperando en su cola del broker, sin ocupar un hilo, así un
+solo worker atiende cientos de pantallas. Bajo WSGI (runserver) un flujo
+infinito bloquearía un hilo por cliente, por eso responde 503.
+
+EventSource no permite encabezados propios. Para no poner el token de
+sesión en la URL (logs de acceso, historial), el cliente pide antes un
+ticket con POST /api/eventos/ticket/ y abre ?ticket=: está firmado, vale
+EVENTOS_TICKET_SEGUNDOS y solo sirve para abrir el canal. Los clientes que
+sí pueden mandar encabezados usan el Authorization habitual.
+
+El flujo puede durar horas, así que la sesión se revalida cada
+EVENTOS_KEEPALIVE_SEGUNDOS: si el token venció, fue revocado, el usuario
+se desactivó o cambiaron sus áreas, se envía "event: sesion" y se cierra
+el canal (el cliente pide otro ticket). Entre revalidaciones solo se lee
+la marca compartida del usuario (ver usuarios/cache_tokens.py); la base
+se consulta cuando la marca cambió.
+
+Los usuarios con alcance restringido se suscriben solo a los canales de
+sus áreas (ver usuarios/alcance.py y registros/tiempo_real.py).
+
+Con el broker por defecto (BrokerLocal) cada proceso solo reparte los
+eventos de las escrituras que atendió él mismo: con varios workers un
+cliente no se entera de lo que se guardó en otro. Para más de un worker
+hay que configurar OEE_BROKER con un broker compartido (ver core/broker.py).
+"""
+import hashlib
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import permissions, status as estados
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+
+from usuarios import alcance, cache_tokens, tokens_firmados
+from usuarios.authentication import ExpiringTokenAuthentication
+from usuarios.models import Usuario
+from . import metricas, versionado
+from .broker import CANAL_DASHBOARD, canal_area, evento_sse, obtener_broker
+
+logger = logging.getLogger(__name__)
+
+SALT_TICKET = 'core.views.eventos'
+
+
+def _clave_token(request):
+    partes = request.headers.get('Authorization', '').split()
+    if len(partes) == 2 and partes[0].lower() == 'token':
+        return partes[1]
+    return None
+
+
+def _huella(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _sesion(usuario, auth):
+    """Lo necesario para revalidar la sesión del canal sin guardar el token"""
+    if isinstance(auth, dict):
+        # Token firmado: sus datos ya verificados
+        return {'u': usuario.pk, 'iat': auth['iat'], 'exp': auth['exp']}
+    vence = auth.created.timestamp() + getattr(settings, 'TOKEN_EXPIRED_AFTER_SECONDS', 86400)
+    return {'u': usuario.pk, 'h': _huella(auth.key), 'exp': vence}
+
+
+def _validar_sesion(sesion):
+    """(usuario, áreas visibles) leídos de la base si la sesión sigue vigente, o None"""
+    if sesion['exp'] < time.time():
+        return None
+    usuario = Usuario.objects.filter(pk=sesion['u']).first()
+    if usuario is None or not usuario.is_active or not usuario.activo:
+        return None
+    if 'h' in sesion:
+        claves = Token.objects.filter(user_id=usuario.pk).values_list('key', flat=True)
+        if not any(_huella(clave) == sesion['h'] for clave in claves):
+            return None
+    else:
+        try:
+            tokens_firmados.comprobar_revocacion(sesion, usuario)
+        except tokens_firmados.TokenFirmadoInvalido:
+            return None
+    alcance.invalidar([usuario.pk])
+    return usuario, alcance.areas_visibles(usuario)
+
+
+def _abrir_sesion(request):
+    """(sesion, áreas, marca) para el ticket o el encabezado de la petición; lanza AuthenticationFailed"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            sesion = signing.loads(
+                ticket, salt=SALT_TICKET, max_age=getattr(settings, 'EVENTOS_TICKET_SEGUNDOS', 30)
+            )
+        except signing.BadSignature:
+            raise AuthenticationFailed('Ticket inválido o vencido.')
+    else:
+        clave = _clave_token(request)
+        if not clave:
+            raise AuthenticationFailed('Ticket requerido')
+        sesion = _sesion(*ExpiringTokenAuthentication().authenticate_credentials(clave))
+    # La marca se lee antes que la base: un cambio entre medio se ve en la primera revalidación
+    marca = cache_tokens.marca(sesion['u'])
+    validada = _validar_sesion(sesion)
+    if validada is None:
+        raise AuthenticationFailed('Sesión vencida o revocada.')
+    return sesion, validada[1], marca
+
+
+class _Revalidacion:
+    """Comprueba que la sesión del canal siga vigente; la base solo si cambió la marca del usuario"""
+
+    def __init__(self, sesion, areas, marca):
+        self.sesion = sesion
+        self.areas = areas
+        self.marca = marca
+
+    def __call__(self):
+        if self.sesion['exp'] < time.time():
+            return False
+        marca = cache_tokens.marca(self.sesion['u'])
+        if marca == self.marca:
+            return True
+        self.marca = marca
+        validada = _validar_sesion(self.sesion)
+        return validada is not None and validada[1] == self.areas
+
+
+async def _flujo(suscripcion, vigente, cada):
+    try:
+        # El navegador reintenta la conexión a los 3 s si se corta
+        yield 'retry: 3000\n\n'
+        revisada = time.monotonic()
+        async for mensaje in suscripcion:
+            if time.monotonic() - revisada >= cada:
+                revisada = time.monotonic()
+                if not await sync_to_async(vigente)():
+                    yield evento_sse('sesion', {'error': 'Sesión vencida o revocada'})
+                    return
+            # El comentario mantiene viva la conexión a través de proxies
+            yield ': ping\n\n' if mensaje is None else mensaje
+    finally:
+        # Al desconectarse el cliente Django cancela el flujo
+        suscripcion.cerrar()
+
+
+@require_GET
+async def eventos(request):
+    """Flujo text/event-stream con los cambios de registros y KPIs"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'El canal en vivo requiere el servidor ASGI (oee_system.asgi)'},
+            status=503
+        )
+
+    try:
+        sesion, areas, marca = await sync_to_async(_abrir_sesion)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=401)
+
+    canales = CANAL_DASHBOARD if areas is None else [canal_area(area_id) for area_id in sorted(areas)]
+    cada = getattr(settings, 'EVENTOS_KEEPALIVE_SEGUNDOS', 15)
+    # Se suscribe ya, para no perder los cambios que lleguen antes del primer envío
+    suscripcion = obtener_broker().suscribir(canales, espera=cada)
+    response = StreamingHttpResponse(
+        _flujo(suscripcion, _Revalidacion(sesion, areas, marca), cada), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Sin buffer en nginx
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def ticket_eventos(request):
+    """Ticket de corta duración para abrir /api/eventos/ sin poner el token en la URL"""
+    duracion = getattr(settings, 'EVENTOS_TICKET_SEGUNDOS', 30)
+    return Response({
+        'ticket': signing.dumps(_sesion(request.user, request.auth), salt=SALT_TICKET),
+        'expires_in': duracion,
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([])
+def health(request):
+    """
+    Chequeo para balanceadores y monitoreo: base de datos y caché.
+    Sin autenticación ni throttling; 503 si algún componente falla. Solo
+    informa 'ok' o 'error': el detalle va al log y a /api/status/.
+    """
+    inicio = time.perf_counter()
+    componentes = {nombre: 'ok' if error is None else 'error' for nombre, error in _componentes().items()}
+    sano = all(valor == 'ok' for valor in componentes.values())
+    return Response(
+        {'status': 'ok' if sano else 'error', **componentes, 'ms': round((time.perf_counter() - inicio) * 1000, 2)},
+        status=estados.HTTP_200_OK if sano else estados.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+def _componentes():
+    """Estado de la base de datos y del caché: {nombre: None si responde, o el error}"""
+    errores = {'database': None, 'cache': None}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as e:
+        logger.exception('Health check: la base de datos no responde')
+        errores['database'] = str(e)
+    try:
+        cache.set('health_check', 1, 10)
+        if cache.get('health_check') != 1:
+            logger.error('Health check: el caché no devuelve lo guardado')
+            errores['cache'] = 'sin respuesta'
+    except Exception as e:
+        logger.exception('Health check: el caché no responde')
+        errores['cache'] = str(e)
+    return errores
+
+
+def _solo_administradores(request):
+    if request.user.is_staff or request.user.rol == 'administrador':
+        return None
+    return Response(
+        {'error': 'Solo administradores pueden ver las métricas del servidor'},
+        status=estados.HTTP_403_FORBIDDEN
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def status(request):
+    """Métricas por endpoint y consultas más costosas de este proceso"""
+    denegado = _solo_administradores(request)
+    if denegado:
+        return denegado
+    return Response({
+        'status': 'ok',
+        'componentes': {nombre: error or 'ok' for nombre, error in _componentes().items()},
+        'metricas_activas': metricas.activas(),
+        'base_de_datos': connection.vendor,
+        'version_datos': versionado.version_actual(),
+        **metricas.estado(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def perfiles(request):
+    """Perfiles muestreados y de peticiones lentas (?vista= filtra por nombre)"""
+    denegado = _solo_administradores(request)
+    if denegado:
+        return denegado
+    return Response(metricas.perfiles(request.query_params.get('vista')))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reiniciar_metricas(request):
+    """Vacía histogramas, consultas y perfiles (p. ej. antes de medir un cambio)"""
+    denegado = _solo_administradores(request)
+    if denegado:
+        return denegado
+    metricas.reiniciar()
+    return Response({'message': 'Métricas reiniciadas'})
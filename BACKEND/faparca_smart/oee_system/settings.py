@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,9 +54,12 @@ INSTALLED_APPS = [
     'areas',
     'registros', 
     'usuarios',
+    'reportes',
+    'tareas',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',  # Primero: mide toda la cadena (ver core/metricas.py)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,8 +80,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        # Contadores de ventana deslizante compartidos entre procesos (ver core/throttling.py)
+        'core.throttling.AnonRateThrottle',
+        'core.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -85,9 +91,51 @@ REST_FRAMEWORK = {
     }
 }
 
+# Archivo SQLite de los contadores de throttling, compartido por los workers.
+# None: "<base sqlite>-throttle" junto a la base principal, o la tabla
+# ContadorThrottle si la base principal es PostgreSQL (ver core/throttling.py)
+THROTTLE_DB = None
+THROTTLE_ACTIVO = True
+
 # Token Configuration
 TOKEN_EXPIRED_AFTER_SECONDS = 86400  # 24 horas
 TOKEN_REFRESH_AFTER_SECONDS = 3600   # 1 hora
+TOKEN_MODO = 'db'  # 'db' (tabla authtoken) o 'firmado' (HMAC, sin consultas; ver usuarios/tokens_firmados.py)
+ULTIMO_ACCESO_INTERVALO = 60  # Segundos entre escrituras del último acceso (hilo de fondo, ver usuarios/cache_tokens.py)
+
+# Archivo histórico: días que los registros OEE permanecen en la tabla activa
+# antes de que archivar_registros los mueva (ver registros/archivo.py)
+ARCHIVO_HORIZONTE_DIAS = config('ARCHIVO_HORIZONTE_DIAS', default=365, cast=int)
+
+# Canal en vivo /api/eventos/ (ver core/views.py). BrokerLocal solo reparte
+# los eventos dentro de cada proceso: con más de un worker OEE_BROKER tiene
+# que apuntar a un broker compartido con la misma interfaz (core/broker.py)
+OEE_BROKER = 'core.broker.BrokerLocal'
+EVENTOS_KEEPALIVE_SEGUNDOS = 15  # Keep-alive y revalidación de la sesión
+EVENTOS_TICKET_SEGUNDOS = 30     # Validez del ticket para abrir el canal
+
+# Reportes materializados: los días tocados por cada escritura se refrescan
+# al confirmarla, en un hilo de fondo (ver reportes/materializacion.py)
+REPORTES_REFRESCO_EN_SEGUNDO_PLANO = True
+
+# Tareas en segundo plano (ver tareas/cola.py). TAREAS_HILOS: hilos del pool
+# embebido en cada proceso web; 0 si corren workers dedicados (procesar_tareas)
+TAREAS_HILOS = config('TAREAS_HILOS', default=2, cast=int)
+TAREAS_DIR = config('TAREAS_DIR', default=str(BASE_DIR / 'tareas_resultados'))
+TAREAS_RETENCION_HORAS = 24  # Resultados guardados en disco
+TAREAS_LATIDO_MAXIMO = 300   # Segundos sin latido para dar por muerto al worker
+TAREAS_LATIDO_INTERVALO = 30  # Latido de las tareas en curso, aunque no informen avance
+TAREAS_MAX_INTENTOS = 3
+
+# Métricas por endpoint en memoria (ver core/metricas.py y /api/status/).
+# METRICAS_MUESTREO: fracción de peticiones que guardan su traza SQL y
+# perfil de cProfile; las que tardan más de METRICAS_LENTA_MS se guardan
+# siempre (sin cProfile)
+METRICAS_ACTIVAS = config('METRICAS_ACTIVAS', default=True, cast=bool)
+METRICAS_MUESTREO = config('METRICAS_MUESTREO', default=0.01, cast=float)
+METRICAS_CPROFILE = config('METRICAS_CPROFILE', default=True, cast=bool)
+METRICAS_LENTA_MS = config('METRICAS_LENTA_MS', default=1000, cast=int)
+METRICAS_PERFILES = 100  # Perfiles que se conservan (los más recientes)
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
@@ -134,6 +182,65 @@ DATABASES = {
     }
 }
 
+# Perfil de base de datos: 'desarrollo' (opciones por defecto) o 'produccion'.
+# En producción cada conexión nueva configura SQLite para lecturas y
+# escrituras concurrentes:
+# - WAL: las lecturas no bloquean a la escritura ni al revés
+# - synchronous=NORMAL: con WAL sigue siendo consistente ante caídas; solo
+#   puede perder las últimas transacciones ante un corte de energía
+# - mmap_size / cache_size: páginas en memoria en lugar de read() por página
+# - transaction_mode IMMEDIATE: las transacciones toman el lock de escritura
+#   al empezar, así un lector que luego escribe espera su turno (timeout)
+#   en lugar de fallar con "database is locked"
+# - timeout: busy timeout en segundos
+# - CONN_MAX_AGE: conexiones persistentes (no reabrir ni repetir los PRAGMA
+#   en cada petición)
+DB_PERFIL = config('DB_PERFIL', default='desarrollo')
+
+SQLITE_OPCIONES_PRODUCCION = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={config('SQLITE_MMAP_MB', default=256, cast=int) * 1024 * 1024}",
+        f"PRAGMA cache_size=-{config('SQLITE_CACHE_MB', default=64, cast=int) * 1024}",  # negativo: KiB
+        'PRAGMA temp_store=MEMORY',
+    ]),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int),
+}
+
+if DB_PERFIL == 'produccion':
+    DATABASES['default'].update({
+        'OPTIONS': SQLITE_OPCIONES_PRODUCCION,
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# PostgreSQL (DB_ENGINE=postgresql): datos de conexión por variables de
+# entorno y pool de conexiones nativo de Django con psycopg 3 (cada worker
+# reutiliza hasta DB_POOL_MAX conexiones; el pool reemplaza a CONN_MAX_AGE,
+# que debe quedar en 0). Las exportaciones usan cursores del lado del
+# servidor (iterator()), así que no se debe desactivarlos salvo detrás de
+# un pgbouncer en modo transacción (DB_DISABLE_SERVER_SIDE_CURSORS).
+if config('DB_ENGINE', default='sqlite') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('DB_NAME', default='faparca_smart'),
+        'USER': config('DB_USER', default='postgres'),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': 0,
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+        'OPTIONS': {
+            'pool': {
+                'min_size': config('DB_POOL_MIN', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX', default=10, cast=int),
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+            },
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -186,6 +293,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'usuarios.Usuario'
 
+# ModelBackend con aauthenticate() que verifica el hash fuera del event loop
+AUTHENTICATION_BACKENDS = ['usuarios.backends.UsuarioBackend']
+
 # Security settings for production
 # SECURE_SSL_REDIRECT = True  # Uncomment in production
 # SESSION_COOKIE_SECURE = True  # Uncomment in production
@@ -4,15 +4,34 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from areas.views import AreaViewSet
 from usuarios.views import UsuarioViewSet, AuthViewSet
-from registros.views import RegistroOEEViewSet
+from registros.views import RegistroOEEViewSet, DashboardViewSet
+from reportes.views import ReporteViewSet
+from tareas.views import TareaViewSet
+from core.views import eventos, health, perfiles, reiniciar_metricas, status, ticket_eventos
+from usuarios import auth_async
 
 router = DefaultRouter()
 router.register(r'areas', AreaViewSet)
 router.register(r'usuarios', UsuarioViewSet)
 router.register(r'auth', AuthViewSet, basename='auth')
 router.register(r'registros', RegistroOEEViewSet)
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'reportes', ReporteViewSet, basename='reportes')
+router.register(r'tareas', TareaViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/eventos/', eventos, name='eventos'),
+    path('api/eventos/ticket/', ticket_eventos, name='eventos-ticket'),
+    path('api/health/', health, name='health'),
+    path('api/status/', status, name='status'),
+    path('api/status/perfiles/', perfiles, name='status-perfiles'),
+    path('api/status/reiniciar/', reiniciar_metricas, name='status-reiniciar'),
+    # Login/registro/cambio de contraseña async (hash fuera del event loop).
+    # Reemplazan a las acciones de DRF en las mismas rutas y con los mismos
+    # nombres de URL; van antes del router para que lo tapen
+    path('api/auth/login/', auth_async.login, name='auth-login'),
+    path('api/auth/register/', auth_async.register, name='auth-register'),
+    path('api/usuarios/<int:pk>/change_password/', auth_async.change_password, name='usuario-change-password'),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,222 @@
+# registros/archivo.py
+"""
+Archivo histórico de registros OEE (tabla activa / tabla de archivo).
+
+Los registros con fecha anterior al horizonte (ARCHIVO_HORIZONTE_DIAS) se
+mueven por lotes de RegistroOEE a RegistroOEEArchivado conservando su id.
+El movimiento es un INSERT ... SELECT más un DELETE sin señales, de modo
+que los resúmenes (que cuentan ambos niveles) no cambian: el dashboard y
+los totales siguen viendo todo el histórico. RegistroOEE queda acotado al
+período de trabajo y sus índices caben en memoria.
+
+Los registros archivados son de solo lectura y no se recalculan si cambia
+la capacidad del área (son la foto de lo que se reportó).
+
+Lecturas: la lista, la exportación y las tendencias suman el archivo solo
+si el rango de fechas pedido empieza antes del corte (la primera fecha no
+archivada); en ese caso ambas tablas se consultan con los mismos filtros y
+se unen con UNION ALL en una sola consulta.
+"""
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from core import versionado
+from .models import RegistroOEE, RegistroOEEArchivado, ResumenDiario
+from . import resumenes
+
+PREFIJO_CORTE = 'oee:archivo_corte:'
+SIN_ARCHIVO = 'sin_archivo'
+
+
+def horizonte():
+    """Fecha desde la cual los registros permanecen en la tabla activa"""
+    return timezone.localdate() - timedelta(days=getattr(settings, 'ARCHIVO_HORIZONTE_DIAS', 365))
+
+
+def corte():
+    """
+    Primera fecha posterior a todo el archivo (None si está vacío). Se
+    cachea por versión de datos: archivar cambia la versión.
+    """
+    clave = PREFIJO_CORTE + versionado.version_actual()
+    valor = cache.get(clave)
+    if valor is None:
+        ultima = RegistroOEEArchivado.objects.aggregate(ultima=Max('fecha'))['ultima']
+        valor = ultima + timedelta(days=1) if ultima else SIN_ARCHIVO
+        cache.set(clave, valor, getattr(settings, 'DATOS_VERSION_TTL', 60))
+    return None if valor == SIN_ARCHIVO else valor
+
+
+def total_activos():
+    """
+    Cantidad de registros de la tabla activa sin contarla. Los resúmenes
+    incluyen el archivo, así que se suman solo los días desde el corte
+    (todos activos) más los activos anteriores al corte, que son pocos
+    (cargados después de archivar) y se cuentan por el índice de fecha.
+    """
+    limite = corte()
+    if limite is None:
+        return resumenes.totales()['total_registros']
+    recientes = ResumenDiario.objects.filter(fecha__gte=limite).aggregate(total=Sum('total_registros'))['total']
+    return (recientes or 0) + RegistroOEE.objects.filter(fecha__lt=limite).count()
+
+
+def requiere_archivo(desde, hasta=None):
+    """
+    Indica si un rango de fechas alcanza registros archivados. Sin ninguna
+    fecha se consulta solo la tabla activa; con solo `hasta` el rango no
+    tiene inicio y alcanza todo el archivo.
+    """
+    if desde is None and hasta is None:
+        return False
+    limite = corte()
+    return limite is not None and (desde or date.min) < limite
+
+
+class ConsultaEscalonada:
+    """
+    Los mismos filtros sobre la tabla activa y el archivo, unidos al evaluar
+    (UNION ALL). Implementa lo que usan los paginadores y la exportación:
+    filter, order_by, values_list, count, slicing e iterator.
+
+    `archivados` puede ser None (solo la tabla activa). `particiones` es una
+    lista de filtros de igualdad disjuntos que cubren la consulta: cada tabla
+    se parte en una rama por filtro, cada rama recorre un índice ya en el
+    orden pedido y la base de datos las mezcla sin ordenar todas las filas.
+    """
+    ordered = True
+
+    def __init__(self, activos, archivados, orden=(), particiones=()):
+        self.activos = activos
+        self.archivados = archivados
+        self.orden = tuple(orden)
+        self.particiones = list(particiones)
+
+    def _copiar(self, activos, archivados, orden=None):
+        return ConsultaEscalonada(
+            activos, archivados, self.orden if orden is None else orden, self.particiones
+        )
+
+    def _aplicar(self, metodo, *args, **kwargs):
+        archivados = self.archivados
+        if archivados is not None:
+            archivados = getattr(archivados, metodo)(*args, **kwargs)
+        return self._copiar(getattr(self.activos, metodo)(*args, **kwargs), archivados)
+
+    def filter(self, *args, **kwargs):
+        return self._aplicar('filter', *args, **kwargs)
+
+    def values_list(self, *campos, **kwargs):
+        return self._aplicar('values_list', *campos, **kwargs)
+
+    def order_by(self, *campos):
+        return self._copiar(self.activos, self.archivados, campos)
+
+    def ramas(self):
+        """Las consultas que se unen, sin orden propio"""
+        tablas = [self.activos] if self.archivados is None else [self.activos, self.archivados]
+        particiones = self.particiones or [{}]
+        return [tabla.order_by().filter(**particion) for tabla in tablas for particion in particiones]
+
+    def union(self):
+        primera, *resto = self.ramas()
+        union = primera.union(*resto, all=True) if resto else primera
+        return union.order_by(*self.orden) if self.orden else union
+
+    def count(self):
+        # Solo los id: el conteo no necesita los JOIN de select_related
+        return self.values_list('pk').order_by().union().count()
+
+    def iterator(self, chunk_size=None):
+        return self.union().iterator(chunk_size=chunk_size)
+
+    def __getitem__(self, indice):
+        return self.union()[indice]
+
+    def __iter__(self):
+        return iter(self.union())
+
+    def __len__(self):
+        return len(self.union())
+
+
+def escalonar(activos, archivados, desde, hasta=None, particiones=None):
+    """
+    Retorna `activos` o, si el rango lo requiere, la unión con `archivados`.
+    Con `particiones` la consulta se parte en ramas aunque no alcance el
+    archivo.
+    """
+    if not requiere_archivo(desde, hasta):
+        if not particiones:
+            return activos
+        archivados = None
+    return ConsultaEscalonada(activos, archivados, activos.query.order_by, particiones or ())
+
+
+def _columnas():
+    qn = connection.ops.quote_name
+    # Las columnas generadas (oee_decil) las calcula la base de datos al insertar
+    return ', '.join(
+        qn(campo.column) for campo in RegistroOEE._meta.concrete_fields if not campo.generated
+    )
+
+
+def _mover_lote(ids):
+    qn = connection.ops.quote_name
+    columnas = _columnas()
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(RegistroOEEArchivado._meta.db_table)} ({columnas}) '
+            f'SELECT {columnas} FROM {qn(RegistroOEE._meta.db_table)} WHERE {qn("id")} IN ({marcadores})',
+            ids,
+        )
+        # DELETE directo: sin señales ni descuento de resúmenes
+        cursor.execute(
+            f'DELETE FROM {qn(RegistroOEE._meta.db_table)} WHERE {qn("id")} IN ({marcadores})',
+            ids,
+        )
+
+
+def archivar(antes_de=None, tamano_lote=1000, pausa=0.05, simular=False):
+    """
+    Mueve al archivo los registros con fecha anterior a `antes_de` (por
+    defecto el horizonte), por lotes de id en transacciones cortas.
+    Retorna un dict con archivados, lotes y duracion (segundos).
+    """
+    inicio = time.perf_counter()
+    antes_de = antes_de or horizonte()
+    candidatos = RegistroOEE.objects.filter(fecha__lt=antes_de).order_by('id')
+    if simular:
+        return {'archivados': candidatos.count(), 'lotes': 0, 'duracion': time.perf_counter() - inicio}
+
+    archivados = lotes = 0
+    while True:
+        ids = list(candidatos.values_list('id', flat=True)[:tamano_lote])
+        if not ids:
+            break
+        with transaction.atomic():
+            _mover_lote(ids)
+            versionado.marcar_cambio()
+        archivados += len(ids)
+        lotes += 1
+        if len(ids) < tamano_lote:
+            break
+        time.sleep(pausa)
+
+    return {
+        'archivados': archivados,
+        'lotes': lotes,
+        'duracion': time.perf_counter() - inicio,
+    }
+
+
+def existe(area_id, fecha, turno):
+    """Si ya hay un registro archivado para esa área, fecha y turno"""
+    return RegistroOEEArchivado.objects.filter(area_id=area_id, fecha=fecha, turno=turno).exists()
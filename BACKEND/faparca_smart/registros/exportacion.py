@@ -0,0 +1,96 @@
+# registros/exportacion.py
+"""
+Exportación en streaming de registros OEE (CSV / NDJSON).
+
+Se recorren filas planas de values() con un cursor del lado del servidor
+(iterator(chunk_size=...)), por lo que la memoria se mantiene constante sin
+importar el tamaño del histórico y los primeros bytes salen de inmediato.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+TAMANO_CHUNK = 2000
+FILAS_POR_ENVIO = 500
+
+# (campo en values(), nombre de la columna exportada)
+COLUMNAS = [
+    ('id', 'id'),
+    ('area_id', 'area'),
+    ('area__codigo', 'area_codigo'),
+    ('area__nombre', 'area_nombre'),
+    ('fecha', 'fecha'),
+    ('turno', 'turno'),
+    ('usuario__username', 'usuario'),
+    ('plan_produccion', 'plan_produccion'),
+    ('produccion_real', 'produccion_real'),
+    ('hora_inicio', 'hora_inicio'),
+    ('hora_fin', 'hora_fin'),
+    ('formato_producto', 'formato_producto'),
+    ('produccion_kg', 'produccion_kg'),
+    ('lectura_inicial', 'lectura_inicial'),
+    ('lectura_final', 'lectura_final'),
+    ('paradas', 'paradas'),
+    ('motivo_parada', 'motivo_parada'),
+    ('disponibilidad', 'disponibilidad'),
+    ('rendimiento', 'rendimiento'),
+    ('calidad', 'calidad'),
+    ('oee', 'oee'),
+    ('observaciones', 'observaciones'),
+]
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class _Eco:
+    """Objeto tipo archivo que retorna lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas(registros):
+    campos = [campo for campo, _ in COLUMNAS]
+    return (
+        registros.order_by('fecha', 'turno', 'id')
+        .values_list(*campos)
+        .iterator(chunk_size=TAMANO_CHUNK)
+    )
+
+
+def _agrupar(lineas):
+    """Junta varias líneas por envío para no escribir al socket fila a fila"""
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= FILAS_POR_ENVIO:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def generar_csv(registros):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow([nombre for _, nombre in COLUMNAS])
+    yield from _agrupar(escritor.writerow(fila) for fila in _filas(registros))
+
+
+def generar_ndjson(registros):
+    nombres = [nombre for _, nombre in COLUMNAS]
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    yield from _agrupar(
+        codificador.encode(dict(zip(nombres, fila))) + '\n'
+        for fila in _filas(registros)
+    )
+
+
+def exportar(registros, formato):
+    """Retorna (generador, content_type, extensión) para el formato pedido"""
+    content_type, extension = FORMATOS[formato]
+    generador = generar_csv if formato == 'csv' else generar_ndjson
+    return generador(registros), content_type, extension
+
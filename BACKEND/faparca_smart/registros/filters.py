@@ -0,0 +1,175 @@
+# registros/filters.py
+"""
+Filtros del lado del servidor para los registros OEE.
+
+Cada filtro soportado tiene un índice que lo respalda (ver RegistroOEE.Meta),
+y registros/tests.py verifica con el plan de consultas que cada uno busque
+por índice (SEARCH) y que la página salga sin ordenar las filas encontradas.
+
+Los filtros con varios valores (área, tipo de área, turno) y los de rango
+(oee_min/oee_max, con_paradas) no dan por sí solos una clave de igualdad
+seguida del orden de la lista: un IN obliga a juntar y ordenar todas las
+filas encontradas antes de cortar la página. Para la lista y la exportación
+la consulta se parte en ramas de igualdad (ver `particiones`) que
+archivo.ConsultaEscalonada une con UNION ALL.
+"""
+import math
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from areas.models import Area
+from usuarios import alcance
+from .models import RegistroOEE
+
+
+def _lista(valor):
+    return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+def _fecha(nombre, valor):
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({nombre: 'Debe tener el formato AAAA-MM-DD'})
+    return fecha
+
+
+def _numero(nombre, valor):
+    try:
+        return float(valor)
+    except ValueError:
+        raise ValidationError({nombre: 'Debe ser un número'})
+
+
+def _decil(oee, redondeo):
+    return min(max(int(redondeo(oee / 10)), 0), 10)
+
+
+class RegistroOEEFilterBackend(BaseFilterBackend):
+    """
+    Parámetros soportados:
+      area          id o código del área (varios separados por coma)
+      area_tipo     empaque | prensa
+      fecha         fecha exacta (AAAA-MM-DD)
+      fecha_desde   fecha mínima inclusive (alias: fecha_inicio)
+      fecha_hasta   fecha máxima inclusive (alias: fecha_fin)
+      turno         A | B | C (varios separados por coma)
+      usuario       id del usuario que cargó el registro
+      oee_min       OEE mínimo inclusive
+      oee_max       OEE máximo inclusive
+      con_paradas   true: solo los turnos con paradas registradas
+
+    Sin fechas se consultan solo los registros activos; si el rango empieza
+    antes del corte del archivo se suman los archivados (ver archivo.py).
+
+    Después de filter_queryset, `particiones` tiene los filtros de igualdad
+    disjuntos que cubren el resultado (o None si no hacen falta).
+    """
+    ALIAS = {'fecha_inicio': 'fecha_desde', 'fecha_fin': 'fecha_hasta'}
+    # Más ramas que esto cuesta más que ordenar las filas encontradas
+    PARTICIONES_MAX = 16
+    particiones = None
+
+    def get_params(self, request):
+        params = {}
+        for nombre, valor in request.query_params.items():
+            if valor != '':
+                params[self.ALIAS.get(nombre, nombre)] = valor
+        return params
+
+    def rango_fechas(self, request):
+        """(desde, hasta) pedidos; cualquiera de los dos puede ser None"""
+        params = self.get_params(request)
+        if 'fecha' in params:
+            fecha = _fecha('fecha', params['fecha'])
+            return fecha, fecha
+        desde = _fecha('fecha_desde', params['fecha_desde']) if 'fecha_desde' in params else None
+        hasta = _fecha('fecha_hasta', params['fecha_hasta']) if 'fecha_hasta' in params else None
+        return desde, hasta
+
+    def filter_queryset(self, request, queryset, view):
+        params = self.get_params(request)
+        areas = turnos = oee_min = oee_max = None
+        con_paradas = False
+
+        if 'area' in params:
+            ids, codigos = [], []
+            for valor in _lista(params['area']):
+                (ids if valor.isdigit() else codigos).append(int(valor) if valor.isdigit() else valor)
+            if codigos:
+                ids += Area.objects.filter(codigo__in=[c.upper() for c in codigos]).values_list('id', flat=True)
+            areas = set(ids)
+            queryset = queryset.filter(area_id__in=areas)
+
+        if 'area_tipo' in params:
+            if params['area_tipo'] not in dict(Area.TIPOS_AREA):
+                raise ValidationError({'area_tipo': 'Debe ser empaque o prensa'})
+            del_tipo = set(Area.objects.filter(tipo=params['area_tipo']).values_list('id', flat=True))
+            areas = del_tipo if areas is None else areas & del_tipo
+            queryset = queryset.filter(area_id__in=del_tipo)
+
+        if 'fecha' in params:
+            queryset = queryset.filter(fecha=_fecha('fecha', params['fecha']))
+        if 'fecha_desde' in params:
+            queryset = queryset.filter(fecha__gte=_fecha('fecha_desde', params['fecha_desde']))
+        if 'fecha_hasta' in params:
+            queryset = queryset.filter(fecha__lte=_fecha('fecha_hasta', params['fecha_hasta']))
+
+        if 'turno' in params:
+            turnos = _lista(params['turno'])
+            if not set(turnos) <= set(dict(RegistroOEE.TURNOS)):
+                raise ValidationError({'turno': 'Debe ser A, B o C'})
+            queryset = queryset.filter(turno__in=turnos)
+
+        if 'usuario' in params:
+            if not params['usuario'].isdigit():
+                raise ValidationError({'usuario': 'Debe ser el id del usuario'})
+            queryset = queryset.filter(usuario_id=params['usuario'])
+
+        if 'oee_min' in params:
+            oee_min = _numero('oee_min', params['oee_min'])
+            queryset = queryset.filter(oee__gte=oee_min)
+        if 'oee_max' in params:
+            oee_max = _numero('oee_max', params['oee_max'])
+            queryset = queryset.filter(oee__lte=oee_max)
+
+        if 'con_paradas' in params:
+            if params['con_paradas'] not in ('true', 'false'):
+                raise ValidationError({'con_paradas': 'Debe ser true o false'})
+            if params['con_paradas'] == 'true':
+                # Misma condición que el índice parcial registro_con_paradas_idx
+                queryset = queryset.filter(paradas__gt=0)
+                con_paradas = True
+
+        if areas is None and request.user.is_authenticated:
+            # Sin filtro de área, las áreas visibles del supervisor (ver alcance.filtrar)
+            areas = alcance.areas_visibles(request.user)
+        self.particiones = self._particionar(areas, turnos, oee_min, oee_max, con_paradas)
+        return queryset
+
+    def _particionar(self, areas, turnos, oee_min, oee_max, con_paradas):
+        """
+        Una sola dimensión, la de índice más selectivo: cada área usa el índice
+        (area, fecha, turno), cada turno registro_turno_fecha_idx o, con
+        paradas, el índice parcial, y cada decil de OEE registro_oee_decil_idx.
+        Los filtros originales se mantienen en todas las ramas.
+        """
+        if areas is not None and len(areas) > 1:
+            campo, valores = 'area_id', sorted(areas)
+        elif turnos is not None and len(set(turnos)) > 1:
+            campo, valores = 'turno', sorted(set(turnos))
+        elif oee_min is not None or oee_max is not None:
+            desde = 0 if oee_min is None else _decil(oee_min, math.floor)
+            hasta = 10 if oee_max is None else _decil(oee_max, math.ceil)
+            campo, valores = 'oee_decil', range(desde, hasta + 1)
+        elif con_paradas and turnos is None:
+            campo, valores = 'turno', [turno for turno, _ in RegistroOEE.TURNOS]
+        else:
+            return None
+        if not 0 < len(valores) <= self.PARTICIONES_MAX:
+            return None
+        return [{campo: valor} for valor in valores]
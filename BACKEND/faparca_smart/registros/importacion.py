@@ -0,0 +1,237 @@
+# registros/importacion.py
+"""
+Importación masiva de registros OEE desde planillas CSV o XLSX.
+
+Las filas se leen en streaming, se validan por lotes (sin consultas por fila),
+se calculan los indicadores del lote completo en forma vectorial
+(recalculo.calcular_registros) y se insertan con bulk_create
+en una transacción por lote. El resultado incluye un reporte de errores por
+fila para que la planilla pueda corregirse y reimportarse.
+
+Si entre la verificación de duplicados y el insert otro proceso guarda una
+de las claves del lote, el lote se reintenta fila por fila: se importan las
+demás y la fila en conflicto queda en el reporte.
+"""
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from areas.models import Area
+from core import versionado
+from .models import RegistroOEE, RegistroOEEArchivado
+from .serializers import RegistroOEEImportSerializer
+from . import recalculo, resumenes, tiempo_real
+
+TAMANO_LOTE = 2000
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no tiene un formato soportado o no se puede leer"""
+
+
+def _limpiar(fila):
+    """Descarta celdas vacías y normaliza fechas de Excel"""
+    limpia = {}
+    for campo, valor in fila.items():
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor is None or valor == '':
+            continue
+        if isinstance(valor, datetime) and campo.strip() == 'fecha':
+            valor = valor.date()
+        limpia[campo.strip()] = valor
+    return limpia
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t') if muestra else csv.excel
+        for fila in csv.DictReader(texto, dialect=dialecto):
+            yield _limpiar(fila)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ArchivoInvalido(f'No se pudo leer el CSV: {exc}')
+    finally:
+        texto.detach()
+
+
+def _filas_xlsx(archivo):
+    from openpyxl import load_workbook
+
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ArchivoInvalido(f'No se pudo leer el XLSX: {exc}')
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezados = [str(c).strip() if c is not None else None for c in next(filas, ())]
+        for valores in filas:
+            if any(v is not None for v in valores):
+                yield _limpiar(dict(zip(encabezados, valores)))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Generador de filas (dict) de una planilla. El formato se deduce de la
+    extensión del nombre del archivo.
+    """
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if extension == 'csv':
+        return _filas_csv(archivo)
+    if extension in ('xlsx', 'xlsm'):
+        return _filas_xlsx(archivo)
+    raise ArchivoInvalido('Formato no soportado. Use archivos .csv o .xlsx')
+
+
+class Importador:
+    """
+    Importa filas de planilla en lotes. Se usa tanto desde el endpoint
+    /registros/import/ como desde el comando importar_registros.
+    """
+
+    def __init__(self, usuario, tamano_lote=TAMANO_LOTE):
+        self.usuario = usuario
+        self.tamano_lote = tamano_lote
+        self.validador = RegistroOEEImportSerializer()
+        self.areas = {}
+        for area in Area.objects.all():
+            self.areas[str(area.id)] = area
+            self.areas[area.codigo.upper()] = area
+        self.claves_vistas = set()
+        self.total_filas = 0
+        self.importados = 0
+        self.errores = []
+
+    def importar(self, filas):
+        """Procesa todas las filas y retorna el reporte de la importación"""
+        filas = iter(filas)
+        numero = 1  # La fila 1 es el encabezado
+        while True:
+            lote = list(islice(filas, self.tamano_lote))
+            if not lote:
+                break
+            self._procesar_lote(lote, numero + 1)
+            numero += len(lote)
+        return self.reporte()
+
+    def reporte(self):
+        self.errores.sort(key=lambda error: error['fila'])
+        return {
+            'total_filas': self.total_filas,
+            'importados': self.importados,
+            'con_errores': len(self.errores),
+            'errores': self.errores,
+        }
+
+    def _error(self, numero, errores):
+        if isinstance(errores, str):
+            errores = {'non_field_errors': [errores]}
+        self.errores.append({'fila': numero, 'errores': errores})
+
+    def _validar(self, lote, primera_fila):
+        """Valida las filas del lote; retorna [(numero, datos_validados)]"""
+        validas = []
+        for numero, fila in enumerate(lote, start=primera_fila):
+            try:
+                datos = self.validador.run_validation(fila)
+            except serializers.ValidationError as exc:
+                self._error(numero, exc.detail)
+                continue
+
+            area = self.areas.get(datos['area'].upper())
+            if area is None:
+                self._error(numero, {'area': [f"No existe un área con id o código '{datos['area']}'"]})
+                continue
+            datos['area'] = area
+            validas.append((numero, datos))
+        return validas
+
+    def _existentes(self, validas):
+        """Claves (área, fecha, turno) del lote que ya existen (activas o archivadas)"""
+        if not validas:
+            return set()
+        fechas = [datos['fecha'] for _, datos in validas]
+        filtro = {
+            'area_id__in': {datos['area'].id for _, datos in validas},
+            'fecha__range': (min(fechas), max(fechas)),
+        }
+        # Una sola consulta sobre la tabla activa y el archivo
+        return set(
+            RegistroOEE.objects.filter(**filtro).values_list('area_id', 'fecha', 'turno').union(
+                RegistroOEEArchivado.objects.filter(**filtro).values_list('area_id', 'fecha', 'turno'),
+                all=True,
+            )
+        )
+
+    def _procesar_lote(self, lote, primera_fila):
+        self.total_filas += len(lote)
+        validas = self._validar(lote, primera_fila)
+        existentes = self._existentes(validas)
+
+        pendientes = []
+        for numero, datos in validas:
+            clave = (datos['area'].id, datos['fecha'], datos['turno'])
+            if clave in existentes:
+                self._error(numero, 'Ya existe un registro para esta área, fecha y turno')
+                continue
+            if clave in self.claves_vistas:
+                self._error(numero, 'Registro duplicado dentro del archivo')
+                continue
+            self.claves_vistas.add(clave)
+            pendientes.append((numero, RegistroOEE(usuario=self.usuario, **datos)))
+
+        if not pendientes:
+            return
+        registros = [registro for _, registro in pendientes]
+        recalculo.calcular_registros(registros)
+        try:
+            with transaction.atomic():
+                RegistroOEE.objects.bulk_create(registros, batch_size=500)
+                self._aplicar(registros)
+        except IntegrityError:
+            registros = self._guardar_por_fila(pendientes)
+        self.importados += len(registros)
+
+    def _guardar_por_fila(self, pendientes):
+        """
+        Inserta una fila por savepoint y reporta las que chocan; retorna los
+        registros guardados. Solo se usa cuando falló el insert del lote.
+        """
+        guardados = []
+        with transaction.atomic():
+            for numero, registro in pendientes:
+                # El bulk_create fallido pudo asignar id a los primeros registros
+                registro.pk = None
+                try:
+                    with transaction.atomic():
+                        RegistroOEE.objects.bulk_create([registro])
+                except IntegrityError as exc:
+                    registro.pk = None
+                    self._error(numero, self._motivo(registro, exc))
+                    continue
+                guardados.append(registro)
+            if guardados:
+                self._aplicar(guardados)
+        return guardados
+
+    def _motivo(self, registro, exc):
+        clave = {'area_id': registro.area_id, 'fecha': registro.fecha, 'turno': registro.turno}
+        if RegistroOEE.objects.filter(**clave).exists():
+            return 'Ya existe un registro para esta área, fecha y turno'
+        return f'No se pudo guardar el registro: {exc}'
+
+    def _aplicar(self, registros):
+        """Resúmenes, versión de datos y aviso en tiempo real de los registros insertados"""
+        resumenes.aplicar_lote(registros)
+        versionado.marcar_cambio()
+        tiempo_real.publicar_lote(registro.area_id for registro in registros)
@@ -0,0 +1,67 @@
+# registros/management/commands/archivar_registros.py
+"""
+Comando para mover al archivo histórico los registros anteriores al horizonte.
+Uso: python manage.py archivar_registros [--dias N] [--lote N] [--pausa S] [--simular]
+
+Los resúmenes no cambian (siguen contando los registros archivados) y las
+consultas con rango de fechas anterior al corte los siguen devolviendo.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from registros import archivo
+
+
+class Command(BaseCommand):
+    help = 'Mueve los registros OEE antiguos a la tabla de archivo conservando los resúmenes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=getattr(settings, 'ARCHIVO_HORIZONTE_DIAS', 365),
+            help='Días que permanecen en la tabla activa (por defecto ARCHIVO_HORIZONTE_DIAS)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Registros movidos por transacción (por defecto 1000)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.05,
+            help='Segundos de pausa entre lotes para liberar el bloqueo de escritura (por defecto 0.05)'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo cuenta los registros que se archivarían'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--dias y --lote deben ser mayores que cero')
+
+        antes_de = timezone.localdate() - timedelta(days=options['dias'])
+        resultado = archivo.archivar(
+            antes_de=antes_de,
+            tamano_lote=options['lote'],
+            pausa=options['pausa'],
+            simular=options['simular'],
+        )
+
+        if options['simular']:
+            self.stdout.write(f"Registros anteriores al {antes_de}: {resultado['archivados']}")
+            return
+
+        self.stdout.write(
+            f"Registros archivados: {resultado['archivados']} | "
+            f"Lotes: {resultado['lotes']} | "
+            f"Tiempo: {resultado['duracion']:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Registros anteriores al {antes_de} archivados'))
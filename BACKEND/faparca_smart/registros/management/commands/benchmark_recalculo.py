@@ -0,0 +1,66 @@
+# registros/management/commands/benchmark_recalculo.py
+"""
+Compara el recálculo registro por registro (save()) contra el motor vectorizado.
+Los cambios se revierten al terminar: la base de datos queda intacta.
+Uso: python manage.py benchmark_recalculo [--filas 2000]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from registros.models import RegistroOEE
+from registros.recalculo import recalcular, CAMPOS_INDICADORES
+
+
+class Command(BaseCommand):
+    help = 'Mide el recálculo OEE por registro contra el recálculo vectorizado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=2000,
+            help='Cantidad de registros a recalcular (por defecto 2000)'
+        )
+
+    def _invalidar(self, ids):
+        """Pone los indicadores en cero para forzar que ambos caminos escriban"""
+        RegistroOEE.objects.filter(id__in=ids).update(**dict.fromkeys(CAMPOS_INDICADORES, 0))
+
+    def _resultados(self, ids):
+        return list(RegistroOEE.objects.filter(id__in=ids).order_by('id').values_list(*CAMPOS_INDICADORES))
+
+    def handle(self, *args, **options):
+        ids = list(RegistroOEE.objects.order_by('id').values_list('id', flat=True)[:options['filas']])
+        if not ids:
+            raise CommandError('No hay registros. Genere datos de prueba primero.')
+
+        with transaction.atomic():
+            self._invalidar(ids)
+            inicio = time.perf_counter()
+            for registro in RegistroOEE.objects.filter(id__in=ids).select_related('area'):
+                registro.save()
+            por_registro = time.perf_counter() - inicio
+            esperados = self._resultados(ids)
+            transaction.set_rollback(True)
+
+        with transaction.atomic():
+            self._invalidar(ids)
+            inicio = time.perf_counter()
+            recalcular(registros=RegistroOEE.objects.filter(id__in=ids))
+            vectorizado = time.perf_counter() - inicio
+            obtenidos = self._resultados(ids)
+            transaction.set_rollback(True)
+
+        diferencia = max(
+            (abs(a - b) for fila_a, fila_b in zip(esperados, obtenidos) for a, b in zip(fila_a, fila_b)),
+            default=0,
+        )
+
+        self.stdout.write(f'Registros: {len(ids)}')
+        self.stdout.write(f'  save() por registro: {por_registro:.3f}s ({len(ids) / por_registro:,.0f} reg/s)')
+        self.stdout.write(f'  Motor vectorizado:   {vectorizado:.3f}s ({len(ids) / vectorizado:,.0f} reg/s)')
+        self.stdout.write(f'  Aceleración:         {por_registro / vectorizado:.1f}x')
+        if diferencia > 1e-6:
+            raise CommandError(f'Los resultados difieren (máxima diferencia {diferencia})')
+        self.stdout.write(self.style.SUCCESS('✓ Ambos caminos producen los mismos indicadores'))
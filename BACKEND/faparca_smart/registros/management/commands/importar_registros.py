@@ -0,0 +1,70 @@
+# registros/management/commands/importar_registros.py
+"""
+Comando para importar registros OEE históricos desde planillas CSV o XLSX.
+Uso: python manage.py importar_registros planilla.xlsx --usuario admin [--reporte errores.json]
+"""
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from registros.importacion import Importador, ArchivoInvalido, leer_filas, TAMANO_LOTE
+
+Usuario = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Importa registros OEE desde una planilla CSV o XLSX usando inserciones por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta de la planilla (.csv o .xlsx)')
+        parser.add_argument(
+            '--usuario',
+            required=True,
+            help='Username al que se asignan los registros importados'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por transacción (por defecto {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--reporte',
+            help='Ruta donde guardar el reporte de errores en formato JSON'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario '{options['usuario']}'")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                filas = leer_filas(archivo, options['archivo'])
+                reporte = Importador(usuario, tamano_lote=options['lote']).importar(filas)
+        except OSError as exc:
+            raise CommandError(f'No se pudo abrir el archivo: {exc}')
+        except ArchivoInvalido as exc:
+            raise CommandError(str(exc))
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"Filas leídas: {reporte['total_filas']} | Importadas: {reporte['importados']} | "
+            f"Con errores: {reporte['con_errores']} | Tiempo: {duracion:.1f}s"
+        )
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', encoding='utf-8') as salida:
+                json.dump(reporte['errores'], salida, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Reporte de errores guardado en {options['reporte']}")
+        else:
+            for error in reporte['errores'][:20]:
+                self.stdout.write(self.style.ERROR(f"  Fila {error['fila']}: {json.dumps(error['errores'], ensure_ascii=False)}"))
+            if reporte['con_errores'] > 20:
+                self.stdout.write(f"  ... y {reporte['con_errores'] - 20} error(es) más (use --reporte)")
+
+        if reporte['importados']:
+            self.stdout.write(self.style.SUCCESS('✓ Importación finalizada'))
@@ -0,0 +1,35 @@
+# registros/management/commands/recalcular_oee.py
+"""
+Comando para recalcular los indicadores OEE de los registros existentes.
+Uso: python manage.py recalcular_oee [--area ID ...] [--lote N]
+"""
+from django.core.management.base import BaseCommand
+from registros.recalculo import recalcular, TAMANO_LOTE
+
+
+class Command(BaseCommand):
+    help = 'Recalcula disponibilidad, rendimiento, calidad y OEE de los registros en lotes vectorizados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--area',
+            type=int,
+            action='append',
+            dest='areas',
+            help='Limita el recálculo a un área (puede repetirse)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Registros por lote (por defecto {TAMANO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        resultado = recalcular(area_ids=options['areas'], tamano_lote=options['lote'])
+        self.stdout.write(
+            f"Registros revisados: {resultado['revisados']} | "
+            f"Actualizados: {resultado['actualizados']} | "
+            f"Tiempo: {resultado['duracion']:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS('✓ Recálculo finalizado'))
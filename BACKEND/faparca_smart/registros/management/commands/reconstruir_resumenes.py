@@ -0,0 +1,42 @@
+# registros/management/commands/reconstruir_resumenes.py
+"""
+Comando para reconciliar los resúmenes OEE contra la tabla de registros.
+Uso: python manage.py reconstruir_resumenes [--verificar] [--area ID ...]
+"""
+from django.core.management.base import BaseCommand
+from registros import resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconcilia los resúmenes OEE (por área, día y turno) contra los registros activos y archivados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas'
+        )
+        parser.add_argument(
+            '--area',
+            type=int,
+            action='append',
+            dest='areas',
+            help='Limita la reconciliación a un área (puede repetirse)'
+        )
+
+    def handle(self, *args, **options):
+        corregir = not options['verificar']
+        diferencias = resumenes.reconstruir(area_ids=options['areas'], corregir=corregir)
+
+        for modelo, cantidad in diferencias.items():
+            if not cantidad:
+                self.stdout.write(f'  ✓ {modelo}: sin diferencias')
+            elif corregir:
+                self.stdout.write(self.style.WARNING(f'  ✓ {modelo}: {cantidad} resumen(es) corregido(s)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  ✗ {modelo}: {cantidad} resumen(es) con diferencias'))
+
+        if not any(diferencias.values()):
+            self.stdout.write(self.style.SUCCESS('✓ Resúmenes consistentes con los registros'))
+        elif corregir:
+            self.stdout.write(self.style.SUCCESS('✓ Resúmenes reconstruidos exitosamente'))
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Calcula los resúmenes iniciales a partir de los registros existentes"""
+    RegistroOEE = apps.get_model('registros', 'RegistroOEE')
+    anotaciones = {
+        'total_registros': Count('id'),
+        'suma_disponibilidad': Sum('disponibilidad'),
+        'suma_rendimiento': Sum('rendimiento'),
+        'suma_calidad': Sum('calidad'),
+        'suma_oee': Sum('oee'),
+    }
+    for nombre, agrupar_por in [
+        ('ResumenArea', ('area_id',)),
+        ('ResumenDiario', ('area_id', 'fecha')),
+        ('ResumenTurno', ('area_id', 'turno')),
+    ]:
+        modelo = apps.get_model('registros', nombre)
+        filas = RegistroOEE.objects.values(*agrupar_por).annotate(**anotaciones).order_by()
+        modelo.objects.bulk_create([modelo(**fila) for fila in filas], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('registros', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_registros', models.IntegerField(default=0)),
+                ('suma_disponibilidad', models.FloatField(default=0)),
+                ('suma_rendimiento', models.FloatField(default=0)),
+                ('suma_calidad', models.FloatField(default=0)),
+                ('suma_oee', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('area', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='areas.area')),
+            ],
+            options={
+                'verbose_name': 'Resumen OEE por área',
+                'verbose_name_plural': 'Resúmenes OEE por área',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_registros', models.IntegerField(default=0)),
+                ('suma_disponibilidad', models.FloatField(default=0)),
+                ('suma_rendimiento', models.FloatField(default=0)),
+                ('suma_calidad', models.FloatField(default=0)),
+                ('suma_oee', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fecha', models.DateField()),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='areas.area')),
+            ],
+            options={
+                'verbose_name': 'Resumen OEE diario',
+                'verbose_name_plural': 'Resúmenes OEE diarios',
+                'unique_together': {('area', 'fecha')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_registros', models.IntegerField(default=0)),
+                ('suma_disponibilidad', models.FloatField(default=0)),
+                ('suma_rendimiento', models.FloatField(default=0)),
+                ('suma_calidad', models.FloatField(default=0)),
+                ('suma_oee', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('turno', models.CharField(choices=[('A', 'Turno A (06:00-14:00)'), ('B', 'Turno B (14:00-22:00)'), ('C', 'Turno C (22:00-06:00)')], max_length=1)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='areas.area')),
+            ],
+            options={
+                'verbose_name': 'Resumen OEE por turno',
+                'verbose_name_plural': 'Resúmenes OEE por turno',
+                'unique_together': {('area', 'turno')},
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
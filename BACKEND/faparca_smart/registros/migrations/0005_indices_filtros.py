@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('registros', '0004_indice_paginacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(fields=['turno', '-fecha', '-id'], name='registro_turno_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(fields=['usuario', '-fecha', '-turno', '-id'], name='registro_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(fields=['oee'], name='registro_oee_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('registros', '0006_registros_archivados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(condition=models.Q(('paradas__gt', 0)), fields=['-fecha', '-turno', '-id'], name='registro_con_paradas_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:23
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('registros', '0007_indice_con_paradas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='registrooee',
+            name='registro_oee_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='registrooee',
+            name='registro_con_paradas_idx',
+        ),
+        migrations.AddField(
+            model_name='registrooee',
+            name='oee_decil',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Greatest(django.db.models.functions.comparison.Least(models.F('oee'), 100.0), 0.0), '/', models.Value(10))), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='registrooeearchivado',
+            name='oee_decil',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Greatest(django.db.models.functions.comparison.Least(models.F('oee'), 100.0), 0.0), '/', models.Value(10))), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(fields=['oee_decil', '-fecha', '-turno', '-id'], name='registro_oee_decil_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrooee',
+            index=models.Index(condition=models.Q(('paradas__gt', 0)), fields=['turno', '-fecha', '-id'], name='registro_con_paradas_idx'),
+        ),
+    ]
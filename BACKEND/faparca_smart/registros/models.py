@@ -3,10 +3,18 @@ from django.db import models
 
 # Create your models here.
 # registros/models.py
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Cast, Floor, Greatest, Least
 from django.conf import settings
+from areas.cache import obtener_area
 
-class RegistroOEE(models.Model):
+class RegistroOEEBase(models.Model):
+    """
+    Campos de un registro OEE, compartidos por la tabla activa (RegistroOEE)
+    y el archivo histórico (RegistroOEEArchivado). Ambas tablas tienen las
+    mismas columnas en el mismo orden para poder unirlas con UNION ALL.
+    """
     TURNOS = [
         ('A', 'Turno A (06:00-14:00)'),
         ('B', 'Turno B (14:00-22:00)'),
@@ -41,18 +49,70 @@ class RegistroOEE(models.Model):
     rendimiento = models.FloatField(default=0)
     calidad = models.FloatField(default=100)
     oee = models.FloatField(default=0)
+    # Decil del OEE (0 a 10) calculado por la base de datos en cada escritura.
+    # Da una clave de igualdad a los filtros oee_min/oee_max: la lista se
+    # parte en una rama por decil (ver registros/filters.py)
+    oee_decil = models.GeneratedField(
+        expression=Cast(Floor(Greatest(Least(F('oee'), 100.0), 0.0) / 10), models.IntegerField()),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        abstract = True
+
+
+class RegistroOEE(RegistroOEEBase):
     class Meta:
         unique_together = ['area', 'fecha', 'turno']
+        indexes = [
+            # Orden de la lista y clave de la paginación por cursor
+            models.Index(fields=['-fecha', '-turno', '-id'], name='registro_fecha_turno_id_idx'),
+            # Filtros de la lista: una igualdad y después el orden de la lista.
+            # La página por área sale del índice de unique_together (area,
+            # fecha, turno); el conteo por área, del índice de la FK area_id
+            models.Index(fields=['turno', '-fecha', '-id'], name='registro_turno_fecha_idx'),
+            models.Index(fields=['usuario', '-fecha', '-turno', '-id'], name='registro_usuario_fecha_idx'),
+            models.Index(fields=['oee_decil', '-fecha', '-turno', '-id'], name='registro_oee_decil_idx'),
+            # Índice parcial: solo los turnos con paradas (?con_paradas=true), una
+            # fracción de la tabla; la lista lo lee con una rama por turno
+            models.Index(
+                fields=['turno', '-fecha', '-id'], condition=Q(paradas__gt=0), name='registro_con_paradas_idx'
+            ),
+        ]
         verbose_name = "Registro OEE"
         verbose_name_plural = "Registros OEE"
         
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .resumenes import valores_de
+        instance = super().from_db(db, field_names, values)
+        instance._valores_resumen = valores_de(instance)
+        return instance
+
     def save(self, *args, **kwargs):
+        from . import resumenes
         self.calcular_oee()
-        super().save(*args, **kwargs)
+        # El registro y sus resúmenes se escriben en la misma transacción y base
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            if not self._state.adding and getattr(self, '_valores_resumen', None) is None:
+                # Instancia cargada con campos diferidos: leer los valores previos
+                resumenes.cargar_valores_previos(self, using)
+            super().save(*args, **kwargs)
+            resumenes.actualizar_registro(self, using)
+
+    def area_para_calculo(self):
+        """
+        Área usada por calcular_oee(): la ya cargada en la instancia o, si no,
+        la del caché de áreas (evita una consulta por cada guardado).
+        """
+        if RegistroOEE.area.is_cached(self):
+            return self.area
+        return obtener_area(self.area_id) or self.area
         
     def calcular_oee(self):
         """Calcula automáticamente los indicadores OEE"""
@@ -73,11 +133,12 @@ class RegistroOEE(models.Model):
         self.disponibilidad = min((horas_reales / horas_planificadas) * 100, 100)
         
         # 2. RENDIMIENTO
-        if self.area.tipo == 'prensa':
+        area = self.area_para_calculo()
+        if area.tipo == 'prensa':
             # Para prensas: usar lecturas y capacidad teórica
             if self.lectura_inicial is not None and self.lectura_final is not None:
                 produccion_real_kg = self.lectura_final - self.lectura_inicial
-                produccion_teorica = self.area.capacidad_teorica * horas_reales
+                produccion_teorica = area.capacidad_teorica * horas_reales
                 self.rendimiento = (produccion_real_kg / produccion_teorica) * 100 if produccion_teorica > 0 else 0
             else:
                 self.rendimiento = 0
@@ -99,4 +160,94 @@ class RegistroOEE(models.Model):
         self.oee = min(self.oee, 100)
         
     def __str__(self):
-        return f"{self.area.nombre} - {self.fecha} - {self.turno}"
\ No newline at end of file
+        return f"{self.area.nombre} - {self.fecha} - {self.turno}"
+
+
+class ResumenOEEBase(models.Model):
+    """
+    Acumulados (suma/conteo) de los indicadores OEE de un grupo de registros.
+    Se mantienen de forma incremental desde RegistroOEE.save() y las señales
+    de borrado de registros (ver registros/signals.py).
+    """
+    total_registros = models.IntegerField(default=0)
+    suma_disponibilidad = models.FloatField(default=0)
+    suma_rendimiento = models.FloatField(default=0)
+    suma_calidad = models.FloatField(default=0)
+    suma_oee = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def promedio(self, campo):
+        """Promedio de un indicador ('oee', 'disponibilidad', ...)"""
+        if not self.total_registros:
+            return 0
+        return getattr(self, f'suma_{campo}') / self.total_registros
+
+    def sumar(self, otro):
+        """Acumula en este resumen los valores de otro"""
+        self.total_registros += otro.total_registros
+        self.suma_disponibilidad += otro.suma_disponibilidad
+        self.suma_rendimiento += otro.suma_rendimiento
+        self.suma_calidad += otro.suma_calidad
+        self.suma_oee += otro.suma_oee
+
+
+class ResumenArea(ResumenOEEBase):
+    """Acumulado histórico por área"""
+    area = models.OneToOneField('areas.Area', on_delete=models.CASCADE, related_name='resumen')
+
+    class Meta:
+        verbose_name = "Resumen OEE por área"
+        verbose_name_plural = "Resúmenes OEE por área"
+
+    def __str__(self):
+        return f"{self.area_id} - {self.total_registros} registros"
+
+
+class ResumenDiario(ResumenOEEBase):
+    """Acumulado por área y día"""
+    area = models.ForeignKey('areas.Area', on_delete=models.CASCADE)
+    fecha = models.DateField()
+
+    class Meta:
+        unique_together = ['area', 'fecha']
+        verbose_name = "Resumen OEE diario"
+        verbose_name_plural = "Resúmenes OEE diarios"
+
+    def __str__(self):
+        return f"{self.area_id} - {self.fecha}"
+
+
+class ResumenTurno(ResumenOEEBase):
+    """Acumulado histórico por área y turno"""
+    area = models.ForeignKey('areas.Area', on_delete=models.CASCADE)
+    turno = models.CharField(max_length=1, choices=RegistroOEE.TURNOS)
+
+    class Meta:
+        unique_together = ['area', 'turno']
+        verbose_name = "Resumen OEE por turno"
+        verbose_name_plural = "Resúmenes OEE por turno"
+
+    def __str__(self):
+        return f"{self.area_id} - {self.turno}"
+
+
+class RegistroOEEArchivado(RegistroOEEBase):
+    """
+    Registros anteriores al horizonte de archivo (ver registros/archivo.py).
+    Conservan el id que tenían en RegistroOEE y siguen sumados en los
+    resúmenes; son de solo lectura.
+    """
+
+    class Meta:
+        unique_together = ['area', 'fecha', 'turno']
+        indexes = [
+            models.Index(fields=['-fecha', '-turno', '-id'], name='archivado_fecha_turno_id_idx'),
+        ]
+        verbose_name = "Registro OEE archivado"
+        verbose_name_plural = "Registros OEE archivados"
+
+    def __str__(self):
+        return f"{self.area_id} - {self.fecha} - {self.turno} (archivado)"
@@ -0,0 +1,146 @@
+# registros/pagination.py
+"""
+Paginación por cursor (keyset) para la lista de registros.
+
+El cursor guarda la clave (fecha, turno, id) del último registro de la página,
+de modo que la página N se obtiene con un rango sobre el índice compuesto
+en lugar de un OFFSET creciente: cuesta lo mismo que la página 1. El conteo
+total es opcional (?contar=exacto|estimado).
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import archivo
+
+
+class RegistroKeysetPagination(BasePagination):
+    """Paginación keyset sobre (fecha, turno, id) en orden descendente"""
+    ordering = ('-fecha', '-turno', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'contar'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        hacia_atras = cursor is not None and cursor['atras']
+        if hacia_atras:
+            queryset = queryset.order_by('fecha', 'turno', 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.condicion(cursor, hacia_atras))
+
+        # Se pide un registro extra para saber si existe otra página
+        resultados = list(queryset[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if hacia_atras:
+            resultados.reverse()
+
+        self.page = resultados
+        if hacia_atras:
+            self.has_next = True
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = cursor is not None
+        return resultados
+
+    def get_page_size(self, request):
+        try:
+            valor = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(valor, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        modo = request.query_params.get(self.count_query_param)
+        if modo == 'exacto':
+            return queryset.count()
+        if modo == 'estimado':
+            # Sin filtros la lista es solo la tabla activa: el total sale de
+            # los resúmenes sin el archivo. Una consulta que incluye el
+            # archivo siempre tiene rango de fechas
+            if isinstance(queryset, QuerySet) and not queryset.query.where:
+                return archivo.total_activos()
+            return queryset.count()
+        return None
+
+    @staticmethod
+    def condicion(cursor, hacia_atras=False):
+        """(fecha, turno, id) estrictamente menor (o mayor hacia atrás) que el cursor"""
+        fecha, turno, pk = cursor['fecha'], cursor['turno'], cursor['id']
+        op = 'gt' if hacia_atras else 'lt'
+        # El primer término acota el rango sobre el índice compuesto
+        return Q(**{f'fecha__{op}e': fecha}) & (
+            Q(**{f'fecha__{op}': fecha})
+            | Q(fecha=fecha, **{f'turno__{op}': turno})
+            | Q(fecha=fecha, turno=turno, **{f'id__{op}': pk})
+        )
+
+    def decode_cursor(self, request):
+        valor = request.query_params.get(self.cursor_query_param)
+        if not valor:
+            return None
+        try:
+            fecha, turno, pk, atras = json.loads(base64.urlsafe_b64decode(valor.encode()))
+            cursor = {'fecha': parse_date(fecha), 'turno': str(turno), 'id': int(pk), 'atras': bool(atras)}
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        if cursor['fecha'] is None:
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        return cursor
+
+    def encode_cursor(self, registro, atras):
+        datos = json.dumps([registro.fecha.isoformat(), registro.turno, registro.pk, atras])
+        cursor = base64.urlsafe_b64encode(datos.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], atras=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], atras=True)
+
+    def get_paginated_response(self, data):
+        contenido = OrderedDict()
+        if self.count is not None:
+            contenido['count'] = self.count
+        contenido['next'] = self.get_next_link()
+        contenido['previous'] = self.get_previous_link()
+        contenido['results'] = data
+        return Response(contenido)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
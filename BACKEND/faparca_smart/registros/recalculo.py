@@ -0,0 +1,228 @@
+# registros/recalculo.py
+"""
+Motor de recálculo masivo de indicadores OEE.
+
+Replica la fórmula de RegistroOEE.calcular_oee() sobre columnas NumPy, de
+modo que miles de registros se recalculan con unas pocas operaciones
+vectoriales y se escriben con un UPDATE parametrizado (executemany) por
+lote. Se usa cuando cambia la capacidad teórica (o el tipo) de un área,
+desde el comando recalcular_oee y, con calcular_registros(), para los
+lotes de la importación masiva.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from areas.models import Area
+from core import versionado
+from .models import RegistroOEE
+from . import resumenes, tiempo_real
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 5000
+HORAS_PLANIFICADAS = 8  # Turno estándar
+CAMPOS_INDICADORES = ['disponibilidad', 'rendimiento', 'calidad', 'oee']
+COLUMNAS = [
+    'id', 'area_id', 'fecha', 'turno', 'hora_inicio', 'hora_fin',
+    'plan_produccion', 'produccion_real', 'lectura_inicial', 'lectura_final',
+] + CAMPOS_INDICADORES
+
+
+def _segundos(horas):
+    return np.array(
+        [h.hour * 3600 + h.minute * 60 + h.second + h.microsecond / 1e6 for h in horas],
+        dtype=np.float64,
+    )
+
+
+def _flotantes(valores):
+    """Columna float64 con NaN para los valores nulos"""
+    return np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+
+
+def calcular_indicadores(hora_inicio, hora_fin, plan, real, lectura_inicial,
+                         lectura_final, es_prensa, capacidad, actuales):
+    """
+    Versión vectorial de RegistroOEE.calcular_oee().
+
+    Todas las entradas son arrays de la misma longitud (horas en segundos
+    desde medianoche). `actuales` es una matriz (n, 4) con disponibilidad,
+    rendimiento, calidad y oee guardados; se conservan en las filas que
+    calcular_oee() no modificaría (plan o producción en cero).
+    Retorna una matriz (n, 4) con los nuevos indicadores.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. DISPONIBILIDAD (el módulo maneja los turnos que cruzan medianoche)
+        horas_reales = np.mod(hora_fin - hora_inicio, 86400) / 3600
+        disponibilidad = np.minimum(horas_reales / HORAS_PLANIFICADAS * 100, 100)
+
+        # 2. RENDIMIENTO
+        teorica = capacidad * horas_reales
+        con_lecturas = ~np.isnan(lectura_inicial) & ~np.isnan(lectura_final)
+        rendimiento_prensa = np.where(
+            con_lecturas & (teorica > 0),
+            (lectura_final - lectura_inicial) / teorica * 100,
+            0.0,
+        )
+        rendimiento_empaque = np.where(plan > 0, real / plan * 100, 0.0)
+        rendimiento = np.where(es_prensa, rendimiento_prensa, rendimiento_empaque)
+
+        # 3. CALIDAD (por defecto 100%)
+        calidad = np.where(actuales[:, 2] == 0, 100.0, actuales[:, 2])
+
+        # 4. OEE FINAL (con el rendimiento sin limitar, igual que calcular_oee)
+        oee = disponibilidad * rendimiento * calidad / 10000
+
+    nuevos = np.column_stack([
+        disponibilidad,
+        np.minimum(rendimiento, 100),
+        np.minimum(calidad, 100),
+        np.minimum(oee, 100),
+    ])
+    omitidos = (plan == 0) | (real == 0)
+    nuevos[omitidos] = actuales[omitidos]
+    return nuevos
+
+
+def calcular_registros(registros):
+    """
+    Calcula en bloque los indicadores de instancias de RegistroOEE todavía
+    sin guardar (con el área ya asignada), como lo haría calcular_oee() en
+    cada una.
+    """
+    if not registros:
+        return
+    areas = [registro.area_para_calculo() for registro in registros]
+    nuevos = calcular_indicadores(
+        hora_inicio=_segundos([registro.hora_inicio for registro in registros]),
+        hora_fin=_segundos([registro.hora_fin for registro in registros]),
+        plan=_flotantes([registro.plan_produccion for registro in registros]),
+        real=_flotantes([registro.produccion_real for registro in registros]),
+        lectura_inicial=_flotantes([registro.lectura_inicial for registro in registros]),
+        lectura_final=_flotantes([registro.lectura_final for registro in registros]),
+        es_prensa=np.array([area.tipo == 'prensa' for area in areas]),
+        capacidad=np.array([area.capacidad_teorica for area in areas], dtype=np.float64),
+        actuales=np.array(
+            [[getattr(registro, campo) for campo in CAMPOS_INDICADORES] for registro in registros],
+            dtype=np.float64,
+        ),
+    )
+    for registro, valores in zip(registros, nuevos.tolist()):
+        for campo, valor in zip(CAMPOS_INDICADORES, valores):
+            setattr(registro, campo, valor)
+
+
+def _recalcular_lote(filas, areas):
+    """Recalcula un lote de filas de values_list(*COLUMNAS)"""
+    (ids, area_ids, fechas, turnos, inicios, fines, planes, reales,
+     lecturas_iniciales, lecturas_finales, *indicadores) = zip(*filas)
+
+    actuales = np.column_stack([_flotantes(columna) for columna in indicadores])
+    nuevos = calcular_indicadores(
+        hora_inicio=_segundos(inicios),
+        hora_fin=_segundos(fines),
+        plan=_flotantes(planes),
+        real=_flotantes(reales),
+        lectura_inicial=_flotantes(lecturas_iniciales),
+        lectura_final=_flotantes(lecturas_finales),
+        es_prensa=np.array([areas[a][0] == 'prensa' for a in area_ids]),
+        capacidad=np.array([areas[a][1] for a in area_ids], dtype=np.float64),
+        actuales=actuales,
+    )
+
+    cambiados = np.flatnonzero(~np.isclose(nuevos, actuales, rtol=1e-9, atol=1e-9).all(axis=1))
+    if not len(cambiados):
+        return 0
+
+    parametros, anteriores, posteriores = [], [], []
+    for i in cambiados.tolist():
+        valores = nuevos[i].tolist()
+        parametros.append(valores + [ids[i]])
+        clave = (area_ids[i], fechas[i], turnos[i])
+        anteriores.append(clave + tuple(actuales[i].tolist()))
+        posteriores.append(clave + tuple(valores))
+
+    with transaction.atomic():
+        _escribir(parametros)
+        resumenes.aplicar_lote(posteriores, anteriores=anteriores)
+        versionado.marcar_cambio()
+        tiempo_real.publicar_lote(clave[0] for clave in posteriores)
+    return len(parametros)
+
+
+def _escribir(parametros):
+    """
+    Escribe los indicadores con executemany. bulk_update() arma un CASE WHEN
+    por fila y resulta cientos de veces más lento para lotes grandes.
+    """
+    qn = connection.ops.quote_name
+    asignaciones = ', '.join(f'{qn(campo)} = %s' for campo in CAMPOS_INDICADORES)
+    sql = f'UPDATE {qn(RegistroOEE._meta.db_table)} SET {asignaciones} WHERE {qn("id")} = %s'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def recalcular(area_ids=None, registros=None, tamano_lote=TAMANO_LOTE):
+    """
+    Recalcula los indicadores de los registros indicados (por defecto todos)
+    recorriéndolos por lotes de id. Solo escribe las filas que cambian.
+    Retorna un dict con revisados, actualizados y duracion (segundos).
+    """
+    inicio = time.perf_counter()
+    if registros is None:
+        registros = RegistroOEE.objects.all()
+    if area_ids is not None:
+        registros = registros.filter(area_id__in=area_ids)
+    areas = {a['id']: (a['tipo'], a['capacidad_teorica'])
+             for a in Area.objects.values('id', 'tipo', 'capacidad_teorica')}
+
+    revisados = actualizados = 0
+    ultimo_id = 0
+    while True:
+        filas = list(
+            registros.filter(id__gt=ultimo_id).order_by('id').values_list(*COLUMNAS)[:tamano_lote]
+        )
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+        revisados += len(filas)
+        actualizados += _recalcular_lote(filas, areas)
+
+    return {
+        'revisados': revisados,
+        'actualizados': actualizados,
+        'duracion': time.perf_counter() - inicio,
+    }
+
+
+def _recalcular_en_hilo(area_ids):
+    try:
+        resultado = recalcular(area_ids=area_ids)
+        logger.info('Recálculo OEE de áreas %s: %s', area_ids, resultado)
+    except Exception:
+        logger.exception('Error recalculando OEE de las áreas %s', area_ids)
+    finally:
+        connection.close()
+
+
+def programar_recalculo(area_ids):
+    """
+    Lanza el recálculo de las áreas indicadas una vez confirmada la
+    transacción actual. Corre en un hilo de fondo salvo que
+    OEE_RECALCULO_EN_SEGUNDO_PLANO sea False.
+    """
+    def lanzar():
+        if getattr(settings, 'OEE_RECALCULO_EN_SEGUNDO_PLANO', True):
+            threading.Thread(
+                target=_recalcular_en_hilo, args=(list(area_ids),),
+                name='recalculo-oee', daemon=True,
+            ).start()
+        else:
+            recalcular(area_ids=area_ids)
+
+    transaction.on_commit(lanzar)
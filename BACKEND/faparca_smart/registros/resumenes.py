@@ -0,0 +1,381 @@
+# registros/resumenes.py
+"""
+Mantenimiento incremental de los resúmenes OEE (ResumenArea, ResumenDiario,
+ResumenTurno).
+
+Cada resumen guarda sumas y conteos, de modo que agregar o quitar un registro
+es un UPDATE con F() sobre unas pocas filas y el dashboard lee O(áreas) filas
+en lugar de recorrer todo el histórico de RegistroOEE.
+
+Los resúmenes se escriben en la misma base (`using`) que los registros que
+los cambian; sin `using`, en la que el router elige para escribirlos.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core import versionado
+
+CAMPOS = ('disponibilidad', 'rendimiento', 'calidad', 'oee')
+CAMPOS_REGISTRO = ('area_id', 'fecha', 'turno') + CAMPOS
+
+# Se envía dentro de la transacción de cada escritura de registros con
+# dias={(area_id, fecha), ...} y la base `using` (p. ej. para refrescar los
+# reportes de esos días)
+dias_modificados = Signal()
+
+
+def _modelos():
+    from .models import ResumenArea, ResumenDiario, ResumenTurno
+    return ResumenArea, ResumenDiario, ResumenTurno
+
+
+def _base(using=None):
+    return using or router.db_for_write(_modelos()[1])
+
+
+def valores_de(registro):
+    """
+    Foto de los campos de un registro que afectan a los resúmenes.
+    Retorna None si alguno de ellos fue diferido (only/defer).
+    """
+    cargados = registro.__dict__
+    if any(campo not in cargados for campo in CAMPOS_REGISTRO):
+        return None
+    return tuple(cargados[campo] for campo in CAMPOS_REGISTRO)
+
+
+def cargar_valores_previos(registro, using=None):
+    """Lee de la base de datos los valores guardados de un registro existente"""
+    registros = type(registro).objects.db_manager(using or registro._state.db)
+    previos = registros.filter(pk=registro.pk).values_list(*CAMPOS_REGISTRO).first()
+    registro._valores_resumen = previos
+
+
+def _claves(valores):
+    """Claves (modelo, filtro) de los tres resúmenes que toca un registro"""
+    ResumenArea, ResumenDiario, ResumenTurno = _modelos()
+    area_id, fecha, turno = valores[:3]
+    return [
+        (ResumenArea, (('area_id', area_id),)),
+        (ResumenDiario, (('area_id', area_id), ('fecha', fecha))),
+        (ResumenTurno, (('area_id', area_id), ('turno', turno))),
+    ]
+
+
+def _acumular(deltas, valores, signo):
+    indicadores = valores[3:]
+    for clave in _claves(valores):
+        delta = deltas[clave]
+        delta['total_registros'] += signo
+        for campo, valor in zip(CAMPOS, indicadores):
+            delta[f'suma_{campo}'] += signo * (valor or 0)
+
+
+def _aplicar_uno(modelo, filtro, delta, using):
+    """UPDATE con F() del resumen; si no existe y el delta suma, lo crea"""
+    resumenes = modelo.objects.using(using)
+    # update() no aplica auto_now
+    cambios = {campo: F(campo) + valor for campo, valor in delta.items()}
+    cambios['updated_at'] = timezone.now()
+    if resumenes.filter(**filtro).update(**cambios):
+        return
+    if delta['total_registros'] <= 0:
+        # Nada que descontar: el resumen no existe (p. ej. área eliminada)
+        return
+    try:
+        with transaction.atomic(using=using):
+            resumenes.create(**filtro, **delta)
+    except IntegrityError:
+        # Otro proceso creó el resumen entre el UPDATE y el INSERT
+        resumenes.filter(**filtro).update(**cambios)
+
+
+def _claves_existentes(modelo, filtros, using):
+    """Conjunto de filtros (como tuplas) que ya tienen fila en la tabla"""
+    campos = [campo for campo, _ in filtros[0]]
+    condiciones = {
+        f'{campo}__in': {filtro[i][1] for filtro in filtros}
+        for i, campo in enumerate(campos)
+    }
+    return {
+        tuple(zip(campos, valores))
+        for valores in modelo.objects.using(using).filter(**condiciones).values_list(*campos)
+    }
+
+
+def _incrementar(modelo, grupos, using):
+    """
+    Suma los deltas de varios resúmenes existentes con un solo executemany.
+    Un UPDATE con F() por fila cuesta milisegundos por la capa del ORM.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    campos = ['total_registros'] + [f'suma_{c}' for c in CAMPOS]
+    claves = [campo for campo, _ in next(iter(grupos))]
+    sql = 'UPDATE {tabla} SET {asignaciones}, {actualizado} = %s WHERE {condiciones}'.format(
+        tabla=qn(modelo._meta.db_table),
+        asignaciones=', '.join(f'{qn(c)} = {qn(c)} + %s' for c in campos),
+        actualizado=qn('updated_at'),
+        condiciones=' AND '.join(f'{qn(c)} = %s' for c in claves),
+    )
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+    parametros = [
+        [delta[c] for c in campos] + [ahora] + [valor for _, valor in filtro]
+        for filtro, delta in grupos.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def _upsert(modelo, grupos, using):
+    """
+    Suma los deltas con INSERT ... ON CONFLICT DO UPDATE (PostgreSQL y
+    SQLite): crea o incrementa cada resumen en la misma sentencia, sin
+    consultar antes cuáles existen ni reintentar por IntegrityError.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    tabla = qn(modelo._meta.db_table)
+    campos = ['total_registros'] + [f'suma_{c}' for c in CAMPOS]
+    claves = [campo for campo, _ in next(iter(grupos))]
+    columnas = claves + campos + ['updated_at']
+    sql = (
+        f'INSERT INTO {tabla} ({", ".join(qn(c) for c in columnas)}) '
+        f'VALUES ({", ".join(["%s"] * len(columnas))}) '
+        f'ON CONFLICT ({", ".join(qn(c) for c in claves)}) DO UPDATE SET '
+        + ', '.join(f'{qn(c)} = {tabla}.{qn(c)} + EXCLUDED.{qn(c)}' for c in campos)
+        + f', {qn("updated_at")} = EXCLUDED.{qn("updated_at")}'
+    )
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+    parametros = [
+        [valor for _, valor in filtro] + [delta[c] for c in campos] + [ahora]
+        for filtro, delta in grupos.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def _aplicar(deltas, using=None):
+    """
+    Aplica los deltas acumulados. Si la base soporta ON CONFLICT, los
+    resúmenes que suman se crean o incrementan con un solo upsert y los
+    que solo restan se actualizan con un executemany (no se crean filas
+    negativas). Si no: con un solo resumen afectado (el caso de save())
+    usa un UPDATE con F(); en lotes actualiza los existentes con un
+    executemany y crea los nuevos con bulk_create.
+    """
+    using = _base(using)
+    ResumenDiario = _modelos()[1]
+    por_modelo = defaultdict(dict)
+    dias = set()
+    for (modelo, filtro), delta in deltas.items():
+        if modelo is ResumenDiario:
+            # Incluye los días cuyo delta es cero (ediciones de campos sin resumen)
+            dias.add(tuple(valor for _, valor in filtro))
+        if any(delta.values()):
+            por_modelo[modelo][filtro] = delta
+    if dias:
+        dias_modificados.send(sender=ResumenDiario, dias=dias, using=using)
+
+    upsert = connections[using].features.supports_update_conflicts_with_target
+    for modelo, grupos in por_modelo.items():
+        if upsert:
+            suman = {filtro: delta for filtro, delta in grupos.items() if delta['total_registros'] > 0}
+            restan = {filtro: delta for filtro, delta in grupos.items() if delta['total_registros'] <= 0}
+            if suman:
+                _upsert(modelo, suman, using)
+            if restan:
+                _incrementar(modelo, restan, using)
+            continue
+
+        if len(grupos) == 1:
+            (filtro, delta), = grupos.items()
+            _aplicar_uno(modelo, dict(filtro), delta, using)
+            continue
+
+        existentes = _claves_existentes(modelo, list(grupos), using)
+        actualizar, nuevos = {}, {}
+        for filtro, delta in grupos.items():
+            if filtro in existentes:
+                actualizar[filtro] = delta
+            elif delta['total_registros'] > 0:
+                nuevos[filtro] = delta
+        if actualizar:
+            _incrementar(modelo, actualizar, using)
+        if not nuevos:
+            continue
+        try:
+            with transaction.atomic(using=using):
+                modelo.objects.using(using).bulk_create(
+                    [modelo(**dict(filtro), **delta) for filtro, delta in nuevos.items()],
+                    batch_size=500,
+                )
+        except IntegrityError:
+            # Algún resumen fue creado en paralelo: aplicar uno por uno
+            for filtro, delta in nuevos.items():
+                _aplicar_uno(modelo, dict(filtro), delta, using)
+
+
+def _nuevos_deltas():
+    return defaultdict(lambda: defaultdict(float, total_registros=0))
+
+
+def actualizar_registro(registro, using=None):
+    """
+    Actualiza los resúmenes tras guardar un registro, descontando sus
+    valores anteriores si ya existía. Debe llamarse dentro de la misma
+    transacción que el save().
+    """
+    deltas = _nuevos_deltas()
+    anteriores = getattr(registro, '_valores_resumen', None)
+    if anteriores is not None:
+        _acumular(deltas, anteriores, -1)
+    nuevos = tuple(getattr(registro, campo) for campo in CAMPOS_REGISTRO)
+    _acumular(deltas, nuevos, 1)
+    _aplicar(deltas, using or registro._state.db)
+    registro._valores_resumen = nuevos
+
+
+def descontar_registro(registro, using=None):
+    """Quita un registro eliminado de sus resúmenes"""
+    valores = getattr(registro, '_valores_resumen', None) or valores_de(registro)
+    if valores is None:
+        return
+    deltas = _nuevos_deltas()
+    _acumular(deltas, valores, -1)
+    _aplicar(deltas, using or registro._state.db)
+    registro._valores_resumen = None
+
+
+def aplicar_lote(registros, signo=1, anteriores=(), using=None):
+    """
+    Suma (o resta con signo=-1) un lote de registros a los resúmenes.
+    Pensado para rutas masivas (bulk_create, importaciones, recálculos) que
+    no pasan por RegistroOEE.save(). Los registros pueden ser instancias o
+    tuplas con CAMPOS_REGISTRO; `anteriores` se descuenta en la misma pasada.
+    """
+    deltas = _nuevos_deltas()
+    for valores in anteriores:
+        _acumular(deltas, valores, -signo)
+    for registro in registros:
+        valores = registro if isinstance(registro, tuple) else valores_de(registro)
+        _acumular(deltas, valores, signo)
+    _aplicar(deltas, using)
+
+
+def redondear(valor):
+    return round(valor or 0, 1)
+
+
+def indicadores(resumen):
+    """Promedios redondeados de un resumen (modelo o dict de totales)"""
+    if isinstance(resumen, dict):
+        promedio = resumen.get
+    else:
+        promedio = resumen.promedio
+    return {
+        'oee_promedio': redondear(promedio('oee')),
+        'disponibilidad_promedio': redondear(promedio('disponibilidad')),
+        'rendimiento_promedio': redondear(promedio('rendimiento')),
+        'calidad_promedio': redondear(promedio('calidad')),
+    }
+
+
+def totales(area_ids=None):
+    """
+    Totales globales a partir de ResumenArea (una fila por área).
+    Retorna un dict con total_registros y el promedio de cada indicador.
+    """
+    ResumenArea = _modelos()[0]
+    resumenes = ResumenArea.objects.all()
+    if area_ids is not None:
+        resumenes = resumenes.filter(area_id__in=area_ids)
+
+    total = 0
+    sumas = dict.fromkeys(CAMPOS, 0.0)
+    for fila in resumenes.values('total_registros', *[f'suma_{c}' for c in CAMPOS]):
+        total += fila['total_registros']
+        for campo in CAMPOS:
+            sumas[campo] += fila[f'suma_{campo}']
+
+    resultado = {'total_registros': total}
+    for campo in CAMPOS:
+        resultado[campo] = sumas[campo] / total if total else 0
+    return resultado
+
+
+def _agregados_esperados(consultas, agrupar_por):
+    """Agregados por grupo sumando las filas de cada consulta (tabla activa y archivo)"""
+    anotaciones = {'total_registros': Count('id')}
+    anotaciones.update({f'suma_{c}': Sum(c) for c in CAMPOS})
+    esperados = {}
+    for registros in consultas:
+        for fila in registros.values(*agrupar_por).annotate(**anotaciones).order_by():
+            clave = tuple(fila[c] for c in agrupar_por)
+            if clave not in esperados:
+                esperados[clave] = fila
+                continue
+            for campo in ('total_registros', *[f'suma_{c}' for c in CAMPOS]):
+                esperados[clave][campo] += fila[campo] or 0
+    return esperados
+
+
+def _difiere(actual, esperado):
+    if actual['total_registros'] != esperado['total_registros']:
+        return True
+    for campo in CAMPOS:
+        a, b = actual[f'suma_{campo}'] or 0, esperado[f'suma_{campo}'] or 0
+        if abs(a - b) > 1e-6 * max(1.0, abs(b)):
+            return True
+    return False
+
+
+def reconstruir(area_ids=None, corregir=True, using=None):
+    """
+    Reconcilia los resúmenes contra RegistroOEE y RegistroOEEArchivado
+    (los registros archivados siguen contando en los resúmenes).
+
+    Retorna {nombre_modelo: cantidad_de_diferencias}. Con corregir=True
+    reemplaza los resúmenes afectados por los valores recalculados.
+    """
+    from .models import RegistroOEE, RegistroOEEArchivado
+    from . import tiempo_real
+
+    using = _base(using)
+    consultas = [RegistroOEE.objects.using(using), RegistroOEEArchivado.objects.using(using)]
+    if area_ids is not None:
+        consultas = [registros.filter(area_id__in=area_ids) for registros in consultas]
+
+    diferencias = {}
+    for modelo, agrupar_por in zip(_modelos(), [('area_id',), ('area_id', 'fecha'), ('area_id', 'turno')]):
+        esperados = _agregados_esperados(consultas, agrupar_por)
+        existentes = modelo.objects.using(using)
+        if area_ids is not None:
+            existentes = existentes.filter(area_id__in=area_ids)
+        actuales = {
+            tuple(fila[c] for c in agrupar_por): fila
+            for fila in existentes.values(*agrupar_por, 'total_registros', *[f'suma_{c}' for c in CAMPOS])
+        }
+
+        claves = set(esperados) | set(actuales)
+        vacio = {'total_registros': 0, **{f'suma_{c}': 0 for c in CAMPOS}}
+        erroneas = [
+            clave for clave in claves
+            if _difiere(actuales.get(clave, vacio), esperados.get(clave, vacio))
+        ]
+        diferencias[modelo.__name__] = len(erroneas)
+
+        if corregir and erroneas:
+            with transaction.atomic(using=using):
+                existentes.delete()
+                modelo.objects.using(using).bulk_create(
+                    [modelo(**fila) for fila in esperados.values()],
+                    batch_size=1000,
+                )
+                versionado.marcar_cambio(using=using)
+                tiempo_real.publicar_lote(area_ids)
+    return diferencias
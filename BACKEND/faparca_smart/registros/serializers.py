@@ -1,6 +1,7 @@
 # registros/serializers.py
 from rest_framework import serializers
 from .models import RegistroOEE
+from .archivo import existe
 from areas.serializers import AreaListSerializer
 
 class RegistroOEESerializer(serializers.ModelSerializer):
@@ -11,6 +12,15 @@ class RegistroOEESerializer(serializers.ModelSerializer):
         model = RegistroOEE
         fields = '__all__'
         read_only_fields = ['disponibilidad', 'rendimiento', 'calidad', 'oee', 'usuario']
+    
+    def validate(self, attrs):
+        # unique_together solo cubre la tabla activa; el archivo se revisa aparte
+        clave = [attrs.get(campo, getattr(self.instance, campo, None)) for campo in ('area', 'fecha', 'turno')]
+        if None not in clave and existe(clave[0].pk, clave[1], clave[2]):
+            raise serializers.ValidationError(
+                {'non_field_errors': ['Ya existe un registro archivado para esta área, fecha y turno']}
+            )
+        return attrs
 
 class RegistroOEEListSerializer(serializers.ModelSerializer):
     area_nombre = serializers.CharField(source='area.nombre', read_only=True)
@@ -18,4 +28,20 @@ class RegistroOEEListSerializer(serializers.ModelSerializer):
     class Meta:
         model = RegistroOEE
         fields = ['id', 'area', 'area_nombre', 'fecha', 'turno', 
-                 'produccion_real', 'disponibilidad', 'rendimiento', 'oee']
\ No newline at end of file
+                 'produccion_real', 'disponibilidad', 'rendimiento', 'oee']
+
+class RegistroOEEImportSerializer(serializers.ModelSerializer):
+    """
+    Valida una fila de una planilla de importación sin tocar la base de datos.
+    El área se indica por id o código y la unicidad (área, fecha, turno) se
+    verifica por lote en registros.importacion.
+    """
+    area = serializers.CharField()
+    
+    class Meta:
+        model = RegistroOEE
+        fields = ['area', 'fecha', 'turno', 'plan_produccion', 'produccion_real',
+                 'hora_inicio', 'hora_fin', 'observaciones', 'formato_producto',
+                 'produccion_kg', 'lectura_inicial', 'lectura_final', 'paradas',
+                 'motivo_parada']
+        validators = []
@@ -0,0 +1,88 @@
+# registros/signals.py
+"""
+Señales de la app registros
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from areas.models import Area
+from core import versionado
+from .models import RegistroOEE, RegistroOEEArchivado
+from . import resumenes, tiempo_real
+
+
+@receiver(pre_save, sender=Area)
+def detectar_cambio_capacidad(sender, instance, raw=False, **kwargs):
+    """Marca el área si cambió algún dato que afecta el cálculo del OEE"""
+    instance._requiere_recalculo = False
+    if raw or instance.pk is None:
+        return
+    anterior = Area.objects.filter(pk=instance.pk).values('tipo', 'capacidad_teorica').first()
+    if anterior is not None:
+        instance._requiere_recalculo = (
+            anterior['tipo'] != instance.tipo
+            or anterior['capacidad_teorica'] != instance.capacidad_teorica
+        )
+
+
+@receiver(post_save, sender=Area)
+def recalcular_registros_area(sender, instance, created=False, raw=False, **kwargs):
+    """Recalcula en segundo plano los registros del área modificada"""
+    if raw or created or not getattr(instance, '_requiere_recalculo', False):
+        return
+    from .recalculo import programar_recalculo
+    programar_recalculo([instance.pk])
+
+
+def _borra_el_area(origin):
+    """El borrado viene de un Area (instancia o QuerySet): sus resúmenes y reportes caen en cascada"""
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(modelo, Area)
+
+
+@receiver(pre_delete, sender=RegistroOEE)
+@receiver(pre_delete, sender=RegistroOEEArchivado)
+def completar_campos_diferidos(sender, instance, **kwargs):
+    """
+    Instancia cargada con only()/defer(): se leen los campos que faltan antes
+    de que desaparezca la fila (los usan el descuento y el canal en vivo)
+    """
+    diferidos = instance.get_deferred_fields()
+    if diferidos:
+        instance.refresh_from_db(fields=list(diferidos))
+
+
+@receiver(post_delete, sender=RegistroOEE)
+@receiver(post_delete, sender=RegistroOEEArchivado)
+def descontar_registro_eliminado(sender, instance, origin=None, using=None, **kwargs):
+    """
+    Descuenta el registro de los resúmenes dentro de la transacción del
+    borrado: instance.delete(), QuerySet.delete() y cascadas (p. ej. al
+    eliminar un usuario). Al borrar el área no hace falta: sus resúmenes y
+    reportes se eliminan con ella.
+    """
+    if origin is not None and _borra_el_area(origin):
+        return
+    resumenes.descontar_registro(instance, using)
+
+
+@receiver([post_save, post_delete], sender=RegistroOEE)
+@receiver(post_delete, sender=RegistroOEEArchivado)
+def marcar_cambio_registros(sender, using=None, **kwargs):
+    """Cualquier alta, edición o baja de un registro cambia la versión de los datos"""
+    versionado.marcar_cambio(using=using)
+
+
+@receiver([post_save, post_delete], sender=RegistroOEE)
+def publicar_cambio_registro(sender, instance, signal, using=None, raw=False, **kwargs):
+    """Envía el cambio al canal en vivo del dashboard"""
+    if raw:
+        return
+    if signal is post_delete:
+        accion = 'eliminado'
+    elif kwargs.get('created'):
+        accion = 'creado'
+    else:
+        accion = 'actualizado'
+    tiempo_real.publicar_registro(instance, accion, using=using)
@@ -0,0 +1,137 @@
+# registros/tendencias.py
+"""
+Series de tiempo de OEE agrupadas en la base de datos.
+
+Una sola consulta agrupa por período (Trunc*) y, opcionalmente, por área,
+tipo de área o turno. Los indicadores del período se ponderan en lugar de
+promediar porcentajes:
+
+  disponibilidad  ponderada por tiempo planificado (8 h por registro, por
+                  eso coincide con el promedio simple)
+  rendimiento     ponderado por tiempo operativo (disponibilidad del registro)
+  calidad         ponderada por producción real
+  oee             disponibilidad × rendimiento × calidad del período
+
+El resultado es columnar: un eje de fechas común y, por serie, un arreglo
+por indicador alineado con ese eje (None donde la serie no tiene datos).
+"""
+from django.db.models import Avg, Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .archivo import ConsultaEscalonada
+
+PERIODOS = {'dia': TruncDay, 'semana': TruncWeek, 'mes': TruncMonth}
+
+# agrupar -> (campos de la clave, campo con el nombre de la serie)
+AGRUPACIONES = {
+    'total': ((), None),
+    'area': (('area_id', 'area__nombre'), 'area__nombre'),
+    'tipo': (('area__tipo',), 'area__tipo'),
+    'turno': (('turno',), 'turno'),
+}
+
+INDICADORES = ('oee', 'disponibilidad', 'rendimiento', 'calidad')
+
+
+def _redondear(valor):
+    return None if valor is None else round(valor, 1)
+
+
+def _consulta(registros, periodo, agrupar):
+    campos, _ = AGRUPACIONES[agrupar]
+    return (
+        registros.order_by()
+        .annotate(periodo=PERIODOS[periodo]('fecha'))
+        .values('periodo', *campos)
+        .annotate(
+            # Los alias no pueden repetir nombres de campos del modelo
+            n_registros=Count('id'),
+            suma_produccion=Sum('produccion_real'),
+            media_disponibilidad=Avg('disponibilidad'),
+            suma_tiempo=Sum('disponibilidad'),
+            suma_rendimiento_x_tiempo=Sum(F('rendimiento') * F('disponibilidad')),
+            suma_calidad_x_produccion=Sum(F('calidad') * F('produccion_real')),
+        )
+        .order_by('periodo')
+    )
+
+
+def _filas(registros, periodo, agrupar):
+    """
+    Filas agrupadas. Si la consulta incluye el archivo, se agrupa cada tabla
+    por separado y se suman las filas de la misma clave.
+    """
+    if not isinstance(registros, ConsultaEscalonada):
+        return list(_consulta(registros, periodo, agrupar))
+
+    campos, _ = AGRUPACIONES[agrupar]
+    filas = {}
+    for parte in (registros.activos, registros.archivados):
+        if parte is None:
+            continue
+        for fila in _consulta(parte, periodo, agrupar):
+            clave = (fila['periodo'],) + tuple(fila[campo] for campo in campos)
+            acumulada = filas.get(clave)
+            if acumulada is None:
+                filas[clave] = fila
+                continue
+            n = acumulada['n_registros'] + fila['n_registros']
+            acumulada['media_disponibilidad'] = (
+                (acumulada['media_disponibilidad'] or 0) * acumulada['n_registros']
+                + (fila['media_disponibilidad'] or 0) * fila['n_registros']
+            ) / n
+            acumulada['n_registros'] = n
+            for suma in ('suma_produccion', 'suma_tiempo', 'suma_rendimiento_x_tiempo', 'suma_calidad_x_produccion'):
+                acumulada[suma] = (acumulada[suma] or 0) + (fila[suma] or 0)
+    return sorted(filas.values(), key=lambda fila: fila['periodo'])
+
+
+def _indicadores(fila):
+    disponibilidad = fila['media_disponibilidad'] or 0
+    tiempo, produccion = fila['suma_tiempo'], fila['suma_produccion']
+    rendimiento = fila['suma_rendimiento_x_tiempo'] / tiempo if tiempo else 0
+    calidad = fila['suma_calidad_x_produccion'] / produccion if produccion else 100
+    return {
+        'oee': disponibilidad * rendimiento * calidad / 10000,
+        'disponibilidad': disponibilidad,
+        'rendimiento': rendimiento,
+        'calidad': calidad,
+    }
+
+
+def calcular_tendencias(registros, periodo='dia', agrupar='total'):
+    """
+    Retorna {'periodo', 'agrupar', 'fechas': [...], 'series': [...]} a
+    partir del queryset de registros ya filtrado (o de una
+    archivo.ConsultaEscalonada).
+    """
+    campos, campo_nombre = AGRUPACIONES[agrupar]
+    filas = _filas(registros, periodo, agrupar)
+
+    fechas = sorted({fila['periodo'] for fila in filas})
+    posicion = {fecha: i for i, fecha in enumerate(fechas)}
+
+    series = {}
+    for fila in filas:
+        clave = fila[campos[0]] if campos else None
+        serie = series.get(clave)
+        if serie is None:
+            serie = series[clave] = {
+                'clave': clave,
+                'nombre': fila[campo_nombre] if campo_nombre else 'Total',
+                'registros': [0] * len(fechas),
+                'produccion': [0] * len(fechas),
+                **{indicador: [None] * len(fechas) for indicador in INDICADORES},
+            }
+        i = posicion[fila['periodo']]
+        serie['registros'][i] = fila['n_registros']
+        serie['produccion'][i] = fila['suma_produccion'] or 0
+        for indicador, valor in _indicadores(fila).items():
+            serie[indicador][i] = _redondear(valor)
+
+    return {
+        'periodo': periodo,
+        'agrupar': agrupar,
+        'fechas': fechas,
+        'series': sorted(series.values(), key=lambda serie: str(serie['nombre'])),
+    }
@@ -0,0 +1,84 @@
+# registros/tiempo_real.py
+"""
+Publicación de cambios en el canal en vivo del dashboard.
+
+Cada escritura publica, al confirmarse la transacción, un delta compacto:
+el registro afectado (solo clave e indicadores), los KPIs de las áreas
+afectadas y los totales globales, leídos de los resúmenes. Si el broker
+sabe que no hay suscriptores no se consulta ni se arma nada.
+
+Los usuarios con alcance restringido (usuarios/alcance.py) escuchan los
+canales de sus áreas, donde cada evento lleva solo los KPIs de esa área,
+sin los totales de planta.
+"""
+from django.db import transaction
+
+from areas import cache as cache_areas
+from core.broker import CANAL_DASHBOARD, canal_area, evento_sse, obtener_broker
+from . import resumenes
+
+CAMPOS_DELTA = ('id', 'area_id', 'fecha', 'turno', 'disponibilidad', 'rendimiento', 'calidad', 'oee')
+
+
+def _hay_suscriptores(broker, canal=CANAL_DASHBOARD):
+    return broker.suscriptores(canal) != 0
+
+
+def _kpis_areas(area_ids=None):
+    from .models import ResumenArea
+
+    por_area = ResumenArea.objects.all()
+    if area_ids is not None:
+        por_area = por_area.filter(area_id__in=area_ids)
+    return [
+        {'area': resumen.area_id, 'total_registros': resumen.total_registros,
+         **resumenes.indicadores(resumen)}
+        for resumen in por_area
+    ]
+
+
+def _kpis(area_ids=None):
+    totales = resumenes.totales()
+    return {
+        'areas': _kpis_areas(area_ids),
+        'totales': {'total_registros': totales['total_registros'], **resumenes.indicadores(totales)},
+    }
+
+
+def _publicar_por_area(broker, evento, area_ids, datos=None):
+    """Un mensaje por área con suscriptores, con solo los KPIs de esa área"""
+    if area_ids is None:
+        area_ids = cache_areas.ids()
+    for area_id in area_ids:
+        canal = canal_area(area_id)
+        if _hay_suscriptores(broker, canal):
+            broker.publicar(canal, evento_sse(evento, {**(datos or {}), 'areas': _kpis_areas([area_id])}))
+
+
+def publicar_registro(registro, accion, using=None):
+    """accion: creado | actualizado | eliminado"""
+    # Se copia ya: después de delete() la instancia pierde su pk
+    delta = {campo: getattr(registro, campo) for campo in CAMPOS_DELTA}
+    delta['area'] = delta.pop('area_id')
+
+    def enviar():
+        broker = obtener_broker()
+        if _hay_suscriptores(broker):
+            datos = {'accion': accion, 'registro': delta, **_kpis([delta['area']])}
+            broker.publicar(CANAL_DASHBOARD, evento_sse('registro', datos))
+        _publicar_por_area(broker, 'registro', [delta['area']], {'accion': accion, 'registro': delta})
+
+    transaction.on_commit(enviar, using=using)
+
+
+def publicar_lote(area_ids=None, using=None):
+    """Para las rutas masivas: un solo evento con los KPIs de las áreas afectadas"""
+    area_ids = None if area_ids is None else sorted(set(area_ids))
+
+    def enviar():
+        broker = obtener_broker()
+        if _hay_suscriptores(broker):
+            broker.publicar(CANAL_DASHBOARD, evento_sse('lote', _kpis(area_ids)))
+        _publicar_por_area(broker, 'lote', area_ids)
+
+    transaction.on_commit(enviar, using=using)
@@ -2,42 +2,243 @@ from django.shortcuts import render
 
 # Create your views here.
 # registros/views.py
-from rest_framework import viewsets, permissions
+from datetime import date, timedelta
+
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from django.db.models import Avg
-from .models import RegistroOEE
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from core.versionado import cache_por_version
+from usuarios import alcance
+from .models import RegistroOEE, RegistroOEEArchivado, ResumenArea, ResumenDiario, ResumenTurno
 from .serializers import RegistroOEESerializer, RegistroOEEListSerializer
+from .pagination import RegistroKeysetPagination
+from .filters import RegistroOEEFilterBackend
+from . import resumenes
+from .importacion import Importador, ArchivoInvalido, leer_filas
+from . import archivo, exportacion, tendencias
+
 
 class RegistroOEEViewSet(viewsets.ModelViewSet):
-    queryset = RegistroOEE.objects.all().order_by('-fecha', '-turno')
+    queryset = RegistroOEE.objects.select_related('area', 'usuario').order_by('-fecha', '-turno', '-id')
     serializer_class = RegistroOEESerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [RegistroOEEFilterBackend]
+    
+    @property
+    def paginator(self):
+        """
+        Paginación por cursor si se pide ?paginacion=cursor (o se envía un
+        cursor); si no, la paginación por número de página global.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('paginacion') == 'cursor' or 'cursor' in params:
+                self._paginator = RegistroKeysetPagination()
+            else:
+                return super().paginator
+        return self._paginator
+    
+    def get_queryset(self):
+        """Solo los registros de las áreas visibles para el usuario"""
+        return alcance.filtrar(super().get_queryset(), self.request.user)
+    
+    def filter_queryset(self, queryset):
+        """
+        La lista y la exportación suman los registros archivados cuando el
+        rango de fechas pedido empieza antes del corte del archivo, y parten
+        los filtros de varios valores en ramas por índice (ver filters.py).
+        La exportación sin fechas es el histórico completo: incluye siempre
+        el archivo (la lista sin fechas muestra solo los activos).
+        """
+        if self.action not in ('list', 'exportar'):
+            return super().filter_queryset(queryset)
+        filtros = RegistroOEEFilterBackend()
+        filtrados = filtros.filter_queryset(self.request, queryset, self)
+        desde, hasta = filtros.rango_fechas(self.request)
+        if self.action == 'exportar' and desde is None and hasta is None:
+            desde = date.min
+        archivados = alcance.filtrar(RegistroOEEArchivado.objects.select_related('area', 'usuario'), self.request.user)
+        archivados = filtros.filter_queryset(self.request, archivados, self)
+        return archivo.escalonar(filtrados, archivados, desde, hasta, filtros.particiones)
     
     def get_serializer_class(self):
         if self.action == 'list':
             return RegistroOEEListSerializer
         return RegistroOEESerializer
     
+    def _verificar_area(self, serializer):
+        area = serializer.validated_data.get('area')
+        if area is not None and not alcance.permite(self.request.user, area.pk):
+            raise PermissionDenied('No tiene acceso a esta área')
+    
     def perform_create(self, serializer):
+        self._verificar_area(serializer)
         serializer.save(usuario=self.request.user)
     
+    def perform_update(self, serializer):
+        self._verificar_area(serializer)
+        serializer.save()
+    
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser, FormParser])
+    def importar(self, request):
+        """
+        Importa registros históricos desde una planilla CSV/XLSX (campo 'archivo').
+        Retorna un reporte con los errores de cada fila rechazada.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Solo administradores pueden importar registros'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response(
+                {'error': "Debe adjuntar la planilla en el campo 'archivo'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            filas = leer_filas(archivo.file, archivo.name)
+            reporte = Importador(request.user).importar(filas)
+        except ArchivoInvalido as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(reporte, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def exportar(self, request):
+        """
+        Exporta registros en streaming (?formato=csv|ndjson). Acepta los
+        mismos filtros que la lista; sin fechas incluye los archivados.
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in exportacion.FORMATOS:
+            return Response(
+                {'error': 'Formato no soportado. Use csv o ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        registros = self.filter_queryset(alcance.filtrar(RegistroOEE.objects.all(), request.user))
+        contenido, content_type, extension = exportacion.exportar(registros, formato)
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        nombre = f"registros_oee_{timezone.localdate():%Y%m%d}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+    
     @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
     def dashboard(self, request):
-        """Datos para el dashboard"""
-        registros = RegistroOEE.objects.all()
+        """Datos para el dashboard (leídos de los resúmenes por área)"""
+        totales = resumenes.totales(alcance.areas_visibles(request.user))
+        
+        return Response({
+            **resumenes.indicadores(totales),
+            'total_registros': totales['total_registros']
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def ultimos(self, request):
+        """
+        Último registro de cada área en los últimos ?dias= días (7 por
+        defecto): el estado actual de cada línea para el dashboard.
+        """
+        dias = request.query_params.get('dias', '7')
+        if not dias.isdigit() or not 1 <= int(dias) <= 366:
+            raise ValidationError({'dias': 'Debe ser un número de días entre 1 y 366'})
+        desde = timezone.localdate() - timedelta(days=int(dias) - 1)
+        registros = self.get_queryset().filter(fecha__gte=desde)
         
-        oee_promedio = registros.aggregate(
-            oee_avg=Avg('oee'),
-            disponibilidad_avg=Avg('disponibilidad'),
-            rendimiento_avg=Avg('rendimiento'),
-            calidad_avg=Avg('calidad')
-        )
+        if connection.features.can_distinct_on_fields:
+            # PostgreSQL: DISTINCT ON en una sola pasada sobre el rango de fechas
+            registros = registros.order_by('area_id', '-fecha', '-turno', '-id').distinct('area_id')
+        else:
+            ultimo = (
+                RegistroOEE.objects.filter(area_id=OuterRef('area_id'), fecha__gte=desde)
+                .order_by('-fecha', '-turno', '-id').values('id')[:1]
+            )
+            registros = registros.filter(id=Subquery(ultimo)).order_by('area_id')
+        
+        return Response(RegistroOEEListSerializer(registros, many=True).data)
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    Endpoints agregados del dashboard. Leen únicamente las tablas de
+    resúmenes, nunca la tabla completa de registros.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def summary(self, request):
+        """Resumen global, por área, por turno y del día actual (dentro del alcance del usuario)"""
+        usuario = request.user
+        totales = resumenes.totales(alcance.areas_visibles(usuario))
+        
+        por_area = [
+            {
+                'area': resumen.area_id,
+                'area_nombre': resumen.area.nombre,
+                'area_tipo': resumen.area.tipo,
+                'total_registros': resumen.total_registros,
+                **resumenes.indicadores(resumen),
+            }
+            for resumen in alcance.filtrar(ResumenArea.objects.select_related('area'), usuario).order_by('area__nombre')
+        ]
+        
+        por_turno = {}
+        for resumen in alcance.filtrar(ResumenTurno.objects.all(), usuario):
+            por_turno.setdefault(resumen.turno, ResumenTurno(turno=resumen.turno)).sumar(resumen)
+        
+        hoy = ResumenDiario(fecha=timezone.localdate())
+        for resumen in alcance.filtrar(ResumenDiario.objects.filter(fecha=hoy.fecha), usuario):
+            hoy.sumar(resumen)
         
         return Response({
-            'oee_promedio': round(oee_promedio['oee_avg'] or 0, 1),
-            'disponibilidad_promedio': round(oee_promedio['disponibilidad_avg'] or 0, 1),
-            'rendimiento_promedio': round(oee_promedio['rendimiento_avg'] or 0, 1),
-            'calidad_promedio': round(oee_promedio['calidad_avg'] or 0, 1),
-            'total_registros': registros.count()
-        })
\ No newline at end of file
+            **resumenes.indicadores(totales),
+            'total_registros': totales['total_registros'],
+            'registros_hoy': hoy.total_registros,
+            'oee_hoy': resumenes.redondear(hoy.promedio('oee')),
+            'por_area': por_area,
+            'por_turno': [
+                {'turno': turno, 'total_registros': acumulado.total_registros, **resumenes.indicadores(acumulado)}
+                for turno, acumulado in sorted(por_turno.items())
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def trends(self, request):
+        """
+        Series de OEE ponderado por período. Parámetros: periodo
+        (dia | semana | mes), agrupar (total | area | tipo | turno) y los
+        mismos filtros que la lista de registros. Sin rango de fechas
+        devuelve el último año.
+        """
+        periodo = request.query_params.get('periodo', 'dia')
+        agrupar = request.query_params.get('agrupar', 'total')
+        if periodo not in tendencias.PERIODOS:
+            raise ValidationError({'periodo': 'Debe ser dia, semana o mes'})
+        if agrupar not in tendencias.AGRUPACIONES:
+            raise ValidationError({'agrupar': 'Debe ser total, area, tipo o turno'})
+        
+        filtros = RegistroOEEFilterBackend()
+        desde, hasta = filtros.rango_fechas(request)
+        registros = filtros.filter_queryset(request, alcance.filtrar(RegistroOEE.objects.all(), request.user), self)
+        archivados = filtros.filter_queryset(request, alcance.filtrar(RegistroOEEArchivado.objects.all(), request.user), self)
+        if desde is None:
+            desde = (hasta or timezone.localdate()) - timedelta(days=364)
+            registros = registros.filter(fecha__gte=desde)
+            archivados = archivados.filter(fecha__gte=desde)
+        registros = archivo.escalonar(registros, archivados, desde)
+        
+        return Response(tendencias.calcular_tendencias(registros, periodo, agrupar))
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ReportesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reportes'
+
+    def ready(self):
+        from . import signals, tareas  # noqa: F401
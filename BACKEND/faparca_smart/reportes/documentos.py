@@ -0,0 +1,206 @@
+# reportes/documentos.py
+"""
+Archivos de los reportes exportados: JSON y CSV (solo el resumen) y XLSX y
+PDF (resumen más el detalle de registros del período).
+
+El detalle llega como un generador de filas (filas_detalle) leído con un
+cursor por bloques, y los escritores lo vuelcan fila a fila: openpyxl en
+modo write_only y el PDF página a página (ver reportes/pdf.py). La memoria
+queda acotada sin importar cuántos registros tenga el período (ver el
+comando benchmark_reportes). Con lxml instalado openpyxl serializa el XML
+varias veces más rápido que con su escritor en Python puro.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from registros import archivo
+from registros.models import RegistroOEE, RegistroOEEArchivado
+from usuarios import alcance
+from .pdf import MARGEN, DocumentoPDF, Tabla
+
+FORMATOS = {
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+CON_DETALLE = ('xlsx', 'pdf')
+
+TAMANO_CHUNK = 2000
+AVISO_CADA = 5000  # Filas entre avisos de avance
+FILAS_POR_HOJA = 1048575  # Límite de Excel menos el encabezado
+
+INDICADORES = ['total_registros', 'oee_promedio', 'disponibilidad', 'rendimiento', 'calidad',
+               'total_produccion', 'plan_total', 'cumplimiento']
+TITULOS_INDICADORES = ['Registros', 'OEE %', 'Disp. %', 'Rend. %', 'Calidad %',
+                       'Producción', 'Plan', 'Cumpl. %']
+
+# (campo en values_list(), título, ancho en el PDF, alineación)
+COLUMNAS_DETALLE = [
+    ('fecha', 'Fecha', 62, 'izq'),
+    ('turno', 'Turno', 34, 'izq'),
+    ('area__codigo', 'Área', 62, 'izq'),
+    ('plan_produccion', 'Plan', 58, 'der'),
+    ('produccion_real', 'Producción', 64, 'der'),
+    ('paradas', 'Paradas (min)', 64, 'der'),
+    ('motivo_parada', 'Motivo parada', 160, 'izq'),
+    ('disponibilidad', 'Disp. %', 50, 'der'),
+    ('rendimiento', 'Rend. %', 50, 'der'),
+    ('calidad', 'Calidad %', 54, 'der'),
+    ('oee', 'OEE %', 50, 'der'),
+]
+
+
+def consulta_detalle(desde, hasta, usuario, area_ids=None, turnos=None):
+    """Registros del período (activos y, si el rango lo alcanza, archivados)"""
+    def filtrar(registros):
+        registros = alcance.filtrar(registros.filter(fecha__range=(desde, hasta)), usuario)
+        if area_ids:
+            registros = registros.filter(area_id__in=area_ids)
+        if turnos:
+            registros = registros.filter(turno__in=turnos)
+        return registros
+
+    activos = filtrar(RegistroOEE.objects.order_by('fecha', 'turno', 'area__codigo'))
+    return archivo.escalonar(activos, filtrar(RegistroOEEArchivado.objects.all()), desde, hasta)
+
+
+def filas_detalle(registros):
+    """Generador de tuplas en el orden de COLUMNAS_DETALLE"""
+    return registros.values_list(*[campo for campo, _, _, _ in COLUMNAS_DETALLE]).iterator(chunk_size=TAMANO_CHUNK)
+
+
+def _avisar(filas, avance):
+    """Llama a avance(n) cada AVISO_CADA filas sin alterar el flujo"""
+    for numero, fila in enumerate(filas, 1):
+        if avance is not None and numero % AVISO_CADA == 0:
+            avance(numero)
+        yield fila
+
+
+def _filas_resumen(reporte):
+    """(nivel, área, turno, indicadores) del total, turnos, áreas y área × turno"""
+    yield 'Total', '', '', reporte['resumen']
+    for turno in reporte['turnos']:
+        yield 'Turno', '', turno['turno'], turno
+    for area in reporte['areas']:
+        yield 'Área', area['nombre'], '', area
+        for turno in area['turnos']:
+            yield 'Área × turno', area['nombre'], turno['turno'], turno
+
+
+def _texto(salida, encoding='utf-8'):
+    return io.TextIOWrapper(salida, encoding=encoding, newline='')
+
+
+def escribir_json(reporte, salida, filas=None, avance=None):
+    texto = _texto(salida)
+    json.dump(reporte, texto, cls=DjangoJSONEncoder, ensure_ascii=False)
+    texto.flush()
+    texto.detach()
+
+
+def escribir_csv(reporte, salida, filas=None, avance=None):
+    """Una fila por nivel: total, turno, área y área × turno"""
+    # utf-8-sig: Excel reconoce los acentos al abrirlo
+    texto = _texto(salida, 'utf-8-sig')
+    writer = csv.writer(texto)
+    writer.writerow(['nivel', 'area', 'codigo', 'turno'] + INDICADORES)
+    writer.writerow(['total', '', '', ''] + [reporte['resumen'][campo] for campo in INDICADORES])
+    for turno in reporte['turnos']:
+        writer.writerow(['turno', '', '', turno['turno']] + [turno[campo] for campo in INDICADORES])
+    for area in reporte['areas']:
+        writer.writerow(['area', area['nombre'], area['codigo'], ''] + [area[campo] for campo in INDICADORES])
+        for turno in area['turnos']:
+            writer.writerow(
+                ['area_turno', area['nombre'], area['codigo'], turno['turno']]
+                + [turno[campo] for campo in INDICADORES]
+            )
+    texto.flush()
+    texto.detach()
+
+
+def _encabezado_xlsx(hoja, titulos):
+    negrita = Font(bold=True)
+    celdas = []
+    for titulo in titulos:
+        celda = WriteOnlyCell(hoja, value=titulo)
+        celda.font = negrita
+        celdas.append(celda)
+    hoja.append(celdas)
+
+
+def _hoja_detalle(libro, numero):
+    hoja = libro.create_sheet('Registros' if numero == 1 else f'Registros {numero}')
+    for indice, (_, _, ancho, _) in enumerate(COLUMNAS_DETALLE):
+        hoja.column_dimensions[chr(ord('A') + indice)].width = max(ancho / 6, 8)
+    hoja.freeze_panes = 'A2'
+    _encabezado_xlsx(hoja, [titulo for _, titulo, _, _ in COLUMNAS_DETALLE])
+    return hoja
+
+
+def escribir_xlsx(reporte, salida, filas=None, avance=None):
+    """
+    Libro write_only: las filas se serializan al agregarse y no quedan en
+    memoria. El detalle sigue en otra hoja al llegar al límite de Excel.
+    """
+    libro = Workbook(write_only=True)
+    resumen = libro.create_sheet('Resumen')
+    resumen.column_dimensions['A'].width = 14
+    resumen.column_dimensions['B'].width = 24
+    resumen.append([f"Reporte OEE {reporte['tipo']}", f"{reporte['fecha_inicio']} a {reporte['fecha_fin']}"])
+    resumen.append([])
+    _encabezado_xlsx(resumen, ['Nivel', 'Área', 'Turno'] + TITULOS_INDICADORES)
+    for nivel, area, turno, datos in _filas_resumen(reporte):
+        resumen.append([nivel, area, turno] + [datos[campo] for campo in INDICADORES])
+
+    if filas is not None:
+        hojas, en_hoja = 1, 0
+        hoja = _hoja_detalle(libro, hojas)
+        for fila in _avisar(filas, avance):
+            if en_hoja == FILAS_POR_HOJA:
+                hojas, en_hoja = hojas + 1, 0
+                hoja = _hoja_detalle(libro, hojas)
+            hoja.append(fila)
+            en_hoja += 1
+    libro.save(salida)
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return f'{valor:,.1f}'
+    return valor
+
+
+def escribir_pdf(reporte, salida, filas=None, avance=None):
+    """Resumen en la primera página y el detalle paginado a continuación"""
+    titulo = f"Reporte OEE {reporte['tipo']} {reporte['fecha_inicio']} a {reporte['fecha_fin']}"
+    documento = DocumentoPDF(salida, titulo)
+    documento.texto(MARGEN, MARGEN, titulo, tamano=14, negrita=True)
+
+    columnas = [('Nivel', 70, 'izq'), ('Área', 130, 'izq'), ('Turno', 36, 'izq')]
+    columnas += [(titulo_indicador, 62, 'der') for titulo_indicador in TITULOS_INDICADORES]
+    tabla = Tabla(documento, columnas, 'Resumen', y=MARGEN + 16)
+    for nivel, area, turno, datos in _filas_resumen(reporte):
+        tabla.fila([nivel, area, turno] + [_numero(datos[campo]) for campo in INDICADORES])
+
+    if filas is not None:
+        documento.pagina()
+        tabla = Tabla(documento, [columna[1:] for columna in COLUMNAS_DETALLE], 'Registros')
+        for fila in _avisar(filas, avance):
+            tabla.fila([_numero(valor) for valor in fila])
+    documento.cerrar()
+
+
+ESCRITORES = {
+    'json': escribir_json,
+    'csv': escribir_csv,
+    'xlsx': escribir_xlsx,
+    'pdf': escribir_pdf,
+}
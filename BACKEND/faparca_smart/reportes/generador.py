@@ -0,0 +1,153 @@
+# reportes/generador.py
+"""
+Armado de los reportes diario, semanal, mensual y personalizado a partir
+de la tabla materializada ReporteOEE (nunca de los registros).
+
+Un reporte de período fijo lee las filas de ese período; uno personalizado
+cubre el rango con meses completos (filas mensuales) y días sueltos en los
+bordes (filas diarias), de modo que un año son ~12 filas por área y turno.
+Los promedios se calculan con las sumas, igual que los resúmenes del
+dashboard.
+"""
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from registros.resumenes import redondear
+from usuarios import alcance
+from .materializacion import CAMPOS_SUMA, fin_periodo, inicio_periodo
+from .models import ReporteOEE
+
+TIPOS = {'diario': 'dia', 'semanal': 'semana', 'mensual': 'mes'}
+
+# Diferencia de OEE (puntos) contra el período anterior para marcar tendencia
+UMBRAL_TENDENCIA = 1.0
+
+
+def rango(tipo, fecha):
+    """(inicio, fin) del período fijo que contiene la fecha"""
+    periodo = TIPOS[tipo]
+    inicio = inicio_periodo(periodo, fecha)
+    return inicio, fin_periodo(periodo, inicio)
+
+
+def segmentos(desde, hasta):
+    """Condición que cubre [desde, hasta] con meses completos y días sueltos"""
+    meses, dias = [], []
+    dia = desde
+    while dia <= hasta:
+        fin_mes = fin_periodo('mes', dia)
+        if dia.day == 1 and fin_mes <= hasta:
+            meses.append(dia)
+            dia = fin_mes + timedelta(days=1)
+        else:
+            dias.append(dia)
+            dia += timedelta(days=1)
+    return Q(periodo='mes', inicio__in=meses) | Q(periodo='dia', inicio__in=dias)
+
+
+def _condicion(tipo, desde, hasta):
+    if tipo in TIPOS:
+        return Q(periodo=TIPOS[tipo], inicio=desde)
+    return segmentos(desde, hasta)
+
+
+def _filas(condicion, usuario, area_ids=None, turnos=None, por_turno=True):
+    filas = alcance.filtrar(ReporteOEE.objects.filter(condicion), usuario)
+    if area_ids:
+        filas = filas.filter(area_id__in=area_ids)
+    if turnos:
+        filas = filas.filter(turno__in=turnos)
+    grupo = ['area_id', 'area__nombre', 'area__codigo', 'area__tipo'] + (['turno'] if por_turno else [])
+    return (
+        filas.values(*grupo)
+        .annotate(**{campo: Sum(campo) for campo in CAMPOS_SUMA})
+        .order_by('area__nombre', *(['turno'] if por_turno else []))
+    )
+
+
+def _sumar(acumulado, fila):
+    for campo in CAMPOS_SUMA:
+        acumulado[campo] = acumulado.get(campo, 0) + (fila[campo] or 0)
+    return acumulado
+
+
+def indicadores(acumulado):
+    """Indicadores de un acumulado de sumas (área, turno o total)"""
+    total = acumulado.get('total_registros', 0)
+    plan, produccion = acumulado.get('suma_plan', 0), acumulado.get('suma_produccion', 0)
+
+    def promedio(campo):
+        return redondear(acumulado[f'suma_{campo}'] / total) if total else 0
+
+    return {
+        'total_registros': total,
+        'oee_promedio': promedio('oee'),
+        'disponibilidad': promedio('disponibilidad'),
+        'rendimiento': promedio('rendimiento'),
+        'calidad': promedio('calidad'),
+        'total_produccion': redondear(produccion),
+        'plan_total': redondear(plan),
+        'cumplimiento': redondear(produccion / plan * 100) if plan else 0,
+    }
+
+
+def _oee_anterior(tipo, desde, usuario, area_ids, turnos):
+    """OEE promedio de cada área en el período anterior"""
+    anterior = inicio_periodo(TIPOS[tipo], desde - timedelta(days=1))
+    return {
+        fila['area_id']: indicadores(fila)['oee_promedio']
+        for fila in _filas(Q(periodo=TIPOS[tipo], inicio=anterior), usuario, area_ids, turnos, por_turno=False)
+    }
+
+
+def _tendencia(actual, previo):
+    """'mejorando' | 'empeorando' | 'estable' (None sin datos del período anterior)"""
+    if previo is None:
+        return None
+    if actual - previo > UMBRAL_TENDENCIA:
+        return 'mejorando'
+    if previo - actual > UMBRAL_TENDENCIA:
+        return 'empeorando'
+    return 'estable'
+
+
+def generar(tipo, desde, hasta, usuario, area_ids=None, turnos=None):
+    """
+    Reporte del tipo pedido ('diario', 'semanal', 'mensual' o
+    'personalizado') dentro del alcance del usuario.
+    """
+    areas, por_turno, total = {}, {}, {}
+    for fila in _filas(_condicion(tipo, desde, hasta), usuario, area_ids, turnos):
+        area = areas.setdefault(fila['area_id'], {
+            'id': fila['area_id'],
+            'nombre': fila['area__nombre'],
+            'codigo': fila['area__codigo'],
+            'tipo': fila['area__tipo'],
+            'sumas': {},
+            'turnos': [],
+        })
+        _sumar(area['sumas'], fila)
+        area['turnos'].append({'turno': fila['turno'], **indicadores(fila)})
+        _sumar(por_turno.setdefault(fila['turno'], {}), fila)
+        _sumar(total, fila)
+
+    previos = _oee_anterior(tipo, desde, usuario, area_ids, turnos) if tipo in TIPOS else {}
+    resultado_areas = []
+    for area in areas.values():
+        sumas = area.pop('sumas')
+        datos = {**area, **indicadores(sumas)}
+        if tipo in TIPOS:
+            datos['tendencia'] = _tendencia(datos['oee_promedio'], previos.get(area['id']))
+        resultado_areas.append(datos)
+
+    return {
+        'tipo': tipo,
+        'fecha_inicio': desde,
+        'fecha_fin': hasta,
+        'fecha_generacion': timezone.now(),
+        'resumen': indicadores(total),
+        'areas': resultado_areas,
+        'turnos': [{'turno': turno, **indicadores(sumas)} for turno, sumas in sorted(por_turno.items())],
+    }
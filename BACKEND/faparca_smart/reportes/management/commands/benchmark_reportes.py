@@ -0,0 +1,164 @@
+# reportes/management/commands/benchmark_reportes.py
+"""
+Mide tiempo y memoria pico de los escritores XLSX y PDF de los reportes
+(reportes/documentos.py) para distintos tamaños de detalle.
+
+Cada medición corre en un proceso hijo nuevo: su memoria pico (VmHWM)
+menos la memoria al empezar es lo que consumió el escritor. Con escritura
+en streaming el incremento debe mantenerse plano de 1k a 1M filas.
+Por defecto las filas son sintéticas (no toca la base de datos); con
+--origen db se leen los primeros N registros reales con el mismo cursor
+por bloques que usa la exportación.
+Uso: python manage.py benchmark_reportes [--filas 1000,10000,100000,1000000] [--formatos xlsx,pdf] [--origen sintetico]
+"""
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from registros.models import RegistroOEE
+from reportes import documentos, generador
+
+MOTIVOS = ['', 'Cambio de formato', 'Falla eléctrica en la línea 2', 'Falta de material', 'Mantenimiento preventivo']
+
+
+def _memoria_kb(campo):
+    """VmRSS / VmHWM del proceso en KiB (ru_maxrss si no hay /proc)"""
+    try:
+        with open('/proc/self/status') as estado:
+            for linea in estado:
+                if linea.startswith(campo + ':'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _filas_sinteticas(cantidad):
+    inicio = date(2020, 1, 1)
+    for numero in range(cantidad):
+        dia, turno = divmod(numero, 3)
+        oee = 50 + numero % 45
+        yield (
+            inicio + timedelta(days=dia // 8), 'ABC'[turno], f'E{dia % 8 + 1}',
+            1000.0, 10.0 * oee, numero % 40, MOTIVOS[numero % len(MOTIVOS)],
+            100.0 - numero % 10, float(oee), 100.0, oee * 0.9,
+        )
+
+
+def _reporte_sintetico():
+    return {
+        'tipo': 'personalizado',
+        'fecha_inicio': date(2020, 1, 1),
+        'fecha_fin': date(2024, 12, 31),
+        'fecha_generacion': timezone.now(),
+        'resumen': generador.indicadores({}),
+        'areas': [],
+        'turnos': [],
+    }
+
+
+def _medir(formato, cantidad, origen, resultados):
+    if origen == 'db':
+        connection.close()  # El hijo no comparte la conexión del padre
+        registros = RegistroOEE.objects.order_by('fecha', 'turno', 'area__codigo')[:cantidad]
+        filas = documentos.filas_detalle(registros)
+    else:
+        filas = _filas_sinteticas(cantidad)
+
+    contadas = [0]
+
+    def contar(filas):
+        for fila in filas:
+            contadas[0] += 1
+            yield fila
+
+    rss_inicial = _memoria_kb('VmRSS')
+    inicio = time.perf_counter()
+    with tempfile.TemporaryFile() as salida:
+        documentos.ESCRITORES[formato](_reporte_sintetico(), salida, contar(filas))
+        tamano = salida.tell()
+    resultados.put({
+        'filas': contadas[0],
+        'segundos': time.perf_counter() - inicio,
+        'inicial_mb': rss_inicial / 1024,
+        'pico_mb': _memoria_kb('VmHWM') / 1024,
+        'archivo_mb': tamano / 1024 / 1024,
+    })
+
+
+class Command(BaseCommand):
+    help = 'Mide la memoria pico de los escritores XLSX y PDF de reportes según el número de filas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            default='1000,10000,100000,1000000',
+            help='Tamaños a medir separados por coma (default: 1000,10000,100000,1000000)'
+        )
+        parser.add_argument(
+            '--formatos',
+            default='xlsx,pdf',
+            help='Formatos a medir (default: xlsx,pdf)'
+        )
+        parser.add_argument(
+            '--origen',
+            choices=['sintetico', 'db'],
+            default='sintetico',
+            help='Filas sintéticas o los primeros N registros de la base (default: sintetico)'
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=25.0,
+            help='MB de diferencia de incremento aceptada entre el menor y el mayor tamaño (default: 25)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = sorted(int(valor) for valor in options['filas'].split(','))
+        except ValueError:
+            raise CommandError('--filas debe ser una lista de enteros separados por coma')
+        formatos = [formato.strip() for formato in options['formatos'].split(',')]
+        for formato in formatos:
+            if formato not in documentos.CON_DETALLE:
+                raise CommandError(f'Formato no soportado: {formato}. Use xlsx o pdf')
+
+        # fork: el hijo hereda Django configurado; la medición es lo que crece después
+        contexto = multiprocessing.get_context('fork')
+        estable = True
+        for formato in formatos:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{formato.upper()}'))
+            self.stdout.write(f'{"Filas":>10} {"Tiempo":>9} {"Filas/s":>9} {"Archivo":>10} {"RSS pico":>10} {"Incremento":>11}')
+            incrementos = []
+            for cantidad in tamanos:
+                resultados = contexto.Queue()
+                proceso = contexto.Process(target=_medir, args=(formato, cantidad, options['origen'], resultados))
+                proceso.start()
+                medicion = resultados.get()
+                proceso.join()
+                incremento = medicion['pico_mb'] - medicion['inicial_mb']
+                incrementos.append(incremento)
+                self.stdout.write(
+                    f'{medicion["filas"]:>10} {medicion["segundos"]:>8.2f}s '
+                    f'{medicion["filas"] / max(medicion["segundos"], 1e-9):>9.0f} '
+                    f'{medicion["archivo_mb"]:>8.1f}MB {medicion["pico_mb"]:>8.1f}MB {incremento:>9.1f}MB'
+                )
+            variacion = max(incrementos) - min(incrementos)
+            if variacion > options['tolerancia']:
+                estable = False
+                self.stdout.write(self.style.WARNING(
+                    f'Memoria no acotada: el incremento varía {variacion:.1f}MB entre tamaños'
+                ))
+            else:
+                self.stdout.write(f'Variación del incremento entre tamaños: {variacion:.1f}MB')
+
+        if not estable:
+            raise CommandError('La memoria pico crece con el número de filas')
+        self.stdout.write(self.style.SUCCESS('\n✓ Memoria pico estable para todos los tamaños'))
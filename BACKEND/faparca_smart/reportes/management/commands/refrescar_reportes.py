@@ -0,0 +1,34 @@
+# reportes/management/commands/refrescar_reportes.py
+"""
+Comando para refrescar la tabla materializada de reportes.
+Uso: python manage.py refrescar_reportes [--completo]
+
+Sin opciones procesa solo los días pendientes (normalmente ya los refresca
+cada escritura al confirmarse; sirve si un proceso terminó antes); --completo reconstruye todos los períodos desde los
+registros activos y archivados.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes import materializacion
+
+
+class Command(BaseCommand):
+    help = 'Refresca los reportes OEE materializados de los días modificados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Reconstruye todos los reportes desde cero'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['completo']:
+            resultado = f'Filas reconstruidas: {materializacion.reconstruir()}'
+        else:
+            resultado = f'Días procesados: {materializacion.refrescar()}'
+        self.stdout.write(f'{resultado} | Tiempo: {time.perf_counter() - inicio:.2f}s')
+        self.stdout.write(self.style.SUCCESS('✓ Reportes actualizados'))
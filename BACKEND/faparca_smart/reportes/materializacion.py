@@ -0,0 +1,282 @@
+# reportes/materializacion.py
+"""
+Mantenimiento de la tabla materializada ReporteOEE (día / semana / mes ×
+área × turno).
+
+Cada escritura de registros (save, delete, importación, recálculo) envía
+resumenes.dias_modificados y aquí se anotan esos (área, día) en
+DiaPendiente dentro de la misma transacción: el costo en la escritura es
+un INSERT que ignora duplicados.
+
+refrescar() toma los días pendientes, recalcula desde los registros
+(activos y archivados) solo los períodos que los contienen y los reemplaza
+en ReporteOEE. Lo dispara el lado que escribe: al confirmarse la escritura
+programar_refresco() lo corre en un hilo de fondo (uno por proceso; las
+escrituras que llegan mientras corre se juntan en una pasada más). También
+lo llaman la exportación y el comando refrescar_reportes. Los endpoints de
+reportes solo leen: con días pendientes en el rango marcan el reporte como
+desactualizado (ver pendiente()).
+reconstruir() rehace todo el historial de una vez (cargas masivas y
+refrescar_reportes --completo).
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from registros.models import RegistroOEE, RegistroOEEArchivado
+from registros.resumenes import CAMPOS
+from .models import DiaPendiente, ReporteOEE
+
+TAMANO_LOTE = 2000
+PERIODOS_POR_CONSULTA = 100
+AREAS_POR_CONSULTA = 50
+
+TRUNCAR = {'dia': TruncDay, 'semana': TruncWeek, 'mes': TruncMonth}
+
+CAMPOS_SUMA = ['total_registros'] + [f'suma_{c}' for c in CAMPOS] + ['suma_plan', 'suma_produccion']
+
+logger = logging.getLogger(__name__)
+
+_refresco_lock = threading.Lock()
+_refrescando = False
+_repetir = False
+
+
+def inicio_periodo(periodo, fecha):
+    """Primer día del período que contiene la fecha (lunes para semanas)"""
+    if periodo == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def fin_periodo(periodo, inicio):
+    """Último día del período que empieza en `inicio`"""
+    if periodo == 'semana':
+        return inicio + timedelta(days=6)
+    if periodo == 'mes':
+        siguiente = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return siguiente - timedelta(days=1)
+    return inicio
+
+
+def marcar(dias, using=None):
+    """Anota días (área, fecha) cuyos reportes hay que refrescar"""
+    DiaPendiente.objects.db_manager(using).bulk_create(
+        [DiaPendiente(area_id=area_id, fecha=fecha) for area_id, fecha in dias],
+        ignore_conflicts=True,
+    )
+
+
+def _anotaciones():
+    anotaciones = {'total_registros': Count('id')}
+    anotaciones.update({f'suma_{c}': Sum(c) for c in CAMPOS})
+    anotaciones.update(suma_plan=Sum('plan_produccion'), suma_produccion=Sum('produccion_real'))
+    return anotaciones
+
+
+def _agregar(periodo, area_ids, inicios):
+    """Filas de ReporteOEE recalculadas para esas áreas y períodos"""
+    rangos = Q()
+    for inicio in inicios:
+        rangos |= Q(fecha__range=(inicio, fin_periodo(periodo, inicio)))
+
+    acumulados = {}
+    for modelo in (RegistroOEE, RegistroOEEArchivado):
+        filas = (
+            modelo.objects.filter(rangos, area_id__in=area_ids)
+            .annotate(inicio=TRUNCAR[periodo]('fecha'))
+            .values('inicio', 'area_id', 'turno')
+            .annotate(**_anotaciones())
+            .order_by()
+        )
+        for fila in filas:
+            clave = (fila['inicio'], fila['area_id'], fila['turno'])
+            acumulado = acumulados.setdefault(clave, dict.fromkeys(CAMPOS_SUMA, 0))
+            for campo in CAMPOS_SUMA:
+                acumulado[campo] += fila[campo] or 0
+
+    return [
+        ReporteOEE(periodo=periodo, inicio=inicio, area_id=area_id, turno=turno, **sumas)
+        for (inicio, area_id, turno), sumas in acumulados.items()
+    ]
+
+
+def _recalcular(dias):
+    """Reemplaza los reportes de los períodos que contienen esos días"""
+    area_ids = {area_id for area_id, _ in dias}
+    for periodo in TRUNCAR:
+        inicios = sorted({inicio_periodo(periodo, fecha) for _, fecha in dias})
+        # Se borran también los períodos que quedaron sin registros
+        ReporteOEE.objects.filter(periodo=periodo, area_id__in=area_ids, inicio__in=inicios).delete()
+        for i in range(0, len(inicios), PERIODOS_POR_CONSULTA):
+            filas = _agregar(periodo, area_ids, inicios[i:i + PERIODOS_POR_CONSULTA])
+            # update_conflicts: otro refresco concurrente pudo insertar el mismo período
+            ReporteOEE.objects.bulk_create(
+                filas,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['periodo', 'inicio', 'area', 'turno'],
+                update_fields=CAMPOS_SUMA,
+            )
+
+
+def refrescar(tamano_lote=TAMANO_LOTE):
+    """
+    Procesa los días pendientes por lotes, cada uno en su transacción.
+    Retorna la cantidad de días procesados.
+    """
+    if not DiaPendiente.objects.exists():
+        return 0
+
+    procesados = 0
+    while True:
+        with transaction.atomic():
+            pendientes = DiaPendiente.objects.order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Dos refrescos simultáneos se reparten los días en lugar de esperarse
+                pendientes = pendientes.select_for_update(skip_locked=True)
+            pendientes = list(pendientes.values_list('id', 'area_id', 'fecha')[:tamano_lote])
+            if not pendientes:
+                break
+            _recalcular({(area_id, fecha) for _, area_id, fecha in pendientes})
+            DiaPendiente.objects.filter(id__in=[pk for pk, _, _ in pendientes]).delete()
+        procesados += len(pendientes)
+        if len(pendientes) < tamano_lote:
+            break
+    return procesados
+
+
+def pendiente(desde, hasta, area_ids=None):
+    """True si hay días sin refrescar en el rango (los reportes aún no los reflejan)"""
+    pendientes = DiaPendiente.objects.filter(fecha__range=(desde, hasta))
+    if area_ids:
+        pendientes = pendientes.filter(area_id__in=area_ids)
+    return pendientes.exists()
+
+
+def _refrescar_en_hilo():
+    global _refrescando, _repetir
+    try:
+        while True:
+            with _refresco_lock:
+                _repetir = False
+            refrescar()
+            with _refresco_lock:
+                if not _repetir:
+                    _refrescando = False
+                    return
+    except Exception:
+        logger.exception('Error refrescando los reportes materializados')
+        with _refresco_lock:
+            _refrescando = False
+    finally:
+        connection.close()
+
+
+def programar_refresco():
+    """
+    Refresca los días pendientes fuera de la petición que escribió. Corre en
+    un hilo de fondo salvo que REPORTES_REFRESCO_EN_SEGUNDO_PLANO sea False;
+    si ya hay uno corriendo solo le pide otra pasada.
+    """
+    global _refrescando, _repetir
+    if not getattr(settings, 'REPORTES_REFRESCO_EN_SEGUNDO_PLANO', True):
+        refrescar()
+        return
+    with _refresco_lock:
+        if _refrescando:
+            _repetir = True
+            return
+        _refrescando = True
+    threading.Thread(target=_refrescar_en_hilo, name='refresco-reportes', daemon=True).start()
+
+
+def _sumas_diarias(area_ids):
+    """
+    {(fecha, area_id, turno): [sumas en el orden de CAMPOS_SUMA]} de todo el
+    historial de esas áreas: un GROUP BY sin truncar fechas por tabla
+    """
+    sumas = {}
+    for modelo in (RegistroOEE, RegistroOEEArchivado):
+        filas = (
+            modelo.objects.filter(area_id__in=area_ids)
+            .values_list('fecha', 'area_id', 'turno')
+            .annotate(**_anotaciones())
+            .order_by()
+        )
+        for fecha, area_id, turno, *valores in filas:
+            acumulado = sumas.setdefault((fecha, area_id, turno), [0] * len(CAMPOS_SUMA))
+            for indice, valor in enumerate(valores):
+                acumulado[indice] += valor or 0
+    return sumas
+
+
+def _insertar(filas):
+    """INSERT con executemany de (periodo, inicio, area_id, turno, *CAMPOS_SUMA)"""
+    ops = connection.ops
+    ahora = ops.adapt_datetimefield_value(timezone.now())
+    fechas = {}
+    parametros = []
+    for periodo, inicio, area_id, turno, *valores in filas:
+        if inicio not in fechas:
+            fechas[inicio] = ops.adapt_datefield_value(inicio)
+        parametros.append((periodo, fechas[inicio], area_id, turno, *valores, ahora))
+
+    qn = ops.quote_name
+    columnas = ['periodo', 'inicio', 'area_id', 'turno'] + CAMPOS_SUMA + ['updated_at']
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {qn(ReporteOEE._meta.db_table)} ({", ".join(qn(c) for c in columnas)}) '
+            f'VALUES ({", ".join(["%s"] * len(columnas))})',
+            parametros,
+        )
+
+
+def reconstruir(area_ids=None):
+    """
+    Reconstruye desde cero los reportes (de todas las áreas o de esas).
+    En lugar de pasar día por día por refrescar(), suma una vez el historial
+    de cada grupo de áreas por día y de ahí arma semanas y meses.
+    Retorna la cantidad de filas de ReporteOEE creadas.
+    """
+    if area_ids is None:
+        area_ids = sorted(
+            set(RegistroOEE.objects.values_list('area_id', flat=True).distinct().order_by())
+            | set(RegistroOEEArchivado.objects.values_list('area_id', flat=True).distinct().order_by())
+        )
+        reportes, pendientes = ReporteOEE.objects.all(), DiaPendiente.objects.all()
+    else:
+        reportes = ReporteOEE.objects.filter(area_id__in=area_ids)
+        pendientes = DiaPendiente.objects.filter(area_id__in=area_ids)
+
+    creadas = 0
+    with transaction.atomic():
+        reportes._raw_delete(reportes.db)
+        pendientes._raw_delete(pendientes.db)
+        for i in range(0, len(area_ids), AREAS_POR_CONSULTA):
+            diarias = _sumas_diarias(area_ids[i:i + AREAS_POR_CONSULTA])
+            for periodo in TRUNCAR:
+                if periodo == 'dia':
+                    filas = [('dia', *clave, *valores) for clave, valores in diarias.items()]
+                else:
+                    agrupadas = {}
+                    for (fecha, area_id, turno), valores in diarias.items():
+                        clave = (inicio_periodo(periodo, fecha), area_id, turno)
+                        acumulado = agrupadas.get(clave)
+                        if acumulado is None:
+                            agrupadas[clave] = list(valores)
+                        else:
+                            for indice, valor in enumerate(valores):
+                                acumulado[indice] += valor
+                    filas = [(periodo, *clave, *valores) for clave, valores in agrupadas.items()]
+                _insertar(filas)
+                creadas += len(filas)
+    return creadas
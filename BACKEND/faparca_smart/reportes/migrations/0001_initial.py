@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def marcar_dias_existentes(apps, schema_editor):
+    """Deja pendientes los días con registros: el primer refresco arma los reportes"""
+    DiaPendiente = apps.get_model('reportes', 'DiaPendiente')
+    dias = set()
+    for nombre in ('RegistroOEE', 'RegistroOEEArchivado'):
+        modelo = apps.get_model('registros', nombre)
+        dias.update(modelo.objects.values_list('area_id', 'fecha').distinct().order_by())
+    DiaPendiente.objects.bulk_create(
+        [DiaPendiente(area_id=area_id, fecha=fecha) for area_id, fecha in dias],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('registros', '0006_registros_archivados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='areas.area')),
+            ],
+            options={
+                'verbose_name': 'Día pendiente de reporte',
+                'verbose_name_plural': 'Días pendientes de reporte',
+                'constraints': [models.UniqueConstraint(fields=('area', 'fecha'), name='dia_pendiente_area_fecha')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteOEE',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_registros', models.IntegerField(default=0)),
+                ('suma_disponibilidad', models.FloatField(default=0)),
+                ('suma_rendimiento', models.FloatField(default=0)),
+                ('suma_calidad', models.FloatField(default=0)),
+                ('suma_oee', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('semana', 'Semana'), ('mes', 'Mes')], max_length=6)),
+                ('inicio', models.DateField(help_text='Primer día del período (lunes para semanas)')),
+                ('turno', models.CharField(choices=[('A', 'Turno A (06:00-14:00)'), ('B', 'Turno B (14:00-22:00)'), ('C', 'Turno C (22:00-06:00)')], max_length=1)),
+                ('suma_plan', models.FloatField(default=0)),
+                ('suma_produccion', models.FloatField(default=0)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='areas.area')),
+            ],
+            options={
+                'verbose_name': 'Reporte OEE',
+                'verbose_name_plural': 'Reportes OEE',
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'inicio', 'area', 'turno'), name='reporte_periodo_area_turno')],
+            },
+        ),
+        migrations.RunPython(marcar_dias_existentes, migrations.RunPython.noop),
+    ]
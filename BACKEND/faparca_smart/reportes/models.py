@@ -0,0 +1,50 @@
+# reportes/models.py
+from django.db import models
+
+from registros.models import RegistroOEE, ResumenOEEBase
+
+
+class ReporteOEE(ResumenOEEBase):
+    """
+    Acumulado materializado por período (día, semana o mes), área y turno.
+    Se refresca solo para los períodos tocados (ver reportes/materializacion.py).
+    """
+    PERIODOS = [
+        ('dia', 'Día'),
+        ('semana', 'Semana'),
+        ('mes', 'Mes'),
+    ]
+
+    periodo = models.CharField(max_length=6, choices=PERIODOS)
+    inicio = models.DateField(help_text='Primer día del período (lunes para semanas)')
+    area = models.ForeignKey('areas.Area', on_delete=models.CASCADE)
+    turno = models.CharField(max_length=1, choices=RegistroOEE.TURNOS)
+    suma_plan = models.FloatField(default=0)
+    suma_produccion = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            # También es el índice de lectura: período + rango de fechas
+            models.UniqueConstraint(fields=['periodo', 'inicio', 'area', 'turno'], name='reporte_periodo_area_turno'),
+        ]
+        verbose_name = "Reporte OEE"
+        verbose_name_plural = "Reportes OEE"
+
+    def __str__(self):
+        return f"{self.periodo} {self.inicio} - {self.area_id} - {self.turno}"
+
+
+class DiaPendiente(models.Model):
+    """Día de un área con registros modificados cuyos reportes falta refrescar"""
+    area = models.ForeignKey('areas.Area', on_delete=models.CASCADE)
+    fecha = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['area', 'fecha'], name='dia_pendiente_area_fecha'),
+        ]
+        verbose_name = "Día pendiente de reporte"
+        verbose_name_plural = "Días pendientes de reporte"
+
+    def __str__(self):
+        return f"{self.area_id} - {self.fecha}"
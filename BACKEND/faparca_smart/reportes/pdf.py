@@ -0,0 +1,159 @@
+# reportes/pdf.py
+"""
+Escritor PDF mínimo en streaming para los reportes: texto en Helvetica
+(fuentes estándar, sin incrustar) y tablas paginadas.
+
+Cada página se escribe al archivo apenas se llena (comprimida con
+FlateDecode), así que la memoria no depende del número de filas; solo se
+guardan los offsets de los objetos para la tabla xref final (unos bytes por
+página).
+"""
+import zlib
+from array import array
+
+ANCHO, ALTO = 842, 595  # A4 horizontal, en puntos
+MARGEN = 36
+
+# Anchos de Helvetica (milésimas del tamaño) para alinear números a la derecha
+_ANCHOS = {**dict.fromkeys('0123456789', 556), '.': 278, ',': 278, '-': 333, ' ': 278, '%': 889}
+_ANCHO_MEDIO = 556
+
+
+def ancho_texto(texto, tamano):
+    return sum(_ANCHOS.get(caracter, _ANCHO_MEDIO) for caracter in texto) * tamano / 1000
+
+
+def _literal(texto):
+    """Cadena PDF entre paréntesis en WinAnsiEncoding"""
+    datos = texto.encode('cp1252', 'replace')
+    return b'(' + datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class DocumentoPDF:
+    """
+    Documento que se escribe en `salida` (archivo binario) página a página.
+    Los números de objeto 1 y 2 quedan reservados para el árbol de páginas
+    y el catálogo, que se escriben al cerrar.
+    """
+    PAGINAS, CATALOGO, FUENTE, FUENTE_NEGRITA = 1, 2, 3, 4
+
+    def __init__(self, salida, titulo=''):
+        self.salida = salida
+        self.titulo = titulo
+        self.posicion = 0
+        self.offsets = array('q', [0] * 4)
+        self.paginas = array('l')
+        self._operaciones = []
+        self._escribir(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for numero, fuente in ((self.FUENTE, b'Helvetica'), (self.FUENTE_NEGRITA, b'Helvetica-Bold')):
+            self._objeto(
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /' + fuente + b' /Encoding /WinAnsiEncoding >>',
+                numero
+            )
+
+    def _escribir(self, datos):
+        self.salida.write(datos)
+        self.posicion += len(datos)
+
+    def _objeto(self, contenido, numero=None):
+        if numero is None:
+            self.offsets.append(0)
+            numero = len(self.offsets)
+        self.offsets[numero - 1] = self.posicion
+        self._escribir(b'%d 0 obj\n' % numero + contenido + b'\nendobj\n')
+        return numero
+
+    def texto(self, x, y, texto, tamano=8, negrita=False):
+        """Texto con origen en (x, y) medido desde la esquina superior izquierda"""
+        fuente = b'/F2' if negrita else b'/F1'
+        self._operaciones.append(
+            b'BT %s %d Tf %.1f %.1f Td %s Tj ET' % (fuente, tamano, x, ALTO - y, _literal(str(texto)))
+        )
+
+    def linea(self, x1, y, x2):
+        self._operaciones.append(b'%.1f %.1f m %.1f %.1f l S' % (x1, ALTO - y, x2, ALTO - y))
+
+    def pagina(self):
+        """Escribe la página en curso (si tiene contenido) y empieza otra"""
+        if not self._operaciones:
+            return
+        pie = f'{self.titulo} - Página {len(self.paginas) + 1}'.lstrip(' -')
+        self.texto(MARGEN, ALTO - MARGEN / 2, pie, tamano=7)
+        contenido = zlib.compress(b'\n'.join(self._operaciones), 6)
+        self._operaciones = []
+        flujo = self._objeto(
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(contenido) + contenido + b'\nendstream'
+        )
+        self.paginas.append(self._objeto(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>'
+            % (self.PAGINAS, ANCHO, ALTO, flujo, self.FUENTE, self.FUENTE_NEGRITA)
+        ))
+
+    def cerrar(self):
+        self.pagina()
+        if not self.paginas:
+            self.texto(MARGEN, MARGEN, self.titulo)
+            self.pagina()
+        # El árbol de páginas lista todas las hojas: se arma por partes
+        self.offsets[self.PAGINAS - 1] = self.posicion
+        self._escribir(b'%d 0 obj\n<< /Type /Pages /Count %d /Kids [' % (self.PAGINAS, len(self.paginas)))
+        for inicio in range(0, len(self.paginas), 1000):
+            self._escribir(b' '.join(b'%d 0 R' % numero for numero in self.paginas[inicio:inicio + 1000]) + b'\n')
+        self._escribir(b'] >>\nendobj\n')
+        self._objeto(b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGINAS, self.CATALOGO)
+        informacion = self._objeto(b'<< /Title %s /Producer (Faparca Smart) >>' % _literal(self.titulo))
+
+        inicio_xref = self.posicion
+        self._escribir(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self.offsets) + 1))
+        for inicio in range(0, len(self.offsets), 1000):
+            self._escribir(b''.join(b'%010d 00000 n \n' % offset for offset in self.offsets[inicio:inicio + 1000]))
+        self._escribir(
+            b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (len(self.offsets) + 1, self.CATALOGO, informacion, inicio_xref)
+        )
+
+
+class Tabla:
+    """
+    Tabla que fluye por páginas: repite el título y los encabezados al
+    cambiar de página. `columnas` es una lista de (titulo, ancho, alineacion)
+    con alineación 'izq' o 'der'.
+    """
+    TAMANO = 8
+    ALTO_FILA = 12
+
+    def __init__(self, documento, columnas, titulo='', y=MARGEN):
+        self.documento = documento
+        self.columnas = columnas
+        self.titulo = titulo
+        self.y = y
+        self._encabezado()
+
+    def _encabezado(self):
+        if self.titulo:
+            self.documento.texto(MARGEN, self.y + 10, self.titulo, tamano=11, negrita=True)
+            self.y += 20
+        self._fila([titulo for titulo, _, _ in self.columnas], negrita=True)
+        self.documento.linea(MARGEN, self.y - 8, MARGEN + sum(ancho for _, ancho, _ in self.columnas))
+
+    def _fila(self, valores, negrita=False):
+        self.y += self.ALTO_FILA
+        x = MARGEN
+        for valor, (_, ancho, alineacion) in zip(valores, self.columnas):
+            texto = '' if valor is None else str(valor)
+            # Se recorta lo que no cabe en la columna
+            maximo = int((ancho - 4) * 1000 / (_ANCHO_MEDIO * self.TAMANO))
+            if len(texto) > maximo:
+                texto = texto[:max(maximo - 1, 0)] + '…'
+            if texto:
+                desplazamiento = ancho - 4 - ancho_texto(texto, self.TAMANO) if alineacion == 'der' else 0
+                self.documento.texto(x + desplazamiento, self.y, texto, tamano=self.TAMANO, negrita=negrita)
+            x += ancho
+
+    def fila(self, valores):
+        if self.y + self.ALTO_FILA > ALTO - MARGEN:
+            self.documento.pagina()
+            self.y = MARGEN
+            self._encabezado()
+        self._fila(valores)
@@ -0,0 +1,19 @@
+# reportes/signals.py
+"""
+Señales de la app reportes
+"""
+from django.db import transaction
+from django.dispatch import receiver
+
+from registros.resumenes import dias_modificados
+from . import materializacion
+
+
+@receiver(dias_modificados)
+def marcar_dias_pendientes(sender, dias, using=None, **kwargs):
+    """
+    Los días tocados quedan pendientes en la misma transacción que la
+    escritura y se refrescan al confirmarla
+    """
+    materializacion.marcar(dias, using)
+    transaction.on_commit(materializacion.programar_refresco, using=using)
@@ -0,0 +1,34 @@
+# reportes/tareas.py
+"""
+Exportación de reportes como tarea en segundo plano (ver tareas/cola.py).
+El endpoint /api/reportes/<tipo>/export/ solo encola; aquí se refresca la
+tabla materializada, se arma el reporte y se escribe el archivo con los
+escritores de reportes/documentos.py.
+"""
+from datetime import date
+
+from tareas.cola import registrar
+from . import documentos, generador, materializacion
+
+
+@registrar('reportes.exportar')
+def exportar(contexto, tipo, desde, hasta, formato, area_ids=None, turnos=None, detalle=False):
+    contexto.progreso(5, 'Actualizando reportes')
+    materializacion.refrescar()
+    contexto.progreso(20, 'Calculando indicadores')
+    desde_fecha, hasta_fecha = date.fromisoformat(desde), date.fromisoformat(hasta)
+    usuario = contexto.tarea.usuario
+    reporte = generador.generar(tipo, desde_fecha, hasta_fecha, usuario, area_ids, turnos)
+
+    filas = avance = None
+    if detalle and formato in documentos.CON_DETALLE:
+        registros = documentos.consulta_detalle(desde_fecha, hasta_fecha, usuario, area_ids, turnos)
+        total = registros.count()
+        filas = documentos.filas_detalle(registros)
+
+        def avance(escritas):
+            contexto.progreso(30 + 65 * escritas / max(total, 1), f'Escribiendo registros ({escritas}/{total})')
+
+    contexto.progreso(30, 'Escribiendo archivo')
+    documentos.ESCRITORES[formato](reporte, contexto.salida, filas, avance)
+    return f'reporte_{tipo}_{desde}_{hasta}.{formato}', documentos.FORMATOS[formato]
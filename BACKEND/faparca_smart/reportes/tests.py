@@ -0,0 +1,213 @@
+import io
+import re
+import tempfile
+import zlib
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from areas.models import Area
+from registros import archivo
+from registros.models import RegistroOEE
+from tareas import cola
+from usuarios.models import Usuario
+from . import documentos, generador, materializacion
+from .models import DiaPendiente, ReporteOEE
+
+
+@override_settings(THROTTLE_ACTIVO=False, REPORTES_REFRESCO_EN_SEGUNDO_PLANO=False)
+class ReportesTests(TestCase):
+    """Reportes leídos de la tabla materializada y refrescados por días tocados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empaque = Area.objects.create(
+            nombre='Empaque Test', codigo='EMP_TEST', tipo='empaque',
+            capacidad_teorica=1000, capacidad_real=900
+        )
+        cls.prensa = Area.objects.create(
+            nombre='Prensa Test', codigo='PRE_TEST', tipo='prensa',
+            capacidad_teorica=100, capacidad_real=90
+        )
+        cls.usuario = Usuario.objects.create_user('admin_test', password='x', rol='administrador')
+        # 2025-01-20 .. 2025-03-10, tres turnos por día en ambas áreas
+        for dia in range(50):
+            fecha = date(2025, 1, 20) + timedelta(days=dia)
+            for turno in 'ABC':
+                cls.crear(cls.empaque, fecha, turno, produccion_real=700 + dia)
+                cls.crear(cls.prensa, fecha, turno, lectura_inicial=0, lectura_final=300 + dia)
+        # En el servidor lo dispara cada escritura al confirmarse
+        materializacion.refrescar()
+
+    @classmethod
+    def crear(cls, area, fecha, turno, **datos):
+        datos.setdefault('produccion_real', 800)
+        return RegistroOEE.objects.create(
+            area=area, fecha=fecha, turno=turno, usuario=cls.usuario, plan_produccion=1000,
+            hora_inicio=time(6), hora_fin=time(14), **datos
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def reporte(self, tipo, **params):
+        respuesta = self.client.get(f'/api/reportes/{tipo}/', params)
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data
+
+    def esperado(self, desde, hasta, **filtro):
+        return RegistroOEE.objects.filter(fecha__range=(desde, hasta), **filtro).aggregate(
+            n=Count('id'), oee=Avg('oee'), produccion=Sum('produccion_real')
+        )
+
+    def assertCoincide(self, resumen, esperado):
+        self.assertEqual(resumen['total_registros'], esperado['n'])
+        self.assertAlmostEqual(resumen['oee_promedio'], esperado['oee'], places=1)
+        self.assertAlmostEqual(resumen['total_produccion'], esperado['produccion'], places=1)
+
+    def test_periodos_fijos_coinciden_con_los_registros(self):
+        mensual = self.reporte('mensual', fecha='2025-02-14')
+        self.assertEqual((mensual['fecha_inicio'], mensual['fecha_fin']), (date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertCoincide(mensual['resumen'], self.esperado(date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual([area['nombre'] for area in mensual['areas']], ['Empaque Test', 'Prensa Test'])
+        self.assertEqual([turno['turno'] for turno in mensual['areas'][0]['turnos']], ['A', 'B', 'C'])
+        self.assertEqual(mensual['areas'][0]['tendencia'], 'mejorando')
+
+        semanal = self.reporte('semanal', fecha='2025-02-14', area=self.prensa.pk, turno='A')
+        self.assertEqual(semanal['fecha_inicio'], date(2025, 2, 10))
+        self.assertCoincide(
+            semanal['resumen'],
+            self.esperado(date(2025, 2, 10), date(2025, 2, 16), area=self.prensa, turno='A'),
+        )
+        self.assertEqual(self.reporte('diario', fecha='2025-02-14')['resumen']['total_registros'], 6)
+
+    def test_personalizado_usa_meses_completos_y_dias_sueltos(self):
+        materializacion.refrescar()
+        condicion = generador.segmentos(date(2025, 1, 30), date(2025, 3, 2))
+        filas = set(ReporteOEE.objects.filter(condicion).values_list('periodo', 'inicio'))
+        self.assertEqual(filas, {
+            ('dia', date(2025, 1, 30)), ('dia', date(2025, 1, 31)), ('mes', date(2025, 2, 1)),
+            ('dia', date(2025, 3, 1)), ('dia', date(2025, 3, 2)),
+        })
+        datos = self.reporte('personalizado', fecha_inicio='2025-01-30', fecha_fin='2025-03-02')
+        self.assertCoincide(datos['resumen'], self.esperado(date(2025, 1, 30), date(2025, 3, 2)))
+
+    def test_solo_se_refrescan_los_periodos_tocados(self):
+        self.assertFalse(DiaPendiente.objects.exists())
+        otro_mes = ReporteOEE.objects.get(periodo='mes', inicio=date(2025, 1, 1), area=self.empaque, turno='A')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registro = RegistroOEE.objects.get(area=self.empaque, fecha=date(2025, 2, 14), turno='A')
+            registro.plan_produccion = 500
+            registro.save()
+            self.assertEqual(list(DiaPendiente.objects.values_list('area_id', 'fecha')), [(self.empaque.pk, date(2025, 2, 14))])
+        self.assertFalse(DiaPendiente.objects.exists())
+        self.assertEqual(self.reporte('diario', fecha='2025-02-14', area=self.empaque.pk)['resumen']['plan_total'], 2500)
+        self.assertEqual(ReporteOEE.objects.get(pk=otro_mes.pk).updated_at, otro_mes.updated_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RegistroOEE.objects.get(area=self.prensa, fecha=date(2025, 3, 10), turno='C').delete()
+        self.assertEqual(self.reporte('diario', fecha='2025-03-10')['resumen']['total_registros'], 5)
+
+    def test_la_lectura_no_escribe_y_marca_los_pendientes(self):
+        self.assertFalse(self.reporte('diario', fecha='2025-02-14')['desactualizado'])
+        registro = RegistroOEE.objects.get(area=self.empaque, fecha=date(2025, 2, 14), turno='A')
+        registro.plan_produccion = 500
+        registro.save()
+        # En el servidor la versión de datos sube al confirmar la escritura
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/api/reportes/diario/', {'fecha': '2025-02-14'})
+        self.assertTrue(respuesta.data['desactualizado'])
+        self.assertEqual(respuesta['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', respuesta)
+        escrituras = [q['sql'] for q in consultas.captured_queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(escrituras, [])
+        # Otro día del mismo mes no está afectado
+        self.assertFalse(self.reporte('diario', fecha='2025-02-13')['desactualizado'])
+
+    def test_el_archivo_no_cambia_los_reportes(self):
+        antes = self.reporte('mensual', fecha='2025-01-25')
+        archivo.archivar(antes_de=date(2025, 2, 1), tamano_lote=50, pausa=0)
+        materializacion.reconstruir()
+        cache.clear()
+        despues = self.reporte('mensual', fecha='2025-01-25')
+        self.assertEqual(despues['resumen'], antes['resumen'])
+
+    def test_alcance_del_operador(self):
+        operador = Usuario.objects.create_user('op_prensa', password='x', rol='operador', area_asignada=self.prensa)
+        self.client.force_authenticate(operador)
+        datos = self.reporte('mensual', fecha='2025-02-14')
+        self.assertEqual([area['id'] for area in datos['areas']], [self.prensa.pk])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/reportes/personalizado/').status_code, 400)
+        self.assertEqual(self.client.get('/api/reportes/personalizado/', {
+            'fecha_inicio': '2025-03-01', 'fecha_fin': '2025-02-01'
+        }).status_code, 400)
+        self.assertEqual(self.client.get('/api/reportes/diario/', {'turno': 'X'}).status_code, 400)
+
+    def documento(self, formato, desde, hasta):
+        materializacion.refrescar()
+        reporte = generador.generar('personalizado', desde, hasta, self.usuario)
+        registros = documentos.consulta_detalle(desde, hasta, self.usuario)
+        salida = io.BytesIO()
+        avisos = []
+        documentos.ESCRITORES[formato](reporte, salida, documentos.filas_detalle(registros), avisos.append)
+        return salida.getvalue(), avisos
+
+    def test_xlsx_con_detalle_de_activos_y_archivados(self):
+        archivo.archivar(antes_de=date(2025, 2, 1), tamano_lote=50, pausa=0)
+        materializacion.reconstruir()
+        with mock.patch.object(documentos, 'AVISO_CADA', 100), mock.patch.object(documentos, 'FILAS_POR_HOJA', 200):
+            contenido, avisos = self.documento('xlsx', date(2025, 1, 20), date(2025, 3, 10))
+        self.assertEqual(avisos, [100, 200, 300])
+
+        libro = load_workbook(io.BytesIO(contenido), read_only=True)
+        self.assertEqual(libro.sheetnames, ['Resumen', 'Registros', 'Registros 2'])
+        filas = [fila for hoja in libro.sheetnames[1:] for fila in libro[hoja].iter_rows(min_row=2, values_only=True)]
+        self.assertEqual(len(filas), 300)
+        # Orden por fecha y turno a través de ambas tablas y ambas hojas
+        claves = [(fila[0], fila[1], fila[2]) for fila in filas]
+        self.assertEqual(claves, sorted(claves))
+        total = next(fila for fila in libro['Resumen'].iter_rows(values_only=True) if fila and fila[0] == 'Total')
+        self.assertEqual(total[3], 300)
+
+    def test_pdf_paginado_con_xref_valida(self):
+        contenido, _ = self.documento('pdf', date(2025, 1, 20), date(2025, 3, 10))
+        self.assertTrue(contenido.startswith(b'%PDF-1.4'))
+        inicio_xref = int(contenido.rsplit(b'startxref', 1)[1].split()[0])
+        lineas = contenido[inicio_xref:].split(b'\n')
+        objetos = int(lineas[1].split()[1])
+        for numero in range(1, objetos):
+            offset = int(lineas[2 + numero][:10])
+            self.assertTrue(contenido[offset:].startswith(b'%d 0 obj' % numero))
+        # Resumen más 300 filas de detalle a ~40 por página
+        self.assertGreaterEqual(contenido.count(b'/Type /Page '), 8)
+        paginas = re.findall(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', contenido, re.DOTALL)
+        self.assertIn(b'(Empaque Test) Tj', zlib.decompress(paginas[0]))
+
+    def test_exportar_xlsx_en_segundo_plano(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(TAREAS_DIR=directorio):
+            respuesta = self.client.post('/api/reportes/mensual/export/?fecha=2025-02-14&formato=xlsx')
+            self.assertEqual(respuesta.status_code, 202, respuesta.data)
+            self.assertTrue(respuesta.data['parametros']['detalle'])
+            cola.procesar_pendientes()
+            descarga = self.client.get(f"/api/tareas/{respuesta.data['id']}/resultado/")
+            libro = load_workbook(io.BytesIO(b''.join(descarga.streaming_content)), read_only=True)
+        self.assertEqual(descarga['Content-Type'], documentos.FORMATOS['xlsx'])
+        # Febrero: 28 días × 3 turnos × 2 áreas
+        self.assertEqual(sum(1 for _ in libro['Registros'].iter_rows(min_row=2)), 168)
+
+        sin_detalle = self.client.post('/api/reportes/mensual/export/?fecha=2025-02-14&formato=xlsx&detalle=false')
+        self.assertFalse(sin_detalle.data['parametros']['detalle'])
@@ -0,0 +1,127 @@
+# reportes/views.py
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.utils import timezone
+
+from core.versionado import cache_por_version
+from registros.filters import RegistroOEEFilterBackend
+from registros.models import RegistroOEE
+from tareas import cola
+from tareas.serializers import TareaSerializer
+from usuarios import alcance
+from . import generador, materializacion
+from .documentos import CON_DETALLE, FORMATOS
+
+
+class ReporteViewSet(viewsets.ViewSet):
+    """
+    Reportes OEE por período leídos de la tabla materializada ReporteOEE.
+    Parámetros comunes: area (ids separados por coma) y turno (A,B,C).
+    
+    La exportación (/api/reportes/<tipo>/export/) no bloquea la petición:
+    encola una tarea y responde con ella para consultar su avance en
+    /api/tareas/<id>/ (ver tareas/cola.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def _lista(self, nombre):
+        valor = self.request.query_params.get(nombre, '')
+        return [parte.strip() for parte in valor.split(',') if parte.strip()]
+    
+    def _filtros(self):
+        area_ids = self._lista('area')
+        if not all(area_id.isdigit() for area_id in area_ids):
+            raise ValidationError({'area': 'Debe ser una lista de ids de área separados por coma'})
+        turnos = self._lista('turno')
+        if not set(turnos) <= set(dict(RegistroOEE.TURNOS)):
+            raise ValidationError({'turno': 'Debe ser A, B o C'})
+        return [int(area_id) for area_id in area_ids], turnos
+    
+    def _parametros(self, request, tipo):
+        """(desde, hasta, area_ids, turnos) validados"""
+        desde, hasta = RegistroOEEFilterBackend().rango_fechas(request)
+        if tipo == 'personalizado':
+            if desde is None or hasta is None:
+                raise ValidationError({'fecha_inicio': 'Debe indicar fecha_inicio y fecha_fin'})
+            if desde > hasta:
+                raise ValidationError({'fecha_inicio': 'Debe ser anterior o igual a fecha_fin'})
+        else:
+            desde, hasta = generador.rango(tipo, desde or timezone.localdate())
+        area_ids, turnos = self._filtros()
+        return desde, hasta, area_ids, turnos
+    
+    def _reporte(self, request, tipo):
+        """
+        Solo lectura: el refresco lo dispara la escritura (ver
+        materializacion.programar_refresco). Si todavía hay días pendientes
+        en el rango el reporte sale marcado y no se cachea.
+        """
+        desde, hasta, area_ids, turnos = self._parametros(request, tipo)
+        
+        desactualizado = materializacion.pendiente(desde, hasta, area_ids)
+        datos = generador.generar(tipo, desde, hasta, request.user, area_ids, turnos)
+        response = Response({**datos, 'desactualizado': desactualizado})
+        if desactualizado:
+            response['Cache-Control'] = 'no-store'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def diario(self, request):
+        """Reporte del día (?fecha=, por defecto hoy)"""
+        return self._reporte(request, 'diario')
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def semanal(self, request):
+        """Reporte de la semana (lunes a domingo) que contiene ?fecha="""
+        return self._reporte(request, 'semanal')
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def mensual(self, request):
+        """Reporte del mes que contiene ?fecha="""
+        return self._reporte(request, 'mensual')
+    
+    @action(detail=False, methods=['get'])
+    @cache_por_version(alcance=alcance.clave)
+    def personalizado(self, request):
+        """Reporte de ?fecha_inicio= a ?fecha_fin= (inclusive)"""
+        return self._reporte(request, 'personalizado')
+    
+    @action(detail=False, methods=['get', 'post'],
+            url_path=r'(?P<tipo>diario|semanal|mensual|personalizado)/export')
+    def export(self, request, tipo=None):
+        """
+        Encola la exportación del reporte (?formato=xlsx|pdf|csv|json, mismos
+        parámetros que el reporte). XLSX y PDF incluyen el detalle de
+        registros salvo ?detalle=false. Responde 202 con la tarea, o 200 si
+        ya hay un archivo vigente para esos parámetros y datos.
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        # El frontend llama 'excel' al XLSX
+        formato = 'xlsx' if formato == 'excel' else formato
+        if formato not in FORMATOS:
+            raise ValidationError({'formato': f'Debe ser uno de: {", ".join(FORMATOS)}'})
+        desde, hasta, area_ids, turnos = self._parametros(request, tipo)
+        
+        tarea, _ = cola.encolar(
+            'reportes.exportar',
+            {
+                'tipo': tipo,
+                'desde': desde.isoformat(),
+                'hasta': hasta.isoformat(),
+                'formato': formato,
+                'area_ids': area_ids,
+                'turnos': turnos,
+                'detalle': formato in CON_DETALLE and request.query_params.get('detalle', 'true') != 'false',
+            },
+            usuario=request.user,
+            alcance=alcance.clave(request),
+        )
+        return Response(
+            TareaSerializer(tarea, context={'request': request}).data,
+            status=status.HTTP_200_OK if tarea.estado == tarea.COMPLETADA else status.HTTP_202_ACCEPTED
+        )
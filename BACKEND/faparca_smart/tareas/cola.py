@@ -0,0 +1,402 @@
+# tareas/cola.py
+"""
+Cola de tareas en segundo plano sobre la tabla Tarea.
+
+Los endpoints que generan algo pesado (exportaciones y reportes largos)
+llaman a encolar() y responden de inmediato con la tarea; un pool de hilos
+la toma, la ejecuta y deja el resultado en un archivo de TAREAS_DIR. El
+cliente consulta el estado en /api/tareas/<id>/ y descarga el resultado
+en /api/tareas/<id>/resultado/.
+
+- Tomar una tarea es un UPDATE condicionado al estado 'pendiente': si dos
+  workers eligen la misma, solo uno afecta la fila. Funciona igual en
+  SQLite y PostgreSQL, y los workers pueden estar en cualquier proceso.
+- El pool corre embebido en el proceso web (TAREAS_HILOS hilos, arranca con
+  la primera tarea) o en workers dedicados con `manage.py procesar_tareas`
+  (TAREAS_HILOS = 0 en los procesos web).
+- La clave de una tarea es el hash de su tipo, parámetros, alcance y versión
+  persistente de datos (core.versionado.version_persistente): una petición
+  idéntica sin cambios en los datos recibe el archivo ya generado sin
+  volver a calcular, desde cualquier proceso.
+- Las funciones informan avance con contexto.progreso(), que también
+  registra el latido y levanta TareaCancelada si se pidió cancelar. Además,
+  mientras la función corre, un hilo registra el latido cada
+  TAREAS_LATIDO_INTERVALO segundos: un paso largo sin progreso() (una
+  consulta pesada) no hace parecer muerta a la tarea.
+- Cada toma es un intento (`intentos` se incrementa al tomar). Las escrituras
+  del worker (avance, latido, estado final) se condicionan a su intento: si
+  la tarea se recuperó como huérfana y otro worker la tomó, el intento viejo
+  ya no modifica la fila y se detiene con TareaPerdida.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import versionado
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+_tipos = {}
+
+
+class TareaCancelada(Exception):
+    """Se pidió cancelar la tarea mientras corría"""
+
+
+class TareaPerdida(Exception):
+    """La tarea se recuperó como huérfana: este intento ya no es el vigente"""
+
+
+def registrar(nombre):
+    """
+    Registra una función como tipo de tarea. La función recibe el contexto
+    y los parámetros de la tarea, escribe el resultado en contexto.salida y
+    retorna (nombre_archivo, content_type).
+    """
+    def decorador(funcion):
+        _tipos[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def directorio():
+    ruta = Path(getattr(settings, 'TAREAS_DIR', None) or Path(settings.BASE_DIR) / 'tareas_resultados')
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def ruta_resultado(tarea):
+    return directorio() / tarea.archivo
+
+
+def disponible(tarea):
+    """Si la tarea terminó bien y su archivo sigue en disco"""
+    return tarea.estado == Tarea.COMPLETADA and bool(tarea.archivo) and ruta_resultado(tarea).exists()
+
+
+def calcular_clave(tipo, parametros, alcance=''):
+    datos = json.dumps([tipo, parametros, alcance, versionado.version_persistente()], sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def _resultado_vigente(clave):
+    for tarea in Tarea.objects.filter(clave=clave, estado=Tarea.COMPLETADA).order_by('-terminada')[:3]:
+        if disponible(tarea):
+            return tarea
+    return None
+
+
+def _campos_resultado(tarea):
+    return {
+        'archivo': tarea.archivo,
+        'nombre_archivo': tarea.nombre_archivo,
+        'content_type': tarea.content_type,
+    }
+
+
+def encolar(tipo, parametros, usuario=None, alcance=''):
+    """
+    Retorna (tarea, creada). Con un resultado vigente para la misma clave la
+    tarea vuelve ya completada; si el usuario ya pidió lo mismo y sigue en
+    la cola se devuelve esa.
+    """
+    if tipo not in _tipos:
+        raise ValueError(f'Tipo de tarea desconocido: {tipo}')
+    clave = calcular_clave(tipo, parametros, alcance)
+
+    hecha = _resultado_vigente(clave)
+    if hecha is not None:
+        if hecha.usuario_id == getattr(usuario, 'pk', None):
+            return hecha, False
+        # Otro usuario con el mismo alcance: su propia tarea, mismo archivo
+        ahora = timezone.now()
+        return Tarea.objects.create(
+            tipo=tipo, parametros=parametros, clave=clave, usuario=usuario,
+            estado=Tarea.COMPLETADA, progreso=100, iniciada=ahora, terminada=ahora,
+            **_campos_resultado(hecha)
+        ), False
+
+    en_cola = Tarea.objects.filter(
+        clave=clave, usuario=usuario, estado__in=[Tarea.PENDIENTE, Tarea.EN_CURSO]
+    ).first()
+    if en_cola is not None:
+        return en_cola, False
+
+    tarea = Tarea.objects.create(tipo=tipo, parametros=parametros, clave=clave, usuario=usuario)
+    transaction.on_commit(avisar)
+    return tarea, True
+
+
+def cancelar(tarea):
+    """
+    Una tarea pendiente se cancela en el acto; una en curso queda marcada y
+    se detiene en su siguiente llamada a progreso(). Retorna False si ya
+    había terminado.
+    """
+    if Tarea.objects.filter(pk=tarea.pk, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.CANCELADA, cancelar=True, terminada=timezone.now()):
+        return True
+    return bool(Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_CURSO).update(cancelar=True))
+
+
+def tomar(trabajador):
+    """Toma la tarea pendiente más antigua (None si la cola está vacía)"""
+    while True:
+        pk = Tarea.objects.filter(estado=Tarea.PENDIENTE).order_by('creada').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        ahora = timezone.now()
+        # Si otro worker la tomó primero el UPDATE no afecta filas y se prueba con la siguiente
+        if Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+                estado=Tarea.EN_CURSO, trabajador=trabajador, iniciada=ahora, latido=ahora,
+                intentos=F('intentos') + 1):
+            return Tarea.objects.get(pk=pk)
+
+
+def _intento(tarea):
+    """La fila de la tarea mientras siga en curso con el intento de este worker"""
+    return Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_CURSO, intentos=tarea.intentos)
+
+
+class Contexto:
+    """Lo que recibe la función de una tarea: archivo de salida, avance y cancelación"""
+    INTERVALO = 0.5
+
+    def __init__(self, tarea, salida):
+        self.tarea = tarea
+        self.salida = salida
+        self._ultimo = None
+
+    def progreso(self, porcentaje, mensaje=None, forzar=False):
+        """
+        Informa el avance (0 a 100). Escribe en la base a lo sumo cada medio
+        segundo y levanta TareaCancelada si se pidió cancelar.
+        """
+        ahora = time.monotonic()
+        if not forzar and self._ultimo is not None and ahora - self._ultimo < self.INTERVALO:
+            return
+        self._ultimo = ahora
+        campos = {'progreso': round(min(max(porcentaje, 0), 100), 1), 'latido': timezone.now()}
+        if mensaje is not None:
+            campos['mensaje'] = mensaje[:200]
+        tareas = _intento(self.tarea)
+        if not tareas.update(**campos):
+            raise TareaPerdida()
+        if tareas.filter(cancelar=True).exists():
+            raise TareaCancelada()
+
+
+class Latido:
+    """
+    Hilo que registra el latido del intento cada TAREAS_LATIDO_INTERVALO
+    segundos mientras corre la función de la tarea. Termina al salir del
+    bloque with o cuando el intento deja de ser el vigente.
+    """
+
+    def __init__(self, tarea):
+        self.tarea = tarea
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name=f'latido-{tarea.pk}', daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+
+    def latir(self):
+        intervalo = getattr(settings, 'TAREAS_LATIDO_INTERVALO', 30)
+        while not self._fin.wait(intervalo):
+            if not _intento(self.tarea).update(latido=timezone.now()):
+                return
+
+    def _correr(self):
+        try:
+            self.latir()
+        except Exception:
+            logger.exception('Error registrando el latido de la tarea %s', self.tarea.pk)
+        finally:
+            connection.close()
+
+
+def _terminar(tarea, estado, **campos):
+    _intento(tarea).update(estado=estado, terminada=timezone.now(), **campos)
+
+
+def ejecutar(tarea):
+    """Corre una tarea ya tomada y deja su estado final"""
+    # Mientras esperaba, otra tarea con la misma clave pudo dejar el resultado
+    hecha = _resultado_vigente(tarea.clave)
+    if hecha is not None:
+        _terminar(tarea, Tarea.COMPLETADA, progreso=100, **_campos_resultado(hecha))
+        return
+
+    funcion = _tipos.get(tarea.tipo)
+    if funcion is None:
+        _terminar(tarea, Tarea.FALLIDA, error=f'Tipo de tarea desconocido: {tarea.tipo}')
+        return
+
+    parcial = directorio() / f'{tarea.clave}.{tarea.pk}.parcial'
+    try:
+        with open(parcial, 'wb') as salida, Latido(tarea):
+            contexto = Contexto(tarea, salida)
+            contexto.progreso(0, forzar=True)
+            nombre_archivo, content_type = funcion(contexto, **tarea.parametros)
+        archivo = tarea.clave + Path(nombre_archivo).suffix
+        # El archivo aparece completo o no aparece
+        os.replace(parcial, directorio() / archivo)
+        _terminar(
+            tarea, Tarea.COMPLETADA, progreso=100, mensaje='',
+            archivo=archivo, nombre_archivo=nombre_archivo, content_type=content_type,
+        )
+    except TareaCancelada:
+        _terminar(tarea, Tarea.CANCELADA)
+    except TareaPerdida:
+        logger.warning('La tarea %s pasó a otro intento; se abandona el intento %s', tarea.pk, tarea.intentos)
+    except Exception as error:
+        logger.exception('Error en la tarea %s', tarea.pk)
+        _terminar(tarea, Tarea.FALLIDA, error=str(error) or error.__class__.__name__)
+    finally:
+        parcial.unlink(missing_ok=True)
+
+
+def procesar_pendientes(trabajador='local'):
+    """Ejecuta tareas en este hilo hasta vaciar la cola. Retorna cuántas corrió"""
+    procesadas = 0
+    while (tarea := tomar(trabajador)) is not None:
+        ejecutar(tarea)
+        procesadas += 1
+    return procesadas
+
+
+def recuperar_huerfanas():
+    """
+    Tareas en curso sin latido reciente (su worker murió): vuelven a la cola
+    o, agotados TAREAS_MAX_INTENTOS, quedan fallidas. Retorna cuántas tocó.
+    Un worker vivo late cada TAREAS_LATIDO_INTERVALO segundos aunque no
+    informe avance; si aun así se recupera una tarea que seguía corriendo
+    (el proceso estuvo congelado), su intento ya no puede escribir en ella.
+    """
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=getattr(settings, 'TAREAS_LATIDO_MAXIMO', 300))
+    huerfanas = Tarea.objects.filter(estado=Tarea.EN_CURSO, latido__lt=limite)
+    canceladas = huerfanas.filter(cancelar=True).update(estado=Tarea.CANCELADA, terminada=ahora)
+    fallidas = huerfanas.filter(intentos__gte=getattr(settings, 'TAREAS_MAX_INTENTOS', 3)).update(
+        estado=Tarea.FALLIDA, terminada=ahora, error='El worker dejó de responder'
+    )
+    devueltas = huerfanas.update(estado=Tarea.PENDIENTE, trabajador='')
+    return canceladas + fallidas + devueltas
+
+
+def purgar(horas=None):
+    """
+    Borra las tareas terminadas hace más de TAREAS_RETENCION_HORAS y los
+    archivos que ya ninguna tarea referencia. Retorna cuántas borró.
+    """
+    horas = getattr(settings, 'TAREAS_RETENCION_HORAS', 24) if horas is None else horas
+    viejas = Tarea.objects.filter(estado__in=Tarea.TERMINADAS, terminada__lt=timezone.now() - timedelta(hours=horas))
+    archivos = set(viejas.exclude(archivo='').values_list('archivo', flat=True))
+    borradas, _ = viejas.delete()
+    vigentes = set(Tarea.objects.filter(archivo__in=archivos).values_list('archivo', flat=True))
+    for archivo in archivos - vigentes:
+        (directorio() / archivo).unlink(missing_ok=True)
+    return borradas
+
+
+class Pool:
+    """
+    Hilos que toman tareas de la cola. Sin trabajo esperan un aviso (o
+    `intervalo` segundos, por tareas encoladas desde otros procesos); cada
+    TAREAS_MANTENIMIENTO_SEGUNDOS uno de ellos recupera huérfanas y purga.
+    """
+
+    def __init__(self, hilos, intervalo=1.0):
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.nombre = f'{socket.gethostname()}:{os.getpid()}'
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._ultimo_mantenimiento = 0.0
+        self._hilos = []
+
+    def iniciar(self):
+        for indice in range(self.hilos):
+            hilo = threading.Thread(
+                target=self._bucle, args=(f'{self.nombre}:{indice}',),
+                name=f'tareas-{indice}', daemon=True,
+            )
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def avisar(self):
+        self._aviso.set()
+
+    def detener(self, timeout=None):
+        self._detener.set()
+        self._aviso.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+    def _mantener(self):
+        cada = getattr(settings, 'TAREAS_MANTENIMIENTO_SEGUNDOS', 60)
+        with self._lock:
+            if time.monotonic() - self._ultimo_mantenimiento < cada:
+                return
+            self._ultimo_mantenimiento = time.monotonic()
+        recuperar_huerfanas()
+        purgar()
+
+    def _bucle(self, trabajador):
+        try:
+            while not self._detener.is_set():
+                close_old_connections()
+                try:
+                    tarea = tomar(trabajador)
+                    if tarea is None:
+                        self._mantener()
+                except Exception:
+                    logger.exception('Error leyendo la cola de tareas')
+                    tarea = None
+                if tarea is None:
+                    self._aviso.wait(self.intervalo)
+                    self._aviso.clear()
+                else:
+                    ejecutar(tarea)
+        finally:
+            connection.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def avisar():
+    """
+    Despierta a los workers de este proceso. En el proceso web arranca el
+    pool embebido con la primera tarea, salvo que TAREAS_HILOS sea 0 (workers
+    dedicados con procesar_tareas).
+    """
+    global _pool
+    hilos = getattr(settings, 'TAREAS_HILOS', 2)
+    if hilos <= 0:
+        return
+    with _pool_lock:
+        if _pool is None:
+            _pool = Pool(hilos)
+            _pool.iniciar()
+    _pool.avisar()
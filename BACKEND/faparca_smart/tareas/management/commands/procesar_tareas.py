@@ -0,0 +1,61 @@
+# tareas/management/commands/procesar_tareas.py
+"""
+Worker dedicado de la cola de tareas en segundo plano.
+Uso: python manage.py procesar_tareas [--hilos 2] [--intervalo 1] [--una-vez]
+
+Con workers dedicados conviene TAREAS_HILOS=0 en los procesos web para que
+no arranquen su pool embebido. Las tareas son mayormente consultas y
+escritura de archivos: para repartir trabajo de CPU (XLSX, PDF) entre
+núcleos se lanzan varios procesos de este comando; la cola los coordina.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tareas import cola
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano (reportes y exportaciones) encoladas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=2,
+            help='Hilos del pool (default: 2)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Segundos entre lecturas de la cola cuando está vacía (default: 1)'
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa lo pendiente y termina (cron o pruebas)'
+        )
+
+    def handle(self, *args, **options):
+        recuperadas = cola.recuperar_huerfanas()
+        purgadas = cola.purgar()
+        self.stdout.write(f'Huérfanas recuperadas: {recuperadas} | Tareas purgadas: {purgadas}')
+
+        if options['una_vez']:
+            inicio = time.perf_counter()
+            procesadas = cola.procesar_pendientes()
+            self.stdout.write(f'Tareas procesadas: {procesadas} | Tiempo: {time.perf_counter() - inicio:.2f}s')
+            self.stdout.write(self.style.SUCCESS('✓ Cola vacía'))
+            return
+
+        pool = cola.Pool(options['hilos'], options['intervalo'])
+        pool.iniciar()
+        self.stdout.write(f'Procesando tareas con {options["hilos"]} hilos (Ctrl+C para detener)...')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stdout.write('Esperando que terminen las tareas en curso...')
+            pool.detener()
+        self.stdout.write(self.style.SUCCESS('✓ Worker detenido'))
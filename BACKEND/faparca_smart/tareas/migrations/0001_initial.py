@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(help_text='Nombre registrado en tareas.cola', max_length=50)),
+                ('parametros', models.JSONField(default=dict)),
+                ('clave', models.CharField(help_text='Hash de tipo, parámetros, alcance y versión de datos', max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida'), ('cancelada', 'Cancelada')], default='pendiente', max_length=10)),
+                ('progreso', models.FloatField(default=0)),
+                ('mensaje', models.CharField(blank=True, max_length=200)),
+                ('cancelar', models.BooleanField(default=False)),
+                ('archivo', models.CharField(blank=True, help_text='Ruta del resultado en TAREAS_DIR', max_length=255)),
+                ('nombre_archivo', models.CharField(blank=True, max_length=150)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('trabajador', models.CharField(blank=True, max_length=100)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('latido', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-creada'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['creada'], name='tarea_pendiente_idx'), models.Index(fields=['clave', 'estado'], name='tarea_clave_estado_idx'), models.Index(fields=['usuario', '-creada'], name='tarea_usuario_creada_idx')],
+            },
+        ),
+    ]
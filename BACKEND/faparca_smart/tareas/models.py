@@ -0,0 +1,57 @@
+# tareas/models.py
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano (reporte o exportación pesada). La tabla es la
+    cola: los workers toman las pendientes más antiguas (ver tareas/cola.py).
+    """
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    CANCELADA = 'cancelada'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+        (CANCELADA, 'Cancelada'),
+    ]
+    TERMINADAS = (COMPLETADA, FALLIDA, CANCELADA)
+
+    tipo = models.CharField(max_length=50, help_text='Nombre registrado en tareas.cola')
+    parametros = models.JSONField(default=dict)
+    clave = models.CharField(max_length=64, help_text='Hash de tipo, parámetros, alcance y versión de datos')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+    progreso = models.FloatField(default=0)
+    mensaje = models.CharField(max_length=200, blank=True)
+    cancelar = models.BooleanField(default=False)
+    archivo = models.CharField(max_length=255, blank=True, help_text='Ruta del resultado en TAREAS_DIR')
+    nombre_archivo = models.CharField(max_length=150, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    trabajador = models.CharField(max_length=100, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creada']
+        indexes = [
+            # Índice parcial: la cola solo recorre las pendientes, no el historial
+            models.Index(fields=['creada'], condition=Q(estado='pendiente'), name='tarea_pendiente_idx'),
+            models.Index(fields=['clave', 'estado'], name='tarea_clave_estado_idx'),
+            models.Index(fields=['usuario', '-creada'], name='tarea_usuario_creada_idx'),
+        ]
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
@@ -0,0 +1,21 @@
+# tareas/serializers.py
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from .models import Tarea
+
+
+class TareaSerializer(serializers.ModelSerializer):
+    resultado = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tarea
+        fields = ['id', 'tipo', 'parametros', 'estado', 'progreso', 'mensaje', 'error',
+                 'nombre_archivo', 'resultado', 'creada', 'iniciada', 'terminada']
+        read_only_fields = fields
+
+    def get_resultado(self, obj):
+        """URL de descarga una vez completada"""
+        if obj.estado != Tarea.COMPLETADA:
+            return None
+        return reverse('tarea-resultado', args=[obj.pk], request=self.context.get('request'))
@@ -0,0 +1,210 @@
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from areas.models import Area
+from registros.models import RegistroOEE
+from usuarios.models import Usuario
+from . import cola
+from .models import Tarea
+
+EXPORT = '/api/reportes/personalizado/export/?fecha_inicio=2025-03-01&fecha_fin=2025-03-31'
+
+
+@cola.registrar('pruebas.eco')
+def eco(contexto, texto, pasos=1):
+    for paso in range(pasos):
+        contexto.progreso(paso * 100 / pasos, forzar=True)
+    contexto.salida.write(texto.encode())
+    return 'eco.txt', 'text/plain'
+
+
+@override_settings(THROTTLE_ACTIVO=False, REPORTES_REFRESCO_EN_SEGUNDO_PLANO=False)
+class TareasTests(TestCase):
+    """Cola de tareas en segundo plano y exportación de reportes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(
+            nombre='Empaque Test', codigo='EMP_TEST', tipo='empaque',
+            capacidad_teorica=1000, capacidad_real=900
+        )
+        cls.usuario = Usuario.objects.create_user('admin_test', password='x', rol='administrador')
+        cls.otro = Usuario.objects.create_user('admin_otro', password='x', rol='administrador')
+        for dia in range(1, 11):
+            RegistroOEE.objects.create(
+                area=cls.area, fecha=date(2025, 3, dia), turno='A', usuario=cls.usuario,
+                plan_produccion=1000, produccion_real=800, hora_inicio=time(6), hora_fin=time(14)
+            )
+
+    def setUp(self):
+        cache.clear()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(TAREAS_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_resultado_en_disco_y_cache_por_clave(self):
+        tarea, creada = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.usuario)
+        self.assertTrue(creada)
+        self.assertEqual(cola.procesar_pendientes(), 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertEqual(cola.ruta_resultado(tarea).read_text(), 'hola')
+
+        # Misma petición sin cambios en los datos: sin nueva tarea, aunque la
+        # versión en caché haya expirado (u otro proceso tenga la suya)
+        cache.clear()
+        repetida, creada = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.usuario)
+        self.assertFalse(creada)
+        self.assertEqual(repetida.pk, tarea.pk)
+        # Otro usuario con el mismo alcance: tarea propia ya completada, mismo archivo
+        ajena, creada = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.otro)
+        self.assertFalse(creada)
+        self.assertEqual((ajena.estado, ajena.archivo), (Tarea.COMPLETADA, tarea.archivo))
+        self.assertEqual(cola.procesar_pendientes(), 0)
+
+        # Un alcance distinto es otra clave
+        _, creada = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.usuario, alcance='1,2')
+        self.assertTrue(creada)
+
+    def test_cambio_de_datos_invalida_el_resultado(self):
+        tarea, _ = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.usuario)
+        cola.procesar_pendientes()
+        registro = RegistroOEE.objects.first()
+        registro.produccion_real = 900
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.save()
+        nueva, creada = cola.encolar('pruebas.eco', {'texto': 'hola'}, self.usuario)
+        self.assertTrue(creada)
+        self.assertNotEqual(nueva.clave, tarea.clave)
+
+    def test_tomar_no_entrega_dos_veces_la_misma(self):
+        primera, _ = cola.encolar('pruebas.eco', {'texto': 'a'}, self.usuario)
+        segunda, _ = cola.encolar('pruebas.eco', {'texto': 'b'}, self.usuario)
+        self.assertEqual(cola.tomar('w1').pk, primera.pk)
+        self.assertEqual(cola.tomar('w2').pk, segunda.pk)
+        self.assertIsNone(cola.tomar('w3'))
+        self.assertEqual(Tarea.objects.get(pk=primera.pk).intentos, 1)
+
+    def test_cancelar(self):
+        pendiente, _ = cola.encolar('pruebas.eco', {'texto': 'a'}, self.usuario)
+        self.assertTrue(cola.cancelar(pendiente))
+        self.assertEqual(Tarea.objects.get(pk=pendiente.pk).estado, Tarea.CANCELADA)
+        self.assertIsNone(cola.tomar('w1'))
+
+        # En curso: se detiene en el siguiente progreso() y no deja archivo
+        en_curso, _ = cola.encolar('pruebas.eco', {'texto': 'b', 'pasos': 3}, self.usuario)
+        tomada = cola.tomar('w1')
+        self.assertTrue(cola.cancelar(tomada))
+        cola.ejecutar(tomada)
+        en_curso.refresh_from_db()
+        self.assertEqual((en_curso.estado, en_curso.archivo), (Tarea.CANCELADA, ''))
+        self.assertFalse(cola.cancelar(en_curso))
+
+    def test_huerfanas_vuelven_a_la_cola(self):
+        tarea, _ = cola.encolar('pruebas.eco', {'texto': 'a'}, self.usuario)
+        cola.tomar('w1')
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+        self.assertEqual(cola.recuperar_huerfanas(), 1)
+        self.assertEqual(Tarea.objects.get(pk=tarea.pk).estado, Tarea.PENDIENTE)
+
+        with self.settings(TAREAS_MAX_INTENTOS=2):
+            cola.tomar('w1')
+            Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+            cola.recuperar_huerfanas()
+        self.assertEqual(Tarea.objects.get(pk=tarea.pk).estado, Tarea.FALLIDA)
+
+    def test_un_intento_recuperado_no_pisa_al_siguiente(self):
+        tarea, _ = cola.encolar('pruebas.eco', {'texto': 'viejo'}, self.usuario)
+        viejo = cola.tomar('w1')
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+        cola.recuperar_huerfanas()
+        nuevo = cola.tomar('w2')
+        self.assertEqual((nuevo.pk, nuevo.intentos), (tarea.pk, 2))
+
+        # El worker congelado despierta: no escribe avance ni estado final
+        cola.ejecutar(viejo)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.trabajador, tarea.archivo), (Tarea.EN_CURSO, 'w2', ''))
+
+        Tarea.objects.filter(pk=tarea.pk).update(parametros={'texto': 'nuevo'})
+        nuevo.parametros = {'texto': 'nuevo'}
+        cola.ejecutar(nuevo)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertEqual(cola.ruta_resultado(tarea).read_text(), 'nuevo')
+
+    def test_latido_sin_progreso(self):
+        tarea, _ = cola.encolar('pruebas.eco', {'texto': 'a'}, self.usuario)
+        tomada = cola.tomar('w1')
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+        latido = cola.Latido(tomada)
+        # Dos intervalos sin que la función informe avance, en este mismo hilo
+        with mock.patch.object(latido._fin, 'wait', side_effect=[False, False, True]):
+            latido.latir()
+        self.assertEqual(cola.recuperar_huerfanas(), 0)
+        self.assertEqual(Tarea.objects.get(pk=tarea.pk).estado, Tarea.EN_CURSO)
+
+        # Otro intento la tomó: el latido del viejo se detiene solo
+        Tarea.objects.filter(pk=tarea.pk).update(intentos=5)
+        with mock.patch.object(latido._fin, 'wait', return_value=False) as esperar:
+            latido.latir()
+        self.assertEqual(esperar.call_count, 1)
+
+    def test_lista_paginada(self):
+        for indice in range(55):
+            Tarea.objects.create(tipo='pruebas.eco', parametros={'texto': str(indice)}, clave=str(indice), usuario=self.usuario)
+        Tarea.objects.create(tipo='pruebas.eco', parametros={}, clave='ajena', usuario=self.otro)
+        respuesta = self.client.get('/api/tareas/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.data['count'], len(respuesta.data['results'])), (55, 50))
+        segunda = self.client.get(respuesta.data['next'])
+        self.assertEqual(len(segunda.data['results']), 5)
+
+    def test_purgar_borra_archivos_sin_referencias(self):
+        tarea, _ = cola.encolar('pruebas.eco', {'texto': 'a'}, self.usuario)
+        cola.procesar_pendientes()
+        tarea.refresh_from_db()
+        ruta = cola.ruta_resultado(tarea)
+        Tarea.objects.filter(pk=tarea.pk).update(terminada=timezone.now() - timedelta(days=2))
+        self.assertEqual(cola.purgar(), 1)
+        self.assertFalse(ruta.exists())
+
+    def test_exportar_reporte_por_api(self):
+        respuesta = self.client.post(EXPORT + '&formato=csv')
+        self.assertEqual(respuesta.status_code, 202, respuesta.data)
+        tarea_id = respuesta.data['id']
+        self.assertEqual(self.client.get(f'/api/tareas/{tarea_id}/resultado/').status_code, 409)
+
+        cola.procesar_pendientes()
+        estado = self.client.get(f'/api/tareas/{tarea_id}/').data
+        self.assertEqual((estado['estado'], estado['progreso']), (Tarea.COMPLETADA, 100))
+        descarga = self.client.get(f'/api/tareas/{tarea_id}/resultado/')
+        self.assertEqual(descarga.status_code, 200)
+        lineas = b''.join(descarga.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertTrue(lineas[1].startswith('total,,,,10,'))
+
+        # La misma exportación ya está en disco
+        repetida = self.client.post(EXPORT + '&formato=csv')
+        self.assertEqual((repetida.status_code, repetida.data['id']), (200, tarea_id))
+
+        # Las tareas son de quien las pidió
+        self.client.force_authenticate(self.otro)
+        self.assertEqual(self.client.get(f'/api/tareas/{tarea_id}/').status_code, 404)
+
+    def test_exportar_valida_parametros(self):
+        self.assertEqual(self.client.post(EXPORT + '&formato=doc').status_code, 400)
+        respuesta = self.client.post('/api/reportes/personalizado/export/?formato=csv')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('fecha_inicio', respuesta.data)
+        self.assertFalse(Tarea.objects.exists())
@@ -0,0 +1,61 @@
+# tareas/views.py
+from django.http import FileResponse
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import cola
+from .models import Tarea
+from .serializers import TareaSerializer
+
+
+class TareaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Tareas en segundo plano del usuario: estado y avance (para consultar
+    cada pocos segundos), cancelación y descarga del resultado. La lista usa
+    la paginación por número de página global (PAGE_SIZE).
+    """
+    queryset = Tarea.objects.all()
+    serializer_class = TareaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        tareas = super().get_queryset().filter(usuario=self.request.user)
+        if self.action == 'list':
+            estado = self.request.query_params.get('estado')
+            if estado:
+                tareas = tareas.filter(estado=estado)
+        return tareas
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        """Cancela una tarea pendiente o en curso"""
+        tarea = self.get_object()
+        if not cola.cancelar(tarea):
+            return Response(
+                {'error': f'La tarea ya terminó ({tarea.get_estado_display().lower()})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        tarea.refresh_from_db()
+        return Response(self.get_serializer(tarea).data)
+
+    @action(detail=True, methods=['get'])
+    def resultado(self, request, pk=None):
+        """Descarga el archivo generado por la tarea"""
+        tarea = self.get_object()
+        if tarea.estado != Tarea.COMPLETADA:
+            return Response(
+                {'error': 'La tarea no ha terminado', 'estado': tarea.estado},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not cola.disponible(tarea):
+            return Response(
+                {'error': 'El resultado ya no está disponible, vuelva a solicitarlo'},
+                status=status.HTTP_410_GONE
+            )
+        return FileResponse(
+            open(cola.ruta_resultado(tarea), 'rb'),
+            as_attachment=True,
+            filename=tarea.nombre_archivo,
+            content_type=tarea.content_type or 'application/octet-stream',
+        )
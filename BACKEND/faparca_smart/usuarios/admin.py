@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import Usuario
+from . import cache_tokens
 
 @admin.register(Usuario)
 class UsuarioAdmin(UserAdmin):
@@ -41,6 +42,8 @@ class UsuarioAdmin(UserAdmin):
     # Campos editables desde la lista
     list_editable = ('activo', 'rol')
     
+    filter_horizontal = ('areas_supervisadas', 'groups', 'user_permissions')
+    
     # Configuración de los fieldsets para el formulario de edición
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
@@ -48,7 +51,7 @@ class UsuarioAdmin(UserAdmin):
             'fields': ('first_name', 'last_name', 'email', 'telefono')
         }),
         (_('Configuración del Sistema'), {
-            'fields': ('rol', 'area_asignada', 'activo')
+            'fields': ('rol', 'area_asignada', 'areas_supervisadas', 'activo')
         }),
         (_('Permisos'), {
             'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions'),
@@ -85,12 +88,15 @@ class UsuarioAdmin(UserAdmin):
     def activar_usuarios(self, request, queryset):
         """Activa los usuarios seleccionados"""
         updated = queryset.update(activo=True)
+        cache_tokens.invalidar_usuarios(queryset.values_list('id', flat=True))
         self.message_user(request, f'{updated} usuario(s) activado(s) exitosamente.')
     activar_usuarios.short_description = "Activar usuarios seleccionados"
     
     def desactivar_usuarios(self, request, queryset):
         """Desactiva los usuarios seleccionados"""
         updated = queryset.update(activo=False)
+        # update() no dispara señales: se descartan a mano los tokens cacheados
+        cache_tokens.invalidar_usuarios(queryset.values_list('id', flat=True))
         self.message_user(request, f'{updated} usuario(s) desactivado(s) exitosamente.')
     desactivar_usuarios.short_description = "Desactivar usuarios seleccionados"
     
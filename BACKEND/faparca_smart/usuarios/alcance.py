@@ -0,0 +1,80 @@
+# usuarios/alcance.py
+"""
+Alcance de datos de cada usuario: el conjunto de áreas que puede ver.
+
+- administrador (o is_staff): toda la planta
+- supervisor: sus áreas supervisadas más su área asignada
+- operador y viewer: solo su área asignada
+
+Sin áreas configuradas el alcance queda vacío (no ve ningún registro): un
+usuario a medio configurar nunca ve de más. Las pantallas de planta que
+muestran todo necesitan un usuario staff o administrador.
+
+areas_visibles() retorna None para "toda la planta" o un frozenset de ids
+de área. Se cachea por usuario en el proceso (ALCANCE_CACHE_TTL) y se
+invalida con las señales de Usuario, de sus áreas supervisadas y de Area.
+Los filtros por área_id usan el índice (area, fecha, turno) de RegistroOEE
+y las filas por área de los resúmenes.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+_alcances = {}  # user_id -> (areas, cargado_en)
+_lock = threading.Lock()
+
+
+def _resolver(user):
+    if user.is_staff or user.rol == 'administrador':
+        return None
+    if user.rol == 'supervisor':
+        areas = set(user.areas_supervisadas.values_list('pk', flat=True))
+        if user.area_asignada_id:
+            areas.add(user.area_asignada_id)
+        return frozenset(areas)
+    if user.area_asignada_id:
+        return frozenset([user.area_asignada_id])
+    return frozenset()
+
+
+def areas_visibles(user):
+    """None (todas las áreas) o frozenset con los ids de área visibles"""
+    ttl = getattr(settings, 'ALCANCE_CACHE_TTL', 300)
+    with _lock:
+        entrada = _alcances.get(user.pk)
+    if entrada is not None and time.monotonic() - entrada[1] < ttl:
+        return entrada[0]
+    areas = _resolver(user)
+    with _lock:
+        _alcances[user.pk] = (areas, time.monotonic())
+    return areas
+
+
+def filtrar(queryset, user, campo='area_id'):
+    """Restringe el queryset a las áreas visibles del usuario"""
+    areas = areas_visibles(user)
+    if areas is None:
+        return queryset
+    return queryset.filter(**{f'{campo}__in': areas})
+
+
+def permite(user, area_id):
+    areas = areas_visibles(user)
+    return areas is None or area_id in areas
+
+
+def clave(request):
+    """Valor para cache_por_version: respuestas distintas por alcance, no por usuario"""
+    areas = areas_visibles(request.user)
+    return 'todas' if areas is None else ','.join(map(str, sorted(areas)))
+
+
+def invalidar(user_ids=None):
+    """Descarta el alcance cacheado de esos usuarios (de todos con None)"""
+    with _lock:
+        if user_ids is None:
+            _alcances.clear()
+        else:
+            for user_id in user_ids:
+                _alcances.pop(user_id, None)
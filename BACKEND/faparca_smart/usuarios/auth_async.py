@@ -0,0 +1,223 @@
+# usuarios/auth_async.py
+"""
+Login, registro y cambio de contraseña como vistas async.
+
+Bajo ASGI las vistas síncronas de DRF corren todas en un mismo hilo, así
+que en el cambio de turno los logins se encolaban uno detrás de otro
+esperando cada hash PBKDF2. Estas vistas hacen las consultas cortas con
+sync_to_async y calculan los hashes en el pool acotado de hashing.py, de
+modo que el event loop sigue atendiendo y los hashes corren en paralelo.
+Bajo WSGI funcionan igual (Django las ejecuta en su propio loop).
+
+Reemplazan a las acciones de DRF AuthViewSet.login, AuthViewSet.register y
+UsuarioViewSet.change_password, que ya no existen. Se montan en las mismas
+rutas y con los mismos nombres de URL (auth-login, auth-register,
+usuario-change-password; ver oee_system/urls.py), con los mismos
+throttles, validaciones y formato de respuesta. Lo que no conservan es lo
+propio de DRF: los sufijos de formato (/api/auth/login.json) y la API
+navegable; solo aceptan POST.
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions, status
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import ExpiringTokenAuthentication, TokenManager
+from .views import LoginThrottle
+from .models import Usuario
+from .serializers import (
+    ChangePasswordSerializer,
+    LoginSerializer,
+    UsuarioCreateSerializer,
+    UsuarioSerializer,
+)
+from . import hashing
+
+
+def _request_drf(request):
+    return Request(
+        request,
+        parsers=[JSONParser(), FormParser(), MultiPartParser()],
+        authenticators=[ExpiringTokenAuthentication()],
+    )
+
+
+def _error_throttle(request, throttles):
+    """Aplica los throttles como lo haría DRF; retorna la respuesta 429 o None"""
+    esperas = [t.wait() for t in throttles if not t.allow_request(request, None)]
+    if not esperas:
+        return None
+    espera = max((e for e in esperas if e is not None), default=None)
+    return JsonResponse({'detail': str(exceptions.Throttled(espera).detail)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+async def _autenticar(request):
+    """Retorna (usuario, None) o (None, respuesta 401)"""
+    try:
+        usuario = await sync_to_async(lambda: request.user)()
+    except exceptions.AuthenticationFailed as e:
+        return None, JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if not usuario.is_authenticated:
+        return None, JsonResponse(
+            {'detail': str(exceptions.NotAuthenticated().detail)}, status=status.HTTP_401_UNAUTHORIZED
+        )
+    return usuario, None
+
+
+def get_client_ip(request):
+    """
+    Obtiene la IP del cliente
+    """
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0]
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    """
+    Endpoint de login con token expiración
+    """
+    request = _request_drf(request)
+    throttled = await sync_to_async(_error_throttle)(request, [LoginThrottle()])
+    if throttled:
+        return throttled
+
+    login_data = request.data.copy()
+    login_data['ip_address'] = get_client_ip(request)
+    login_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
+
+    # Usuario y estado en la validación; la contraseña con aauthenticate(),
+    # que verifica el hash en el pool (ver backends.py)
+    serializer = LoginSerializer(data=login_data, context={'request': request, 'autenticar_async': True})
+    valido = await sync_to_async(serializer.is_valid)()
+    if valido:
+        if await serializer.aautenticar() is None:
+            valido = False
+            errores = {'password': ['Contraseña incorrecta']}
+    else:
+        errores = serializer.errors
+
+    if not valido:
+        return JsonResponse(
+            {'errors': errores, 'message': 'Error en el inicio de sesión'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    user = serializer.validated_data['user']
+
+    def crear_sesion():
+        with transaction.atomic():
+            token_data = TokenManager.create_token(user)
+            user.ultimo_acceso = timezone.now()
+            user.save(update_fields=['ultimo_acceso'])
+        return token_data, UsuarioSerializer(user).data
+
+    token_data, user_data = await sync_to_async(crear_sesion)()
+    return JsonResponse({
+        'token': token_data['key'],
+        'expires_at': token_data['expires_at'].isoformat(),
+        'expires_in': token_data['expires_in'],
+        'user': user_data,
+        'message': 'Login exitoso'
+    }, status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    """
+    Registro de nuevos usuarios (solo administradores)
+    """
+    request = _request_drf(request)
+    throttled = await sync_to_async(_error_throttle)(request, [LoginThrottle()])
+    if throttled:
+        return throttled
+
+    try:
+        usuario = await sync_to_async(lambda: request.user)()
+    except exceptions.AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if not usuario.is_authenticated or not usuario.is_staff:
+        return JsonResponse(
+            {'error': 'Registro no permitido. Contacte al administrador.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    serializer = UsuarioCreateSerializer(data=request.data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    password_hash = await hashing.hashear(serializer.validated_data['password'])
+
+    def crear():
+        with transaction.atomic():
+            user = serializer.save(password_hash=password_hash)
+            token_data = TokenManager.create_token(user)
+        return token_data, UsuarioSerializer(user).data
+
+    token_data, user_data = await sync_to_async(crear)()
+    return JsonResponse({
+        'message': 'Usuario creado exitosamente',
+        'user': user_data,
+        'token': token_data['key'],
+        'expires_at': token_data['expires_at'].isoformat()
+    }, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def change_password(request, pk):
+    """Cambiar contraseña del usuario"""
+    request = _request_drf(request)
+    usuario, error = await _autenticar(request)
+    if error:
+        return error
+    throttled = await sync_to_async(_error_throttle)(request, [t() for t in api_settings.DEFAULT_THROTTLE_CLASSES])
+    if throttled:
+        return throttled
+
+    user = await Usuario.objects.filter(activo=True, pk=pk).afirst()
+    if user is None:
+        return JsonResponse({'detail': str(exceptions.NotFound().detail)}, status=status.HTTP_404_NOT_FOUND)
+
+    # Verificar que es el mismo usuario o un admin
+    if usuario != user and not usuario.is_staff:
+        return JsonResponse(
+            {'error': 'No tiene permisos para cambiar esta contraseña'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    serializer = ChangePasswordSerializer(
+        data=request.data,
+        context={'request': request, 'verificar_password': False}
+    )
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not await hashing.verificar(serializer.validated_data['old_password'], usuario.password):
+        return JsonResponse({'old_password': ['Contraseña actual incorrecta']}, status=status.HTTP_400_BAD_REQUEST)
+
+    password_hash = await hashing.hashear(serializer.validated_data['new_password'])
+
+    def guardar():
+        # La contraseña es la del usuario de la URL, no la de quien la cambia
+        user.password = password_hash
+        user.save(update_fields=['password'])
+        # Revocar token actual para forzar nuevo login
+        TokenManager.revoke_token(user)
+
+    await sync_to_async(guardar)()
+    return JsonResponse(
+        {'message': 'Contraseña actualizada exitosamente. Por favor, inicie sesión nuevamente.'},
+        status=status.HTTP_200_OK
+    )
@@ -2,13 +2,19 @@
 """
 Módulo de autenticación personalizada con tokens expirables
 """
+import time
 from datetime import timedelta
 from django.utils import timezone
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authtoken.models import Token
 
+from . import cache_tokens, tokens_firmados
+
+
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
     Autenticación con tokens que expiran después de un tiempo determinado
@@ -16,12 +22,24 @@ class ExpiringTokenAuthentication(TokenAuthentication):
     
     def authenticate_credentials(self, key):
         """
-        Valida el token y verifica su expiración
+        Valida el token y verifica su expiración. Los tokens válidos se
+        leen del caché (ver cache_tokens), así una petición autenticada
+        normalmente no consulta ni escribe la base de datos. El acierto se
+        valida contra la marca compartida del usuario, que las revocaciones
+        de cualquier proceso incrementan.
         """
-        try:
-            token = Token.objects.select_related('user').get(key=key)
-        except Token.DoesNotExist:
-            raise AuthenticationFailed('Token inválido.')
+        if tokens_firmados.es_firmado(key):
+            return self.authenticate_signed(key)
+        
+        token = cache_tokens.obtener(key)
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed('Token inválido.')
+            en_cache = False
+        else:
+            en_cache = True
         
         if not token.user.is_active:
             raise AuthenticationFailed('Usuario inactivo o eliminado.')
@@ -31,15 +49,57 @@ class ExpiringTokenAuthentication(TokenAuthentication):
         
         # Verificar expiración del token
         if self.is_token_expired(token):
+            cache_tokens.invalidar(key)
             token.delete()
             raise AuthenticationFailed('Token expirado. Por favor, inicie sesión nuevamente.')
         
-        # Actualizar último acceso
+        if not en_cache:
+            cache_tokens.guardar(token)
+        
+        # Actualizar último acceso (se escribe por lotes)
         token.user.ultimo_acceso = timezone.now()
-        token.user.save(update_fields=['ultimo_acceso'])
+        cache_tokens.registrar_acceso(token.user_id, token.user.ultimo_acceso)
         
         return (token.user, token)
     
+    def authenticate_signed(self, key):
+        """
+        Valida un token firmado (TOKEN_MODO = 'firmado'): firma, expiración
+        y revocación sin tocar la base de datos. El usuario (con su marca de
+        revocación) sale del caché por id y solo se consulta si no está
+        cacheado.
+        """
+        if not tokens_firmados.activo():
+            raise AuthenticationFailed('Token inválido.')
+        try:
+            datos = tokens_firmados.verificar(key)
+        except tokens_firmados.TokenFirmadoInvalido as e:
+            raise AuthenticationFailed(str(e))
+        
+        user = cache_tokens.obtener_usuario(datos['u'])
+        if user is None:
+            marca = cache_tokens.marca(datos['u'])
+            user = get_user_model().objects.filter(pk=datos['u']).first()
+            if user is None:
+                raise AuthenticationFailed('Usuario inactivo o eliminado.')
+            cache_tokens.guardar_usuario(user, marca)
+        
+        try:
+            tokens_firmados.comprobar_revocacion(datos, user)
+        except tokens_firmados.TokenFirmadoInvalido as e:
+            raise AuthenticationFailed(str(e))
+        
+        if not user.is_active:
+            raise AuthenticationFailed('Usuario inactivo o eliminado.')
+        
+        if not user.activo:
+            raise AuthenticationFailed('Usuario desactivado por el administrador.')
+        
+        user.ultimo_acceso = timezone.now()
+        cache_tokens.registrar_acceso(user.pk, user.ultimo_acceso)
+        
+        return (user, datos)
+    
     def is_token_expired(self, token):
         """
         Verifica si el token ha expirado
@@ -86,6 +146,9 @@ class TokenManager:
         """
         Crea un nuevo token para el usuario, eliminando el anterior si existe
         """
+        if tokens_firmados.activo():
+            return tokens_firmados.emitir(user)
+        
         # Eliminar token anterior si existe
         Token.objects.filter(user=user).delete()
         
@@ -110,6 +173,10 @@ class TokenManager:
         """
         Refresca el token del usuario si es necesario
         """
+        if tokens_firmados.activo():
+            # Sin estado: emitir uno nuevo es solo calcular una firma
+            return {**tokens_firmados.emitir(user), 'refreshed': True}
+        
         try:
             token = Token.objects.get(user=user)
             
@@ -145,6 +212,11 @@ class TokenManager:
         """
         Revoca el token del usuario
         """
+        if tokens_firmados.activo():
+            tokens_firmados.revocar(user.pk)
+            Token.objects.filter(user=user).delete()
+            return True
+        
         try:
             token = Token.objects.get(user=user)
             token.delete()
@@ -153,17 +225,43 @@ class TokenManager:
             return False
     
     @staticmethod
-    def cleanup_expired_tokens():
+    def cleanup_expired_tokens(batch_size=500, pause=0.05):
         """
-        Limpia tokens expirados de la base de datos
-        Puede ser llamado por un cron job o celery task
+        Limpia tokens expirados de la base de datos.
+        Lo ejecuta el comando limpiar_tokens (una vez o en bucle).
+        Retorna la cantidad eliminada.
         """
-        expiry_time = timedelta(
-            seconds=getattr(settings, 'TOKEN_EXPIRED_AFTER_SECONDS', 86400)
-        )
-        expired_time = timezone.now() - expiry_time
-        
-        # Eliminar tokens expirados
-        deleted_count = Token.objects.filter(created__lt=expired_time).delete()[0]
-        
-        return deleted_count
+        return limpiar_tokens_vencidos(batch_size, pause)['eliminados']
+
+
+def limpiar_tokens_vencidos(tamano_lote=500, pausa=0.05):
+    """
+    Elimina los tokens vencidos en lotes acotados, cada uno en su propia
+    transacción corta, con una pausa entre lotes para que SQLite no quede
+    con el bloqueo de escritura tomado mientras atiende peticiones. La
+    búsqueda usa el índice sobre created (migración 0002).
+    Retorna un dict con eliminados, lotes y duracion (segundos).
+    """
+    inicio = time.perf_counter()
+    limite = timezone.now() - timedelta(
+        seconds=getattr(settings, 'TOKEN_EXPIRED_AFTER_SECONDS', 86400)
+    )
+    vencidos = Token.objects.filter(created__lt=limite).order_by('created')
+    
+    eliminados = lotes = 0
+    while True:
+        keys = list(vencidos.values_list('key', flat=True)[:tamano_lote])
+        if not keys:
+            break
+        with transaction.atomic():
+            eliminados += Token.objects.filter(key__in=keys).delete()[1].get(Token._meta.label, 0)
+        lotes += 1
+        if len(keys) < tamano_lote:
+            break
+        time.sleep(pausa)
+    
+    return {
+        'eliminados': eliminados,
+        'lotes': lotes,
+        'duracion': time.perf_counter() - inicio,
+    }
@@ -0,0 +1,41 @@
+# usuarios/backends.py
+"""
+Backend de autenticación de los usuarios.
+
+Es el ModelBackend de Django; solo cambia aauthenticate(): el de Django
+verifica el hash PBKDF2 dentro del event loop, este lo hace en el pool
+acotado de hashing.py. Así la vista async de login (auth_async.py) pasa por
+aauthenticate() —backends configurados, user_can_authenticate y la señal
+user_login_failed— sin bloquear el loop.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+class UsuarioBackend(ModelBackend):
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Un hash igual que con un usuario existente (ver ModelBackend)
+            await hashing.hashear(password)
+            return None
+        nuevos = []
+        if not await hashing.verificar(password, user.password, nuevos.append):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+        if nuevos:
+            # Hash con parámetros viejos: se reemplaza por el calculado en el pool
+            user.password = nuevos[0]
+            await user.asave(update_fields=['password'])
+        return user
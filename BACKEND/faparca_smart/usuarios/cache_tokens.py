@@ -0,0 +1,210 @@
+# usuarios/cache_tokens.py
+"""
+Caché de tokens y registro diferido del último acceso.
+
+Autenticar cada petición del dashboard costaba un SELECT de Token + usuario
+y un UPDATE de ultimo_acceso. Los tokens validados se guardan en un caché
+LRU con expiración (TOKEN_CACHE_TTL, TOKEN_CACHE_MAX) que se invalida con
+las señales de borrado de Token y de guardado de Usuario (revoke_token,
+toggle_active, cambio de contraseña), y el último acceso se anota en
+memoria y un hilo de fondo lo escribe por lotes cada
+ULTIMO_ACCESO_INTERVALO segundos, fuera de las peticiones.
+
+El caché es por proceso, pero cada invalidación también incrementa una
+marca compartida por usuario (core.throttling.incrementar_marca, en el
+mismo almacén que los contadores de throttling). Cada entrada guarda la
+marca que tenía el usuario al cargarse y un acierto solo vale si sigue
+siendo la misma: un token borrado o un usuario desactivado en otro proceso
+dejan de aceptarse en la petición siguiente, a cambio de una lectura por
+clave primaria en ese almacén.
+"""
+import atexit
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from core import throttling
+
+logger = logging.getLogger(__name__)
+
+_tokens = OrderedDict()  # key -> (token, user_id, marca, cargado_en)
+_usuarios = OrderedDict()  # user_id -> (usuario, user_id, marca, cargado_en), para tokens firmados
+_tokens_lock = threading.Lock()
+
+_accesos = {}  # user_id -> datetime
+_accesos_lock = threading.Lock()
+_volcador = None  # (hilo, pid)
+
+
+def _ttl():
+    return getattr(settings, 'TOKEN_CACHE_TTL', 60)
+
+
+def _clave_marca(user_id):
+    return f'tokens:{user_id}'
+
+
+def marca(user_id):
+    """
+    Marca compartida de invalidación del usuario. Conviene leerla antes de
+    consultar la base: si otro proceso invalida entre medio, la entrada
+    queda guardada con la marca vieja y no se usa.
+    """
+    return throttling.leer_marca(_clave_marca(user_id))
+
+
+def _leer(tabla, clave):
+    with _tokens_lock:
+        entrada = tabla.get(clave)
+        if entrada is None:
+            return None
+        valor, user_id, marca_guardada, cargado_en = entrada
+        if time.monotonic() - cargado_en > _ttl():
+            del tabla[clave]
+            return None
+        tabla.move_to_end(clave)
+    if marca(user_id) != marca_guardada:
+        # Invalidado en otro proceso
+        with _tokens_lock:
+            if tabla.get(clave) is entrada:
+                del tabla[clave]
+        return None
+    return valor
+
+
+def _escribir(tabla, clave, valor, user_id, marca_guardada):
+    if marca_guardada is None:
+        marca_guardada = marca(user_id)
+    with _tokens_lock:
+        tabla[clave] = (valor, user_id, marca_guardada, time.monotonic())
+        tabla.move_to_end(clave)
+        while len(tabla) > getattr(settings, 'TOKEN_CACHE_MAX', 1000):
+            tabla.popitem(last=False)
+
+
+def obtener(key):
+    """Retorna el Token cacheado (con su usuario) o None"""
+    token = _leer(_tokens, key)
+    if token is None:
+        return None
+    # Copias por petición: las vistas no comparten la instancia del usuario
+    token = copy.copy(token)
+    token.user = copy.copy(token.user)
+    return token
+
+
+def guardar(token, marca_usuario=None):
+    _escribir(_tokens, token.key, token, token.user_id, marca_usuario)
+
+
+def obtener_usuario(user_id):
+    """Usuario cacheado por id (tokens firmados) o None"""
+    usuario = _leer(_usuarios, user_id)
+    return None if usuario is None else copy.copy(usuario)
+
+
+def guardar_usuario(usuario, marca_usuario=None):
+    _escribir(_usuarios, usuario.pk, usuario, usuario.pk, marca_usuario)
+
+
+def invalidar(key, user_id=None):
+    """Descarta el token; con su usuario también en los demás procesos"""
+    with _tokens_lock:
+        _tokens.pop(key, None)
+    if user_id is not None:
+        throttling.incrementar_marca(_clave_marca(user_id))
+
+
+def invalidar_usuarios(user_ids):
+    """Descarta los tokens cacheados de esos usuarios, en todos los procesos"""
+    user_ids = set(user_ids)
+    with _tokens_lock:
+        for key in [k for k, entrada in _tokens.items() if entrada[1] in user_ids]:
+            del _tokens[key]
+        for user_id in user_ids:
+            _usuarios.pop(user_id, None)
+    for user_id in user_ids:
+        throttling.incrementar_marca(_clave_marca(user_id))
+
+
+def limpiar():
+    """Descarta los tokens cacheados y los accesos sin escribir"""
+    with _tokens_lock:
+        _tokens.clear()
+        _usuarios.clear()
+    with _accesos_lock:
+        _accesos.clear()
+
+
+def registrar_acceso(user_id, momento=None):
+    """
+    Anota el último acceso en memoria. Lo escribe el hilo de fondo del
+    proceso (ver _volcar_periodicamente), nunca la petición.
+    """
+    with _accesos_lock:
+        _accesos[user_id] = momento or timezone.now()
+    if getattr(settings, 'ULTIMO_ACCESO_EN_SEGUNDO_PLANO', True):
+        _iniciar_volcador()
+
+
+def _iniciar_volcador():
+    """Arranca el hilo de volcado de este proceso (de nuevo tras un fork)"""
+    global _volcador
+    if _volcador is not None and _volcador[1] == os.getpid():
+        return
+    with _accesos_lock:
+        if _volcador is not None and _volcador[1] == os.getpid():
+            return
+        hilo = threading.Thread(target=_volcar_periodicamente, name='ultimo-acceso', daemon=True)
+        _volcador = (hilo, os.getpid())
+    hilo.start()
+
+
+def _volcar_periodicamente():
+    while True:
+        time.sleep(max(1, getattr(settings, 'ULTIMO_ACCESO_INTERVALO', 60)))
+        try:
+            volcar_accesos()
+        except Exception:
+            logger.exception('Error escribiendo el último acceso de los usuarios')
+        finally:
+            connection.close()
+
+
+def volcar_accesos():
+    """Escribe los accesos pendientes con un solo UPDATE parametrizado (executemany)"""
+    global _accesos
+    with _accesos_lock:
+        pendientes, _accesos = _accesos, {}
+    if not pendientes:
+        return 0
+
+    from .models import Usuario
+    qn = connection.ops.quote_name
+    sql = (
+        f'UPDATE {qn(Usuario._meta.db_table)} SET {qn("ultimo_acceso")} = %s '
+        f'WHERE {qn("id")} = %s'
+    )
+    adaptar = connection.ops.adapt_datetimefield_value
+    parametros = [(adaptar(momento), user_id) for user_id, momento in pendientes.items()]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+    return len(parametros)
+
+
+def _volcar_al_salir():
+    try:
+        volcar_accesos()
+    except Exception:
+        # Al apagar el proceso la base puede no estar disponible
+        pass
+
+
+atexit.register(_volcar_al_salir)
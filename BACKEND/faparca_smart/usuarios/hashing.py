@@ -0,0 +1,64 @@
+# usuarios/hashing.py
+"""
+Pool acotado para el hashing de contraseñas.
+
+PBKDF2 tarda cientos de milisegundos por verificación. Las vistas async de
+autenticación (auth_async.py) lo ejecutan en este pool para no bloquear el
+event loop: hashlib libera el GIL, así que varios logins simultáneos (el
+cambio de turno) se verifican en paralelo hasta HASH_WORKERS a la vez y el
+resto espera turno sin frenar a las demás peticiones.
+
+Las funciones del pool son puro cálculo: nunca tocan la base de datos.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def trabajadores():
+    return getattr(settings, 'HASH_WORKERS', None) or min(4, os.cpu_count() or 1)
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=trabajadores(),
+                    thread_name_prefix='hash-password',
+                )
+    return _pool
+
+
+async def _en_pool(funcion, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor(), partial(funcion, *args))
+
+
+async def verificar(password, encoded, setter=None):
+    """
+    True si la contraseña coincide con el hash guardado. Si el hash quedó
+    desactualizado (otro algoritmo o menos iteraciones) y se pasa `setter`,
+    se calcula el hash nuevo en el pool y se llama setter(hash_nuevo) para
+    que quien llama lo guarde, como el setter de check_password().
+    """
+    if not encoded:
+        return False
+    desactualizado = []
+    # En el pool el setter de check_password solo anota: aquí no se toca la base
+    valido = await _en_pool(check_password, password, encoded, desactualizado.append)
+    if valido and desactualizado and setter is not None:
+        setter(await hashear(password))
+    return valido
+
+
+async def hashear(password):
+    return await _en_pool(make_password, password)
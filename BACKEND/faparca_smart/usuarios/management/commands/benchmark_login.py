@@ -0,0 +1,105 @@
+# usuarios/management/commands/benchmark_login.py
+"""
+Simula el cambio de turno: N operadores inician sesión al mismo tiempo.
+Mide los logins uno por uno y luego todos en ráfaga contra /api/auth/login/
+(vistas async con el hash en el pool de hashing) y reporta p50/p99.
+Los usuarios temporales se eliminan al terminar.
+Uso: python manage.py benchmark_login [--usuarios 50]
+"""
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+
+from usuarios import hashing
+from usuarios.models import Usuario
+
+PREFIJO_USUARIO = 'bench_login_'
+PASSWORD = 'Turno.2024'
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de login en una ráfaga de cambio de turno'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuarios',
+            type=int,
+            default=50,
+            help='Cantidad de logins simultáneos (por defecto 50)'
+        )
+
+    async def _login(self, cliente, username):
+        inicio = time.perf_counter()
+        respuesta = await cliente.post(
+            '/api/auth/login/',
+            {'username': username, 'password': PASSWORD},
+            content_type='application/json',
+        )
+        if respuesta.status_code != 200:
+            raise CommandError(f'Login de {username} falló ({respuesta.status_code}): {respuesta.content[:200]}')
+        return time.perf_counter() - inicio
+
+    async def _serie(self, usernames):
+        cliente = AsyncClient()
+        return [await self._login(cliente, username) for username in usernames]
+
+    async def _rafaga(self, usernames):
+        cliente = AsyncClient()
+        monitor = asyncio.create_task(self._monitorear_loop())
+        try:
+            return await asyncio.gather(*(self._login(cliente, username) for username in usernames))
+        finally:
+            monitor.cancel()
+
+    async def _monitorear_loop(self, intervalo=0.01):
+        """Mide cuánto se atrasa el event loop (si un hash lo bloqueara, se atrasaría ~1 hash)"""
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            self.retraso_loop = max(self.retraso_loop, time.perf_counter() - inicio - intervalo)
+
+    def _medir(self, corrutina):
+        inicio = time.perf_counter()
+        latencias = asyncio.run(corrutina)
+        return time.perf_counter() - inicio, sorted(latencias)
+
+    def _reportar(self, titulo, total, latencias):
+        p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+        self.stdout.write(
+            f'  {titulo:<10} total {total:.2f}s | '
+            f'p50 {statistics.median(latencias) * 1000:.0f}ms | '
+            f'p99 {p99 * 1000:.0f}ms'
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options['usuarios']
+        if cantidad < 1:
+            raise CommandError('--usuarios debe ser mayor que cero')
+        if Usuario.objects.filter(username__startswith=PREFIJO_USUARIO).exists():
+            raise CommandError(f'Ya existen usuarios "{PREFIJO_USUARIO}*"; elimínelos antes de medir.')
+
+        # Un solo hash para todos: crear los usuarios no debe dominar el benchmark
+        password = make_password(PASSWORD)
+        usernames = [f'{PREFIJO_USUARIO}{i:04d}' for i in range(cantidad)]
+        Usuario.objects.bulk_create(
+            Usuario(username=username, password=password, rol='operador', activo=True)
+            for username in usernames
+        )
+
+        try:
+            self.stdout.write(f'Logins: {cantidad}')
+            total_serie, serie = self._medir(self._serie(usernames))
+            self._reportar('En serie', total_serie, serie)
+            self.retraso_loop = 0.0
+            total_rafaga, rafaga = self._medir(self._rafaga(usernames))
+            self._reportar('En ráfaga', total_rafaga, rafaga)
+            self.stdout.write(f'  Aceleración: {total_serie / total_rafaga:.1f}x (pool de hashing: {hashing.trabajadores()} hilos)')
+            self.stdout.write(f'  Retraso máximo del event loop en la ráfaga: {self.retraso_loop * 1000:.0f}ms')
+        finally:
+            Usuario.objects.filter(username__startswith=PREFIJO_USUARIO).delete()
+
+        self.stdout.write(self.style.SUCCESS('✓ Usuarios temporales eliminados'))
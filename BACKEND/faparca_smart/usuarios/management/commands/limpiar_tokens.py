@@ -0,0 +1,56 @@
+# usuarios/management/commands/limpiar_tokens.py
+"""
+Comando para eliminar los tokens vencidos en lotes.
+Uso: python manage.py limpiar_tokens [--lote N] [--pausa S] [--intervalo S]
+
+Con --intervalo queda corriendo y repite la limpieza cada S segundos
+(pensado para un servicio/proceso aparte del servidor web).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from usuarios.authentication import limpiar_tokens_vencidos
+
+
+class Command(BaseCommand):
+    help = 'Elimina los tokens de autenticación vencidos en lotes cortos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Tokens eliminados por transacción (por defecto 500)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.05,
+            help='Segundos de pausa entre lotes para liberar el bloqueo de escritura (por defecto 0.05)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            help='Repetir la limpieza cada N segundos hasta interrumpir el comando'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                resultado = limpiar_tokens_vencidos(options['lote'], options['pausa'])
+                self.stdout.write(
+                    f"Tokens eliminados: {resultado['eliminados']} | "
+                    f"Lotes: {resultado['lotes']} | "
+                    f"Tiempo: {resultado['duracion']:.2f}s"
+                )
+                if not options['intervalo']:
+                    break
+                # No mantener la conexión abierta mientras se espera
+                connection.close()
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Limpieza interrumpida')
+            return
+        self.stdout.write(self.style.SUCCESS('✓ Limpieza de tokens finalizada'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índice sobre authtoken_token.created para que la limpieza de tokens
+    vencidos (created < límite) recorra solo los vencidos. La tabla es de
+    rest_framework.authtoken, por eso el índice se crea con SQL.
+    """
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS authtoken_token_created_idx ON authtoken_token (created)',
+            reverse_sql='DROP INDEX IF EXISTS authtoken_token_created_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0001_initial'),
+        ('usuarios', '0002_indice_token_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='areas_supervisadas',
+            field=models.ManyToManyField(blank=True, help_text='Áreas que ve un supervisor (además de su área asignada)', related_name='supervisores', to='areas.area'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_areas_supervisadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='tokens_revocados_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -21,9 +21,17 @@ class Usuario(AbstractUser):
         blank=True,
         help_text="Área específica del usuario"
     )
+    areas_supervisadas = models.ManyToManyField(
+        'areas.Area',
+        blank=True,
+        related_name='supervisores',
+        help_text="Áreas que ve un supervisor (además de su área asignada)"
+    )
     telefono = models.CharField(max_length=20, blank=True)
     activo = models.BooleanField(default=True)
     ultimo_acceso = models.DateTimeField(null=True, blank=True)
+    # Tokens firmados emitidos hasta este momento quedan revocados (ver usuarios/tokens_firmados.py)
+    tokens_revocados_desde = models.DateTimeField(null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name = "Usuario"
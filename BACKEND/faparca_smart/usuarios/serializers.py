@@ -1,6 +1,6 @@
 # usuarios/serializers.py
 from rest_framework import serializers
-from django.contrib.auth import authenticate
+from django.contrib.auth import aauthenticate, authenticate
 from django.core.validators import RegexValidator
 from django.contrib.auth.password_validation import validate_password
 from .models import Usuario
@@ -88,14 +88,21 @@ class UsuarioCreateSerializer(serializers.ModelSerializer):
         return attrs
     
     def create(self, validated_data):
-        """Crea el usuario con la contraseña hasheada"""
+        """
+        Crea el usuario con la contraseña hasheada. Con save(password_hash=...)
+        (calculado aparte, p. ej. en el pool de hashing) no se vuelve a hashear.
+        """
+        password_hash = validated_data.pop('password_hash', None)
         validated_data.pop('password2')
         password = validated_data.pop('password')
         user = Usuario.objects.create_user(
             **validated_data,
-            password=password,
+            password=None if password_hash else password,
             activo=True
         )
+        if password_hash:
+            user.password = password_hash
+            user.save(update_fields=['password'])
         return user
 
 class LoginSerializer(serializers.Serializer):
@@ -166,8 +173,15 @@ class LoginSerializer(serializers.Serializer):
                         'non_field_errors': 'Esta cuenta está inactiva en el sistema.'
                     })
                 
+                # La vista async autentica después con aautenticar()
+                if self.context.get('autenticar_async'):
+                    attrs['user'] = user_obj
+                    return attrs
+                
                 # Intentar autenticar
-                user = authenticate(username=user_obj.username, password=password)
+                user = authenticate(
+                    self.context.get('request'), username=user_obj.username, password=password
+                )
                 
                 if not user:
                     # Contraseña incorrecta
@@ -187,6 +201,20 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError({
                 'non_field_errors': 'Debe proporcionar username y password'
             })
+    
+    async def aautenticar(self):
+        """
+        Autentica con aauthenticate() después de is_valid() (contexto
+        autenticar_async). Retorna el usuario, o None si la contraseña no
+        coincide.
+        """
+        datos = self.validated_data
+        user = await aauthenticate(
+            self.context.get('request'), username=datos['user'].username, password=datos['password']
+        )
+        if user is not None:
+            datos['user'] = user
+        return user
 
 class ChangePasswordSerializer(serializers.Serializer):
     """Serializer para cambio de contraseña"""
@@ -215,13 +243,17 @@ class ChangePasswordSerializer(serializers.Serializer):
         return attrs
     
     def validate_old_password(self, value):
+        # La ruta async verifica el hash fuera del event loop (ver hashing.py)
+        if not self.context.get('verificar_password', True):
+            return value
         user = self.context['request'].user
         if not user.check_password(value):
             raise serializers.ValidationError('Contraseña actual incorrecta')
         return value
     
     def save(self):
-        user = self.context['request'].user
+        # El usuario al que se le cambia la contraseña (un admin puede cambiar otra)
+        user = self.context.get('user') or self.context['request'].user
         user.set_password(self.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         return user
@@ -0,0 +1,54 @@
+# usuarios/signals.py
+"""
+Señales de la app usuarios
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from areas.models import Area
+from . import alcance, cache_tokens
+from .models import Usuario
+
+
+@receiver(post_delete, sender=Token)
+def invalidar_token_revocado(sender, instance, using=None, **kwargs):
+    """Un token borrado (logout, revoke_token, expiración) deja de aceptarse ya"""
+    cache_tokens.invalidar(instance.key, instance.user_id)
+    # De nuevo al confirmar, por si otra petición lo recargó antes del COMMIT
+    transaction.on_commit(lambda: cache_tokens.invalidar(instance.key, instance.user_id), using=using)
+
+
+@receiver(post_save, sender=Usuario)
+def invalidar_tokens_usuario(sender, instance, using=None, **kwargs):
+    """Cambios del usuario (activo, is_active, contraseña) se ven en la próxima petición"""
+    cache_tokens.invalidar_usuarios([instance.pk])
+    transaction.on_commit(lambda: cache_tokens.invalidar_usuarios([instance.pk]), using=using)
+
+
+@receiver(post_save, sender=Usuario)
+def invalidar_alcance_usuario(sender, instance, using=None, **kwargs):
+    """Cambios de rol o área asignada"""
+    alcance.invalidar([instance.pk])
+    transaction.on_commit(lambda: alcance.invalidar([instance.pk]), using=using)
+
+
+@receiver(m2m_changed, sender=Usuario.areas_supervisadas.through)
+def invalidar_alcance_supervisor(sender, instance, action, pk_set=None, using=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Desde el lado del área (area.supervisores.add) instance es el Area
+    user_ids = [instance.pk] if isinstance(instance, Usuario) else None
+    alcance.invalidar(user_ids)
+    transaction.on_commit(lambda: alcance.invalidar(user_ids), using=using)
+    # La marca compartida avisa a los canales en vivo abiertos en otros procesos
+    afectados = user_ids if user_ids is not None else list(pk_set or ())
+    transaction.on_commit(lambda: cache_tokens.invalidar_usuarios(afectados), using=using)
+
+
+@receiver(post_delete, sender=Area)
+def invalidar_alcances(sender, using=None, **kwargs):
+    """Al borrar un área sus usuarios quedan sin área asignada (SET_NULL, sin señales)"""
+    alcance.invalidar()
+    transaction.on_commit(alcance.invalidar, using=using)
@@ -1,3 +1,426 @@
-from django.test import TestCase
+from collections import OrderedDict
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from areas.models import Area
+from core import throttling
+from registros.models import RegistroOEE
+from . import alcance, auth_async, cache_tokens, tokens_firmados
+from .authentication import TokenManager, limpiar_tokens_vencidos
+from .backends import UsuarioBackend
+from .models import Usuario
+from .serializers import LoginSerializer
+
+
+@override_settings(THROTTLE_ACTIVO=False)
+class CacheTokensTests(TestCase):
+    """Autenticación por token sin consultas ni escrituras por petición"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('admin_test', password='x', rol='admin', is_staff=True)
+        cls.operador = Usuario.objects.create_user('operador_test', password='x', rol='operador')
+
+    def setUp(self):
+        cache_tokens.limpiar()
+
+    def cliente(self, usuario):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Token ' + TokenManager.create_token(usuario)['key'])
+        return cliente
+
+    def test_peticiones_autenticadas_sin_consultas(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            respuesta = cliente.get('/api/usuarios/me/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['username'], 'operador_test')
+
+    def test_revoke_token_invalida_el_cache(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        TokenManager.revoke_token(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_toggle_active_invalida_el_cache(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        respuesta = self.cliente(self.admin).post(f'/api/usuarios/{self.operador.pk}/toggle_active/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_revocacion_en_otro_proceso(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        # Otro proceso: cachés propios, las mismas marcas compartidas
+        with mock.patch.object(cache_tokens, '_tokens', OrderedDict()), \
+                mock.patch.object(cache_tokens, '_usuarios', OrderedDict()):
+            TokenManager.revoke_token(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_desactivacion_en_otro_proceso(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        with mock.patch.object(cache_tokens, '_tokens', OrderedDict()), \
+                mock.patch.object(cache_tokens, '_usuarios', OrderedDict()):
+            self.operador.activo = False
+            self.operador.save()
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_ttl_vencido_vuelve_a_consultar(self):
+        cliente = self.cliente(self.operador)
+        cliente.get('/api/usuarios/me/')
+        Usuario.objects.filter(pk=self.operador.pk).update(activo=False)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_ultimo_acceso_se_escribe_por_lotes(self):
+        cliente = self.cliente(self.operador)
+        for _ in range(3):
+            cliente.get('/api/usuarios/me/')
+        self.operador.refresh_from_db()
+        self.assertIsNone(self.operador.ultimo_acceso)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(cache_tokens.volcar_accesos(), 1)
+        self.operador.refresh_from_db()
+        self.assertIsNotNone(self.operador.ultimo_acceso)
+
+    @override_settings(ULTIMO_ACCESO_INTERVALO=0, ULTIMO_ACCESO_EN_SEGUNDO_PLANO=False)
+    def test_ultimo_acceso_no_se_escribe_en_la_peticion(self):
+        cliente = self.cliente(self.operador)
+        cliente.get('/api/usuarios/me/')
+        with self.assertNumQueries(0):
+            cliente.get('/api/usuarios/me/')
+        self.assertEqual(cache_tokens.volcar_accesos(), 1)
+
+
+@override_settings(TOKEN_MODO='firmado', THROTTLE_ACTIVO=False)
+class TokensFirmadosTests(TestCase):
+    """Tokens firmados: verificación por HMAC y revocación por usuario"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('admin_test', password='x', rol='admin', is_staff=True)
+        cls.operador = Usuario.objects.create_user('operador_test', password='x', rol='operador')
+
+    def setUp(self):
+        cache.clear()
+        cache_tokens.limpiar()
+
+    def cliente(self, usuario):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Token ' + TokenManager.create_token(usuario)['key'])
+        return cliente
+
+    def test_emitir_y_verificar_sin_la_tabla_de_tokens(self):
+        with self.assertNumQueries(0):
+            datos = TokenManager.create_token(self.operador)
+        self.assertTrue(datos['key'].startswith(tokens_firmados.PREFIJO))
+
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Token ' + datos['key'])
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            respuesta = cliente.get('/api/usuarios/me/')
+        self.assertEqual(respuesta.data['username'], 'operador_test')
+        self.assertFalse(Token.objects.exists())
+
+    def test_refresh_es_puro_calculo(self):
+        cliente = self.cliente(self.operador)
+        cliente.get('/api/usuarios/me/')
+        with self.assertNumQueries(0):
+            respuesta = cliente.post('/api/auth/refresh/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.data['token'].startswith(tokens_firmados.PREFIJO))
+
+    def test_token_alterado_o_vencido(self):
+        key = TokenManager.create_token(self.operador)['key']
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Token ' + key[:-2] + 'xx')
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+        with override_settings(TOKEN_EXPIRED_AFTER_SECONDS=-1):
+            cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_logout_revoca_los_tokens_emitidos(self):
+        cliente = self.cliente(self.operador)
+        otra_sesion = self.cliente(self.operador)
+        self.assertEqual(cliente.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+        self.assertEqual(otra_sesion.get('/api/usuarios/me/').status_code, 401)
+        # Un login posterior vuelve a funcionar
+        self.assertEqual(self.cliente(self.operador).get('/api/usuarios/me/').status_code, 200)
+
+    def test_revocacion_persiste_sin_cache(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.post('/api/auth/logout/').status_code, 200)
+        # Ni el caché de Django (compartido con las respuestas, con MAX_ENTRIES)
+        # ni el de usuarios guardan la revocación: está en la base de datos
+        cache.clear()
+        cache_tokens.limpiar()
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+        self.assertIsNotNone(Usuario.objects.get(pk=self.operador.pk).tokens_revocados_desde)
+        with self.assertNumQueries(0):
+            self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_revocacion_en_otro_proceso(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        # El logout llega a otro proceso, con su propio caché de usuarios
+        with mock.patch.object(cache_tokens, '_tokens', OrderedDict()), \
+                mock.patch.object(cache_tokens, '_usuarios', OrderedDict()):
+            tokens_firmados.revocar(self.operador.pk)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_el_token_no_lleva_el_rol(self):
+        key = TokenManager.create_token(self.operador)['key']
+        self.assertEqual(set(tokens_firmados.verificar(key)), {'u', 'iat', 'exp'})
+
+    def test_toggle_active_revoca(self):
+        cliente = self.cliente(self.operador)
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 200)
+        self.cliente(self.admin).post(f'/api/usuarios/{self.operador.pk}/toggle_active/')
+        self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+    def test_no_se_aceptan_en_modo_db(self):
+        key = TokenManager.create_token(self.operador)['key']
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        with override_settings(TOKEN_MODO='db'):
+            self.assertEqual(cliente.get('/api/usuarios/me/').status_code, 401)
+
+
+class LimpiezaTokensTests(TestCase):
+
+    def test_elimina_solo_los_vencidos_en_lotes(self):
+        usuarios = [Usuario.objects.create_user(f'usuario_{i}', password='x') for i in range(7)]
+        for usuario in usuarios:
+            Token.objects.create(user=usuario)
+        vencido = timezone.now() - timedelta(seconds=settings.TOKEN_EXPIRED_AFTER_SECONDS + 60)
+        Token.objects.filter(user__in=usuarios[:5]).update(created=vencido)
+
+        resultado = limpiar_tokens_vencidos(tamano_lote=2, pausa=0)
+        self.assertEqual(resultado['eliminados'], 5)
+        self.assertEqual(resultado['lotes'], 3)
+        self.assertEqual(set(Token.objects.values_list('user_id', flat=True)), {u.pk for u in usuarios[5:]})
+        self.assertEqual(TokenManager.cleanup_expired_tokens(), 0)
+
+
+class AuthAsyncTests(TestCase):
+    """Login, registro y cambio de contraseña por las vistas async"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('admin_test', password='Clave.Admin1', rol='admin', is_staff=True)
+        cls.operador = Usuario.objects.create_user('operador_test', password='Clave.Turno1', rol='operador')
+
+    def setUp(self):
+        cache.clear()
+        cache_tokens.limpiar()
+        throttling.limpiar()
+
+    def login(self, username, password):
+        return self.client.post(
+            '/api/auth/login/', {'username': username, 'password': password}, content_type='application/json'
+        )
+
+    def test_login_exitoso_pasa_por_authenticate(self):
+        with mock.patch.object(UsuarioBackend, 'aauthenticate', autospec=True, side_effect=UsuarioBackend.aauthenticate) as autenticar:
+            respuesta = self.login('OPERADOR_test', 'Clave.Turno1')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(autenticar.call_args.kwargs['username'], 'operador_test')
+        datos = respuesta.json()
+        self.assertEqual(datos['user']['username'], 'operador_test')
+        self.assertTrue(Token.objects.filter(key=datos['token'], user=self.operador).exists())
+
+    def test_login_fallido_emite_user_login_failed(self):
+        fallidos = []
+
+        def receptor(sender, credentials, **kwargs):
+            fallidos.append(credentials['username'])
+
+        user_login_failed.connect(receptor)
+        self.addCleanup(user_login_failed.disconnect, receptor)
+        self.assertEqual(self.login('operador_test', 'otra').status_code, 400)
+        self.assertEqual(fallidos, ['operador_test'])
+
+    def test_login_serializer_sincrono_usa_authenticate(self):
+        serializer = LoginSerializer(data={'username': 'operador_test', 'password': 'Clave.Turno1'})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['user'].backend, 'usuarios.backends.UsuarioBackend')
+        serializer = LoginSerializer(data={'username': 'operador_test', 'password': 'otra'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('password', serializer.errors)
+
+    def test_login_fallido(self):
+        respuesta = self.login('operador_test', 'otra')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errors'], {'password': ['Contraseña incorrecta']})
+        self.assertIn('username', self.login('no_existe', 'x').json()['errors'])
+        self.assertEqual(self.client.get('/api/auth/login/').status_code, 405)
+
+    def test_login_actualiza_un_hash_desactualizado(self):
+        hasher = PBKDF2PasswordHasher()
+        viejo = hasher.encode('Clave.Turno1', hasher.salt(), iterations=1000)
+        Usuario.objects.filter(pk=self.operador.pk).update(password=viejo)
+
+        self.assertEqual(self.login('operador_test', 'Clave.Turno1').status_code, 200)
+        actual = Usuario.objects.get(pk=self.operador.pk).password
+        self.assertNotEqual(actual, viejo)
+        self.assertFalse(hasher.must_update(actual))
+        self.assertEqual(self.login('operador_test', 'Clave.Turno1').status_code, 200)
+        self.assertEqual(Usuario.objects.get(pk=self.operador.pk).password, actual)
+
+    def test_cambio_de_contrasena_revoca_el_token(self):
+        token = self.login('operador_test', 'Clave.Turno1').json()['token']
+        respuesta = self.client.post(
+            f'/api/usuarios/{self.operador.pk}/change_password/',
+            {'old_password': 'Clave.Turno1', 'new_password': 'Nueva.Clave22', 'new_password2': 'Nueva.Clave22'},
+            content_type='application/json',
+            HTTP_AUTHORIZATION='Token ' + token,
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Token.objects.filter(key=token).exists())
+        self.assertEqual(self.login('operador_test', 'Clave.Turno1').status_code, 400)
+        self.assertEqual(self.login('operador_test', 'Nueva.Clave22').status_code, 200)
+
+    def test_admin_cambia_la_contrasena_del_usuario_de_la_url(self):
+        token_admin = TokenManager.create_token(self.admin)['key']
+        respuesta = self.client.post(
+            f'/api/usuarios/{self.operador.pk}/change_password/',
+            {'old_password': 'Clave.Admin1', 'new_password': 'Nueva.Clave22', 'new_password2': 'Nueva.Clave22'},
+            content_type='application/json',
+            HTTP_AUTHORIZATION='Token ' + token_admin,
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(Usuario.objects.get(pk=self.operador.pk).check_password('Nueva.Clave22'))
+        self.assertTrue(Usuario.objects.get(pk=self.admin.pk).check_password('Clave.Admin1'))
+
+    def test_rutas_y_nombres_de_las_acciones_reemplazadas(self):
+        rutas = {
+            'auth-login': ('/api/auth/login/', auth_async.login, {}),
+            'auth-register': ('/api/auth/register/', auth_async.register, {}),
+            'usuario-change-password': (
+                f'/api/usuarios/{self.operador.pk}/change_password/', auth_async.change_password, {'pk': self.operador.pk}
+            ),
+        }
+        for nombre, (ruta, vista, kwargs) in rutas.items():
+            with self.subTest(nombre=nombre):
+                self.assertEqual(reverse(nombre, kwargs=kwargs), ruta)
+                self.assertIs(resolve(ruta).func, vista)
+                self.assertEqual(self.client.get(ruta).status_code, 405)
+
+    def test_registro_solo_administradores(self):
+        datos = {
+            'username': 'nuevo_operador', 'email': 'nuevo@faparca.com', 'password': 'Clave.Nueva33',
+            'password2': 'Clave.Nueva33', 'first_name': 'Nuevo', 'last_name': 'Operador', 'rol': 'operador',
+        }
+        token_operador = TokenManager.create_token(self.operador)['key']
+        respuesta = self.client.post(
+            '/api/auth/register/', datos, content_type='application/json', HTTP_AUTHORIZATION='Token ' + token_operador
+        )
+        self.assertEqual(respuesta.status_code, 403)
+
+        token_admin = TokenManager.create_token(self.admin)['key']
+        respuesta = self.client.post(
+            '/api/auth/register/', datos, content_type='application/json', HTTP_AUTHORIZATION='Token ' + token_admin
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertTrue(Usuario.objects.get(username='nuevo_operador').check_password('Clave.Nueva33'))
+
+
+@override_settings(THROTTLE_ACTIVO=False)
+class AlcanceTests(TestCase):
+    """Cada rol ve solo las áreas de su alcance"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empaque = Area.objects.create(
+            nombre='Empaque Test', codigo='EMP_TEST', tipo='empaque', capacidad_teorica=1000, capacidad_real=900
+        )
+        cls.prensa = Area.objects.create(
+            nombre='Prensa Test', codigo='PRE_TEST', tipo='prensa', capacidad_teorica=100, capacidad_real=90
+        )
+        cls.admin = Usuario.objects.create_user('admin_test', password='x', rol='administrador')
+        cls.operador = Usuario.objects.create_user(
+            'operador_test', password='x', rol='operador', area_asignada=cls.empaque
+        )
+        cls.supervisor = Usuario.objects.create_user('supervisor_test', password='x', rol='supervisor')
+        cls.supervisor.areas_supervisadas.add(cls.prensa)
+        for area in (cls.empaque, cls.prensa):
+            RegistroOEE.objects.create(
+                area=area, fecha=date(2025, 1, 1), turno='A', usuario=cls.admin,
+                plan_produccion=1000, produccion_real=800, hora_inicio=time(6), hora_fin=time(14)
+            )
+
+    def setUp(self):
+        cache.clear()
+        alcance.invalidar()
+
+    def get(self, usuario, url):
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        return cliente.get(url)
+
+    def test_areas_visibles_por_rol(self):
+        self.assertIsNone(alcance.areas_visibles(self.admin))
+        self.assertEqual(alcance.areas_visibles(self.operador), {self.empaque.pk})
+        self.assertEqual(alcance.areas_visibles(self.supervisor), {self.prensa.pk})
+        for rol in ('operador', 'supervisor', 'viewer'):
+            sin_area = Usuario.objects.create_user(f'{rol}_sin_area', password='x', rol=rol)
+            self.assertEqual(alcance.areas_visibles(sin_area), frozenset(), rol)
+        staff = Usuario.objects.create_user('viewer_staff', password='x', rol='viewer', is_staff=True)
+        self.assertIsNone(alcance.areas_visibles(staff))
+
+    def test_sin_areas_no_ve_registros(self):
+        viewer = Usuario.objects.create_user('viewer_sin_area', password='x', rol='viewer')
+        self.assertEqual(self.get(viewer, '/api/registros/').data['results'], [])
+        self.assertEqual(self.get(viewer, '/api/dashboard/summary/').data['total_registros'], 0)
+
+    def test_alcance_cacheado_e_invalidado(self):
+        alcance.areas_visibles(self.supervisor)
+        with self.assertNumQueries(0):
+            alcance.areas_visibles(self.supervisor)
+        self.supervisor.areas_supervisadas.add(self.empaque)
+        self.assertEqual(alcance.areas_visibles(self.supervisor), {self.prensa.pk, self.empaque.pk})
+        self.operador.area_asignada = self.prensa
+        self.operador.save()
+        self.assertEqual(alcance.areas_visibles(self.operador), {self.prensa.pk})
+
+    def test_listas_y_dashboard_filtrados(self):
+        registros = self.get(self.operador, '/api/registros/').data['results']
+        self.assertEqual([r['area'] for r in registros], [self.empaque.pk])
+        areas = self.get(self.operador, '/api/areas/').data
+        self.assertEqual([a['id'] for a in areas.get('results', areas)], [self.empaque.pk])
+        self.assertEqual(self.get(self.operador, '/api/dashboard/summary/').data['total_registros'], 1)
+        self.assertEqual(self.get(self.admin, '/api/dashboard/summary/').data['total_registros'], 2)
+        resumen = self.get(self.supervisor, '/api/dashboard/summary/').data
+        self.assertEqual([a['area'] for a in resumen['por_area']], [self.prensa.pk])
+        self.assertEqual(
+            self.get(self.operador, f'/api/registros/{RegistroOEE.objects.get(area=self.prensa).pk}/').status_code,
+            404
+        )
+
+    def test_no_registra_en_areas_ajenas(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.operador)
+        datos = {
+            'area': self.prensa.pk, 'fecha': '2025-01-02', 'turno': 'A', 'plan_produccion': 100,
+            'produccion_real': 90, 'hora_inicio': '06:00', 'hora_fin': '14:00',
+        }
+        self.assertEqual(cliente.post('/api/registros/', datos, format='json').status_code, 403)
+        datos['area'] = self.empaque.pk
+        self.assertEqual(cliente.post('/api/registros/', datos, format='json').status_code, 201)
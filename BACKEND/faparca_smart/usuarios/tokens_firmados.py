@@ -0,0 +1,98 @@
+# usuarios/tokens_firmados.py
+"""
+Tokens firmados (TOKEN_MODO = 'firmado').
+
+Alternativa sin estado al Token de rest_framework.authtoken: el token lleva
+el id del usuario, la fecha de emisión y la de expiración, firmados
+con HMAC (django.core.signing, clave SECRET_KEY). Verificarlo no consulta
+la base de datos y emitir uno (login, refresh) es puro cálculo.
+
+Las revocaciones (logout, cambio de contraseña, desactivación) se guardan
+como "revocado desde" por usuario en Usuario.tokens_revocados_desde: un
+token vale si se emitió después de esa marca. Es una columna por usuario,
+no por token, persistente y común a todos los procesos. La autenticación
+ya carga al usuario desde cache_tokens, así que comprobarla no agrega
+consultas a la base: revocar incrementa la marca compartida del usuario
+y cualquier proceso que lo tenga cacheado lo vuelve a leer en la petición
+siguiente, con la columna actualizada.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache_tokens
+
+PREFIJO = 'f1.'
+SALT = 'usuarios.tokens_firmados'
+
+
+class TokenFirmadoInvalido(Exception):
+    pass
+
+
+def activo():
+    return getattr(settings, 'TOKEN_MODO', 'db') == 'firmado'
+
+
+def es_firmado(key):
+    return key.startswith(PREFIJO)
+
+
+def _duracion():
+    return getattr(settings, 'TOKEN_EXPIRED_AFTER_SECONDS', 86400)
+
+
+def emitir(user):
+    """Retorna un dict con el mismo formato que TokenManager.create_token"""
+    ahora = time.time()
+    expira = ahora + _duracion()
+    datos = {'u': user.pk, 'iat': ahora, 'exp': round(expira)}
+    return {
+        'key': PREFIJO + signing.dumps(datos, salt=SALT, compress=True),
+        'created': datetime.fromtimestamp(ahora, tz=dt_timezone.utc),
+        'expires_at': datetime.fromtimestamp(expira, tz=dt_timezone.utc),
+        'expires_in': float(_duracion()),
+    }
+
+
+def verificar(key, usuario=None):
+    """
+    Retorna los datos del token o lanza TokenFirmadoInvalido. Con el
+    usuario del token también comprueba que no haya sido revocado.
+    """
+    try:
+        datos = signing.loads(key[len(PREFIJO):], salt=SALT)
+    except signing.BadSignature:
+        raise TokenFirmadoInvalido('Token inválido.')
+    if not isinstance(datos, dict) or not {'u', 'iat', 'exp'} <= datos.keys():
+        raise TokenFirmadoInvalido('Token inválido.')
+    if datos['exp'] < time.time():
+        raise TokenFirmadoInvalido('Token expirado. Por favor, inicie sesión nuevamente.')
+    if usuario is not None:
+        comprobar_revocacion(datos, usuario)
+    return datos
+
+
+def comprobar_revocacion(datos, usuario):
+    """
+    El usuario tiene que venir de la base o de cache_tokens, que descarta
+    la entrada si el usuario fue revocado en cualquier proceso.
+    """
+    revocado_desde = usuario.tokens_revocados_desde
+    if revocado_desde is not None and datos['iat'] <= revocado_desde.timestamp():
+        raise TokenFirmadoInvalido('Token revocado. Por favor, inicie sesión nuevamente.')
+
+
+def revocar(user_id):
+    """Invalida todos los tokens del usuario emitidos hasta ahora"""
+    get_user_model().objects.filter(pk=user_id).update(tokens_revocados_desde=timezone.now())
+    # update() no envía post_save: se descarta a mano el usuario cacheado,
+    # de nuevo al confirmar por si otro proceso lo recargó antes del COMMIT
+    cache_tokens.invalidar_usuarios([user_id])
+    transaction.on_commit(partial(cache_tokens.invalidar_usuarios, [user_id]))
@@ -2,18 +2,14 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle
-from django.contrib.auth import login
-from django.utils import timezone
-from django.db import transaction
+from core.throttling import AnonRateThrottle
 from .models import Usuario
 from .serializers import (
     UsuarioSerializer, 
-    LoginSerializer, 
     UsuarioCreateSerializer,
     ChangePasswordSerializer
 )
-from .authentication import TokenManager, ExpiringTokenAuthentication
+from .authentication import TokenManager
 
 # Create your views here.
 
@@ -54,36 +50,6 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated()]
         return super().get_permissions()
     
-    @action(detail=True, methods=['post'])
-    def change_password(self, request, pk=None):
-        """Cambiar contraseña del usuario"""
-        user = self.get_object()
-        
-        # Verificar que es el mismo usuario o un admin
-        if request.user != user and not request.user.is_staff:
-            return Response(
-                {'error': 'No tiene permisos para cambiar esta contraseña'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        serializer = ChangePasswordSerializer(
-            data=request.data,
-            context={'request': request}
-        )
-        
-        if serializer.is_valid():
-            serializer.save()
-            
-            # Revocar token actual para forzar nuevo login
-            TokenManager.revoke_token(user)
-            
-            return Response(
-                {'message': 'Contraseña actualizada exitosamente. Por favor, inicie sesión nuevamente.'},
-                status=status.HTTP_200_OK
-            )
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
     @action(detail=True, methods=['post'])
     def toggle_active(self, request, pk=None):
         """Activar/Desactivar usuario"""
@@ -121,49 +87,6 @@ class AuthViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
     throttle_classes = [LoginThrottle]  # Rate limiting para login
     
-    @action(detail=False, methods=['post'])
-    def login(self, request):
-        """
-        Endpoint de login con token expiración
-        """
-        # Agregar información adicional al serializer
-        login_data = request.data.copy()
-        login_data['ip_address'] = self.get_client_ip(request)
-        login_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
-        
-        serializer = LoginSerializer(data=login_data)
-        
-        if serializer.is_valid():
-            user = serializer.validated_data['user']
-            
-            # Crear o refrescar token
-            with transaction.atomic():
-                token_data = TokenManager.create_token(user)
-                
-                # Actualizar último acceso
-                user.ultimo_acceso = timezone.now()
-                user.save(update_fields=['ultimo_acceso'])
-            
-            # Preparar respuesta
-            response_data = {
-                'token': token_data['key'],
-                'expires_at': token_data['expires_at'].isoformat(),
-                'expires_in': token_data['expires_in'],
-                'user': UsuarioSerializer(user).data,
-                'message': 'Login exitoso'
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
-        
-        # Error de login
-        return Response(
-            {
-                'errors': serializer.errors,
-                'message': 'Error en el inicio de sesión'
-            },
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def logout(self, request):
         """
@@ -205,46 +128,3 @@ class AuthViewSet(viewsets.ViewSet):
             'valid': True,
             'user': UsuarioSerializer(request.user).data
         })
-    
-    @action(detail=False, methods=['post'])
-    def register(self, request):
-        """
-        Registro de nuevos usuarios (si está habilitado)
-        """
-        # Verificar si el registro público está habilitado
-        # Por ahora solo admins pueden crear usuarios
-        if not request.user.is_authenticated or not request.user.is_staff:
-            return Response(
-                {'error': 'Registro no permitido. Contacte al administrador.'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        serializer = UsuarioCreateSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            with transaction.atomic():
-                user = serializer.save()
-                token_data = TokenManager.create_token(user)
-            
-            return Response({
-                'message': 'Usuario creado exitosamente',
-                'user': UsuarioSerializer(user).data,
-                'token': token_data['key'],
-                'expires_at': token_data['expires_at'].isoformat()
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(
-            serializer.errors,
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    def get_client_ip(self, request):
-        """
-        Obtiene la IP del cliente
-        """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
@@ -100,6 +100,7 @@ export const API_ENDPOINTS = {
   REGISTROS_BY_DATE: (fecha: string) => `/registros/?fecha=${fecha}`,
   REGISTROS_BY_TURNO: (turno: string) => `/registros/?turno=${turno}`,
   REGISTROS_DASHBOARD: '/registros/dashboard/',
+  REGISTROS_ULTIMOS: '/registros/ultimos/',
   REGISTROS_STATS: '/registros/stats/',
   REGISTROS_EXPORT: '/registros/export/',
   REGISTROS_IMPORT: '/registros/import/',
@@ -113,6 +114,12 @@ export const API_ENDPOINTS = {
   REPORTE_EXPORT: (tipo: string) => `/reportes/${tipo}/export/`,
   REPORTE_PREVIEW: '/reportes/preview/',
 
+  // ===== TAREAS EN SEGUNDO PLANO =====
+  TAREAS: '/tareas/',
+  TAREA_DETALLE: (id: number) => `/tareas/${id}/`,
+  TAREA_CANCELAR: (id: number) => `/tareas/${id}/cancelar/`,
+  TAREA_RESULTADO: (id: number) => `/tareas/${id}/resultado/`,
+
   // ===== DASHBOARD =====
   DASHBOARD: '/dashboard/',
   DASHBOARD_SUMMARY: '/dashboard/summary/',
@@ -137,6 +144,7 @@ export const API_ENDPOINTS = {
   HEALTH_CHECK: '/health/',
   VERSION: '/version/',
   STATUS: '/status/',
+  STATUS_PERFILES: '/status/perfiles/',
   PING: '/ping/',
 
   // ===== LOGS Y AUDITORÍA =====
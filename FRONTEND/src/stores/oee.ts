@@ -3,16 +3,18 @@ import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
 import { api } from '@/services/api'
 import { API_ENDPOINTS } from '@/config'
-import type { RegistroOEE, Area, DashboardData, ChartData, AreaStatus } from '@/types/oee'
+import type { RegistroOEE, Area, DashboardData, ChartData, AreaStatus, TrendsData } from '@/types/oee'
 
 export const useOEEStore = defineStore('oee', () => {
   // State
   const dashboardData = ref<DashboardData | null>(null)
   const registros = ref<RegistroOEE[]>([])
+  const ultimosPorArea = ref<RegistroOEE[]>([])
   const areas = ref<Area[]>([])
   const isLoading = ref(false)
   const error = ref<string | null>(null)
   const lastUpdate = ref<Date | null>(null)
+  const trends = ref<TrendsData | null>(null)
 
   // Getters
   const recentRecords = computed(() => {
@@ -23,9 +25,8 @@ export const useOEEStore = defineStore('oee', () => {
     if (!dashboardData.value || !areas.value.length) return []
 
     return areas.value.map((area) => {
-      // Buscar registros recientes para esta área
-      const areaRecords = registros.value.filter((r) => r.area === area.id)
-      const latestRecord = areaRecords[0] // El más reciente
+      // Último registro del área (lo calcula el servidor)
+      const latestRecord = ultimosPorArea.value.find((r) => r.area === area.id)
 
       let status: 'excellent' | 'good' | 'warning' | 'critical' = 'critical'
       let oee = 0
@@ -50,6 +51,28 @@ export const useOEEStore = defineStore('oee', () => {
   })
 
   const lineChartData = computed((): ChartData => {
+    // Serie diaria calculada en el servidor (OEE ponderado)
+    const serie = trends.value?.series[0]
+    if (trends.value && serie) {
+      return {
+        labels: trends.value.fechas.map((date) =>
+          new Date(`${date}T00:00:00`).toLocaleDateString('es-ES', {
+            month: 'short',
+            day: 'numeric',
+          }),
+        ),
+        datasets: [
+          {
+            label: 'OEE',
+            data: serie.oee.map((value) => value ?? 0),
+            borderColor: '#3B82F6',
+            backgroundColor: 'rgba(59, 130, 246, 0.1)',
+            borderWidth: 2,
+          },
+        ],
+      }
+    }
+
     if (!registros.value.length) {
       return {
         labels: [],
@@ -128,16 +151,21 @@ export const useOEEStore = defineStore('oee', () => {
 
     try {
       // Hacer peticiones en paralelo
-      const [dashboardResponse, registrosResponse, areasResponse] = await Promise.all([
+      const desde = new Date(Date.now() - 6 * 24 * 60 * 60 * 1000).toISOString().slice(0, 10)
+      const [dashboardResponse, registrosResponse, areasResponse, trendsResponse, ultimosResponse] = await Promise.all([
         api.get(API_ENDPOINTS.REGISTROS + 'dashboard/'),
         api.get(API_ENDPOINTS.REGISTROS + '?page_size=50&ordering=-fecha,-id'),
         api.get(API_ENDPOINTS.AREAS),
+        api.get(API_ENDPOINTS.DASHBOARD_TRENDS, { params: { periodo: 'dia', fecha_desde: desde } }),
+        api.get(API_ENDPOINTS.REGISTROS_ULTIMOS),
       ])
 
       // Actualizar estado
       dashboardData.value = dashboardResponse.data
       registros.value = registrosResponse.data.results || registrosResponse.data
       areas.value = areasResponse.data.results || areasResponse.data
+      trends.value = trendsResponse.data
+      ultimosPorArea.value = ultimosResponse.data
       lastUpdate.value = new Date()
     } catch (err: any) {
       console.error('Error fetching dashboard data:', err)
@@ -306,6 +334,81 @@ export const useOEEStore = defineStore('oee', () => {
     }, intervalMs)
   }
 
+  // Actualización en vivo por Server-Sent Events: el servidor avisa cada
+  // escritura y recién ahí se refresca. El canal se abre con un ticket de
+  // corta duración (el token no va en la URL); si el servidor lo cierra
+  // (sesión revocada, cambio de áreas) o se corta, se pide otro ticket. Si
+  // el canal no está disponible (p. ej. servidor sin ASGI) o no se obtiene
+  // el ticket se vuelve al refresco por intervalo.
+  // Retorna una función para detener todo.
+  function startLiveUpdates(fallbackIntervalMs: number = 30000) {
+    let fallback: ReturnType<typeof setInterval> | undefined
+    let pending: ReturnType<typeof setTimeout> | undefined
+    let retry: ReturnType<typeof setTimeout> | undefined
+    let source: EventSource | null = null
+    let stopped = false
+
+    const onChange = () => {
+      // Agrupa ráfagas de eventos (importaciones, recálculos) en un solo refresco
+      clearTimeout(pending)
+      pending = setTimeout(() => {
+        if (!isLoading.value) fetchDashboardData()
+      }, 500)
+    }
+
+    const useFallback = () => {
+      if (!fallback && !stopped) fallback = startAutoRefresh(fallbackIntervalMs)
+    }
+
+    const connect = async () => {
+      let ticket: string
+      try {
+        const response = await api.post('/eventos/ticket/')
+        ticket = response.data.ticket
+      } catch {
+        useFallback()
+        return
+      }
+      if (stopped) return
+      let opened = false
+      source = new EventSource(`${api.defaults.baseURL}/eventos/?ticket=${encodeURIComponent(ticket)}`)
+      source.onopen = () => {
+        opened = true
+        if (fallback) {
+          clearInterval(fallback)
+          fallback = undefined
+        }
+      }
+      source.addEventListener('registro', onChange)
+      source.addEventListener('lote', onChange)
+      source.onerror = () => {
+        // El ticket no sirve para reconectar: se cierra y se pide otro
+        source?.close()
+        source = null
+        if (!opened) {
+          // El servidor rechazó el canal
+          useFallback()
+          return
+        }
+        if (!stopped) retry = setTimeout(connect, 3000)
+      }
+    }
+
+    if (typeof EventSource !== 'undefined') {
+      connect()
+    } else {
+      useFallback()
+    }
+
+    return () => {
+      stopped = true
+      source?.close()
+      clearTimeout(pending)
+      clearTimeout(retry)
+      if (fallback) clearInterval(fallback)
+    }
+  }
+
   return {
     // State
     dashboardData,
@@ -314,6 +417,7 @@ export const useOEEStore = defineStore('oee', () => {
     isLoading,
     error,
     lastUpdate,
+    trends,
 
     // Getters
     recentRecords,
@@ -333,5 +437,6 @@ export const useOEEStore = defineStore('oee', () => {
     getRegistrosByArea,
     getRegistrosByDateRange,
     startAutoRefresh,
+    startLiveUpdates,
   }
 })
@@ -148,6 +148,7 @@ export interface RegistroFilters {
   usuario?: number
   oee_min?: number
   oee_max?: number
+  con_paradas?: boolean
 }
 
 export interface AreaFilters {
@@ -270,6 +271,76 @@ export interface ChartData {
   datasets: ChartDataset[]
 }
 
+// Respuesta de /dashboard/trends/ (columnar, alineada con `fechas`)
+export interface TrendsSeries {
+  clave: number | string | null
+  nombre: string
+  registros: number[]
+  produccion: number[]
+  oee: (number | null)[]
+  disponibilidad: (number | null)[]
+  rendimiento: (number | null)[]
+  calidad: (number | null)[]
+}
+
+export interface TrendsData {
+  periodo: 'dia' | 'semana' | 'mes'
+  agrupar: 'total' | 'area' | 'tipo' | 'turno'
+  fechas: string[]
+  series: TrendsSeries[]
+}
+
+// Respuesta de /reportes/{diario,semanal,mensual,personalizado}/
+export interface ReporteIndicadores {
+  total_registros: number
+  oee_promedio: number
+  disponibilidad: number
+  rendimiento: number
+  calidad: number
+  total_produccion: number
+  plan_total: number
+  cumplimiento: number
+}
+
+export interface ReporteTurno extends ReporteIndicadores {
+  turno: Turno
+}
+
+export interface ReporteArea extends ReporteIndicadores {
+  id: number
+  nombre: string
+  codigo: string
+  tipo: string
+  turnos: ReporteTurno[]
+  tendencia?: 'mejorando' | 'empeorando' | 'estable' | null
+}
+
+export interface ReporteOEEData {
+  tipo: 'diario' | 'semanal' | 'mensual' | 'personalizado'
+  fecha_inicio: string
+  fecha_fin: string
+  fecha_generacion: string
+  resumen: ReporteIndicadores
+  areas: ReporteArea[]
+  turnos: ReporteTurno[]
+}
+
+// Tarea en segundo plano (/api/tareas/<id>/), p. ej. una exportación de reporte
+export interface TareaSegundoPlano {
+  id: number
+  tipo: string
+  parametros: Record<string, unknown>
+  estado: 'pendiente' | 'en_curso' | 'completada' | 'fallida' | 'cancelada'
+  progreso: number
+  mensaje: string
+  error: string
+  nombre_archivo: string
+  resultado: string | null
+  creada: string
+  iniciada: string | null
+  terminada: string | null
+}
+
 export interface ChartDataset {
   label: string
   data: number[]